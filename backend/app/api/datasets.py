@@ -1,58 +1,331 @@
 from __future__ import annotations
 
+import hashlib
+import json
+import os
+import tempfile
 import uuid
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from sqlalchemy.orm import Session
+from typing import Any, Dict, Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, Response
+from sqlalchemy import select, update
+from starlette.concurrency import run_in_threadpool
 
-from app.database import get_db
+from app.config import COLUMNAR_CACHE, UPLOAD_DEDUP
+from app.database import SessionLocal, engine, fetch_one
 from app.models.dataset import Dataset
-from app.services.storage import upload_dataset
-from app.config import SUPABASE_BUCKET
+from app.services.storage import get_storage, upload_dataset_file
 from app.services.auto_pipeline import run_after_upload
+from app.services.batch_scoring import score_dataset
+from app.services.columnar import PARQUET_CONTENT_TYPE, convert_csv_to_parquet
+from app.services.jobs import QueueFullError, dumps_json, jobs
+from app.services.model_registry import registry
+from app.services.runtime_metrics import span
 
 router = APIRouter(prefix="/datasets", tags=["datasets"])
 
+# размер куска при чтении загрузки (память на запрос ограничена этим значением)
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
-@router.post("/upload")
-async def upload_dataset_endpoint(file: UploadFile = File(...), db: Session = Depends(get_db)):
-    try:
-        dataset_id = uuid.uuid4()
-        file_bytes = await file.read()
 
-        if not file_bytes:
-            raise HTTPException(status_code=400, detail="Uploaded file is empty")
+async def _spool_to_tempfile(file: UploadFile) -> tuple[str, int, str]:
+    """
+    Копирует загрузку во временный файл кусками по UPLOAD_CHUNK_SIZE,
+    по пути считая sha256 (без второго прохода по файлу).
+    Возвращает (path, size_bytes, sha256). Удалять файл должен вызывающий код.
+    """
+    suffix = os.path.splitext(file.filename or "")[1]
+    size = 0
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        try:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                tmp.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+        except Exception:
+            tmp.close()
+            os.unlink(tmp.name)
+            raise
+    return tmp.name, size, digest.hexdigest()
+
+
+async def _find_duplicate(content_sha256: str, size_bytes: int):
+    # только завершённые загрузки: идущая ещё может упасть, упавшую можно повторить
+    return await fetch_one(
+        select(Dataset.id, Dataset.result)
+        .where(
+            Dataset.content_sha256 == content_sha256,
+            Dataset.size_bytes == size_bytes,
+            Dataset.status == "done",
+        )
+        .order_by(Dataset.created_at)
+        .limit(1)
+    )
+
+
+def _duplicate_response(row) -> Dict[str, Any]:
+    """
+    Ответ на повторную загрузку: уже обработанный датасет и результат его пайплайна
+    (тип, U, метод, предсказание) со строки datasets.
+    """
+    dataset_id = str(row["id"])
+    return {
+        "dataset_id": dataset_id,
+        "job_id": dataset_id,
+        "status": "done",
+        "status_url": f"/datasets/{dataset_id}/status",
+        "duplicate": True,
+        "result": json.loads(row["result"]) if row["result"] else None,
+    }
+
+
+def _set_dataset_status(dataset_id: uuid.UUID, status: str, result: Optional[Dict[str, Any]] = None):
+    with engine.begin() as conn:
+        conn.execute(
+            update(Dataset).where(Dataset.id == dataset_id).values(status=status, result=dumps_json(result))
+        )
+
 
-        # 1) upload to Supabase
-        storage_path = upload_dataset(
-            file_bytes=file_bytes,
-            filename=file.filename,
+def _columnar_copy(dataset_id: uuid.UUID, tmp_path: str, filename: str) -> tuple[Optional[str], Dict[str, Any]]:
+    """
+    CSV -> Parquet рядом с оригиналом в хранилище.
+    Возвращает (локальный путь копии или None, сведения для ответа). Удалять копию должен вызывающий код.
+    """
+    local = tmp_path + ".parquet"
+    try:
+        with span("columnar.convert"):
+            stats = convert_csv_to_parquet(tmp_path, local)
+        upload = upload_dataset_file(
+            path=local,
+            filename=f"{filename}.parquet",
             dataset_id=str(dataset_id),
-            content_type=file.content_type
+            content_type=PARQUET_CONTENT_TYPE,
         )
+    except Exception as e:
+        # не CSV, нет pyarrow, ошибка хранилища: всё читает исходный файл
+        if os.path.exists(local):
+            os.unlink(local)
+        return None, {"storage_path": None, "error": str(e)}
+    stats.pop("types")
+    return local, {"storage_path": upload.storage_path, **stats}
+
 
-        # 2) insert datasets row
-        dataset_row = Dataset(
-            id=dataset_id,
-            original_filename=file.filename,
-            bucket=SUPABASE_BUCKET,
-            storage_path=storage_path,
-            size_bytes=len(file_bytes),
-            mime_type=file.content_type
+def _process_upload(
+    dataset_id: uuid.UUID,
+    tmp_path: str,
+    filename: str,
+    content_type: str | None,
+    size_bytes: int,
+    content_sha256: str | None = None,
+):
+    """
+    Выполняется в пуле фоновых задач: storage upload, колоночная копия, запись в datasets, pipeline.
+    Итог (done + результат или failed) записывается в строку datasets — по нему работает дедупликация.
+    Временный файл удаляется в конце в любом случае.
+    """
+    columnar_local = None
+    stored = False
+    try:
+        # 1) upload to storage (стримим с диска, без копии в памяти)
+        storage = get_storage()
+        upload = upload_dataset_file(
+            path=tmp_path,
+            filename=filename,
+            dataset_id=str(dataset_id),
+            content_type=content_type
         )
-        db.add(dataset_row)
-        db.commit()
+        storage_path = upload.storage_path
 
-        # 3) academic pipeline: compute U, select method, run predict on first row (or NLP triples)
-        pipeline_result = run_after_upload(file_bytes)
+        # 2) типизированная колоночная копия: U-индекс, майнинг и скоринг не парсят CSV заново
+        columnar = None
+        if COLUMNAR_CACHE:
+            columnar_local, columnar = _columnar_copy(dataset_id, tmp_path, filename)
 
-        return {
+        # 3) insert datasets row
+        db = SessionLocal()
+        try:
+            dataset_row = Dataset(
+                id=dataset_id,
+                original_filename=filename,
+                bucket=storage.bucket,
+                storage_path=storage_path,
+                size_bytes=size_bytes,
+                mime_type=content_type,
+                columnar_path=columnar["storage_path"] if columnar else None,
+                content_sha256=content_sha256,
+                status="processing",
+            )
+            db.add(dataset_row)
+            db.commit()
+            stored = True
+        finally:
+            db.close()
+
+        # 4) academic pipeline: compute U, select method, run predict on first row (or NLP triples)
+        with span("upload.pipeline"):
+            pipeline_result = run_after_upload(tmp_path, columnar=columnar_local, dataset_id=str(dataset_id))
+
+        result = {
             "dataset_id": str(dataset_id),
-            "bucket": SUPABASE_BUCKET,
+            "bucket": storage.bucket,
             "storage_path": storage_path,
+            "storage": {
+                "backend": storage.name,
+                "elapsed_sec": upload.elapsed_sec,
+                "attempts": upload.attempts,
+            },
+            "columnar": columnar,
             **pipeline_result
         }
+        _set_dataset_status(dataset_id, "done", result)
+        return result
+    except Exception:
+        if stored:
+            _set_dataset_status(dataset_id, "failed")
+        raise
+    finally:
+        for p in (tmp_path, columnar_local):
+            if p and os.path.exists(p):
+                os.unlink(p)
+
+
+@router.post("/upload", status_code=202)
+async def upload_dataset_endpoint(response: Response, file: UploadFile = File(...)):
+    """
+    Принимает файл и сразу возвращает dataset_id (он же id задачи).
+    Тяжёлая часть выполняется в фоне; результат — через GET /datasets/{id}/status.
+    Тот же файл повторно (совпал sha256) не сохраняется и не обрабатывается:
+    200 с dataset_id уже сохранённого датасета и duplicate=true.
+    """
+    tmp_path = None
+    try:
+        dataset_id = uuid.uuid4()
+        tmp_path, size_bytes, content_sha256 = await _spool_to_tempfile(file)
+
+        if size_bytes == 0:
+            raise HTTPException(status_code=400, detail="Uploaded file is empty")
+
+        if UPLOAD_DEDUP:
+            row = await _find_duplicate(content_sha256, size_bytes)
+            if row is not None:
+                response.status_code = 200
+                return _duplicate_response(row)
+
+        job = await run_in_threadpool(
+            jobs.submit,
+            str(dataset_id),
+            _process_upload,
+            dataset_id, tmp_path, file.filename, file.content_type, size_bytes, content_sha256,
+            dataset_id=str(dataset_id),
+        )
+        # файл теперь принадлежит задаче
+        tmp_path = None
+
+        return {
+            "dataset_id": str(dataset_id),
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": f"/datasets/{dataset_id}/status",
+        }
 
     except HTTPException:
         raise
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+@router.get("/{dataset_id}/status")
+async def upload_status(dataset_id: uuid.UUID):
+    job = await jobs.find(str(dataset_id))
+    if job is not None:
+        return job.to_dict()
+
+    # запись о задаче уже удалена (старше JOB_RESULT_TTL_SEC): итог — на строке datasets
+    row = await fetch_one(
+        select(
+            Dataset.id, Dataset.bucket, Dataset.storage_path, Dataset.columnar_path, Dataset.status, Dataset.result
+        ).where(Dataset.id == dataset_id)
+    )
+    if row is None:
+        raise HTTPException(status_code=404, detail="Unknown dataset id")
+    if row["result"]:
+        result = json.loads(row["result"])
+    else:
+        result = {
+            "dataset_id": str(row["id"]),
+            "bucket": row["bucket"],
+            "storage_path": row["storage_path"],
+            "columnar_path": row["columnar_path"],
+        }
+    return {
+        "job_id": str(dataset_id),
+        # строки до migrations/009 — без статуса
+        "status": row["status"] or "stored",
+        "result": result,
+        "error": None,
+    }
+
+
+@router.post("/{dataset_id}/score", status_code=202)
+async def score_dataset_endpoint(
+    dataset_id: uuid.UUID,
+    dataset: Optional[str] = None,
+    model: Optional[str] = None,
+    version: Optional[str] = None,
+    to_table: bool = False,
+):
+    """
+    Предсказания для всех строк загруженного файла (в фоне, чанками).
+    Читается колоночная копия файла, если она есть.
+    Результат — CSV в хранилище (results/<dataset_id>/<job_id>.csv),
+    с to_table=true — ещё и строки в таблице predictions.
+    dataset (bank/credit) по умолчанию определяется по файлу.
+    """
+    row = await fetch_one(select(Dataset.storage_path, Dataset.columnar_path).where(Dataset.id == dataset_id))
+    if row is None:
+        raise HTTPException(status_code=404, detail="Unknown dataset id")
+    if dataset is not None and registry.resolve(dataset, model, version, split=False) is None:
+        raise HTTPException(status_code=404, detail=f"No model for dataset={dataset}, model={model}, version={version}")
+
+    job_id = f"score-{uuid.uuid4()}"
+    try:
+        job = await run_in_threadpool(
+            jobs.submit,
+            job_id,
+            score_dataset,
+            engine, dataset_id, row["columnar_path"] or row["storage_path"], job_id, dataset, model, version, to_table,
+            progress=lambda p: jobs.set_progress(job_id, p),
+            dataset_id=str(dataset_id),
+        )
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return {
+        "dataset_id": str(dataset_id),
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/datasets/{dataset_id}/score/{job.id}",
+    }
+
+
+@router.get("/{dataset_id}/score/{job_id}")
+async def score_status(dataset_id: uuid.UUID, job_id: str):
+    """
+    Статус скоринга; progress — {"rows", "chunks", "fraction", "rows_per_sec"}.
+    Задача могла быть принята другим воркером: статус читается из таблицы jobs.
+    Чужая задача (другой dataset_id) — 404 в любом состоянии, не только после завершения.
+    """
+    if not job_id.startswith("score-"):
+        raise HTTPException(status_code=404, detail="Unknown scoring job")
+    job = await jobs.find(job_id)
+    if job is None or job.dataset_id != str(dataset_id):
+        raise HTTPException(status_code=404, detail="Unknown scoring job")
+    return job.to_dict()
@@ -2,22 +2,33 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
 from sqlalchemy import text
 
-from app.database import engine
+from app.database import fetch_all, pool_status
+from app.services.pagination import decode_cursor, next_cursor
+from app.services.runtime_metrics import runtime_metrics
 
 router = APIRouter(tags=["metrics"])
 
 
 @router.get("/metrics")
-def get_metrics(dataset: str | None = None, limit: int = 20):
+async def get_metrics(dataset: str | None = None, limit: int = 20, cursor: str | None = None):
     """
     MVP: отдаём последние метрики из таблицы metrics.
     dataset: optional filter (bank/credit/news)
+    cursor: next_cursor предыдущей страницы (keyset по created_at, id)
     """
     if limit <= 0 or limit > 200:
         raise HTTPException(status_code=400, detail="limit must be between 1 and 200")
 
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
     q = """
     SELECT
       id, dataset, model,
@@ -32,12 +43,31 @@ def get_metrics(dataset: str | None = None, limit: int = 20):
         q += " AND dataset = :dataset"
         params["dataset"] = dataset
 
+    if after is not None:
+        q += " AND (created_at, id) < (:cursor_created_at, :cursor_id)"
+        params["cursor_created_at"], params["cursor_id"] = after
+
     q += " ORDER BY created_at DESC, id DESC LIMIT :limit"
 
     try:
-        with engine.connect() as conn:
-            rows = conn.execute(text(q), params).mappings().all()
-        return {"count": len(rows), "items": rows}
+        rows = await fetch_all(text(q), params)
+        return {"count": len(rows), "items": rows, "next_cursor": next_cursor(rows, limit)}
     except Exception as e:
         # если таблицы metrics нет или другая проблема
-        raise HTTPException(status_code=500, detail=f"Metrics read error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Metrics read error: {str(e)}")
+
+
+@router.get("/metrics/pool")
+def get_pool_metrics():
+    """
+    Состояние пулов соединений: занято/свободно/overflow, очередь ожидающих и время ожидания.
+    """
+    return pool_status()
+
+
+@router.get("/metrics/runtime", response_class=PlainTextResponse)
+def get_runtime_metrics():
+    """
+    Гистограммы времени запросов и этапов по всем воркерам (текстовый формат Prometheus).
+    """
+    return PlainTextResponse(runtime_metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
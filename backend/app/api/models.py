@@ -0,0 +1,26 @@
+# backend/app/api/models.py
+from __future__ import annotations
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.services.model_registry import registry
+
+router = APIRouter(prefix="/models", tags=["models"])
+
+
+@router.get("")
+def models_status():
+    """
+    Состояние бандлов: загружен ли, ошибка, размер и время загрузки каждого артефакта.
+    """
+    return registry.status()
+
+
+@router.get("/ready")
+def models_ready():
+    """
+    Readiness: 200, когда модели готовы обслуживать запросы, иначе 503.
+    """
+    status = registry.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
@@ -1,50 +1,223 @@
 # backend/app/api/predict.py
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException
+import json
+from io import BytesIO
+from typing import Iterator, List, Optional
+
+import pandas as pd
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.config import PREDICT_BATCH_MAX_ROWS, PREDICT_MICROBATCH
 from app.schemas.predict import PredictRequest
-from app.services.model_registry import registry
-from app.services.validation import align_features
+from app.services.inference import predict_frame, predict_ready
+from app.services.micro_batcher import batchers
+from app.services.model_registry import ModelBundle, registry
+from app.services.prediction_cache import cache_key, prediction_cache
+from app.services.runtime_metrics import span
+from app.services.validation import align_features, align_features_batch
 
 router = APIRouter(tags=["predict"])
 
+# сколько NDJSON-строк отдаём за один chunk ответа
+STREAM_CHUNK_ROWS = 1000
 
-@router.post("/predict")
-def predict(req: PredictRequest):
-    dataset = req.dataset.lower()
 
-    if dataset == "bank":
-        bundle = registry.bank
-    elif dataset == "credit":
-        bundle = registry.credit
-    else:
-        raise HTTPException(status_code=400, detail="dataset must be 'bank' or 'credit'")
+def resolve_bundle(
+    dataset: str,
+    model: Optional[str] = None,
+    version: Optional[str] = None,
+    split: bool = True,
+) -> ModelBundle:
+    """
+    Бандл из реестра по (dataset, model, version). Без model/version — значения
+    по умолчанию из манифеста (или A/B-разбиение, если split=True).
+    """
+    dataset = dataset.lower()
+
+    if dataset not in registry.datasets():
+        raise HTTPException(status_code=400, detail=f"dataset must be one of {registry.datasets()}")
+
+    if (model or version) and registry.resolve(dataset, model, version) is None:
+        raise HTTPException(status_code=404, detail=f"Model not found: {dataset}/{model or '*'}/{version or '*'}")
 
+    bundle = registry.get(dataset, model, version, split)
     if bundle is None:
         raise HTTPException(status_code=503, detail="Model bundle not loaded")
+    return bundle
+
+
+@router.post("/predict")
+def predict(req: PredictRequest, response: Response):
+    dataset = req.dataset.lower()
+    bundle = resolve_bundle(dataset, req.model, req.version)
+
+    # 0) Кэш ответов по (бандл, канонизированный вектор признаков)
+    key = cache_key(bundle, req.features)
+    cached = prediction_cache.get(key)
+    if cached is not None:
+        response.headers["X-Cache"] = "HIT"
+        return {"dataset": dataset, "model": bundle.model_name, "version": bundle.version, **cached}
+    response.headers["X-Cache"] = "MISS"
 
+    result = _predict_one(bundle, req.features)
+    prediction_cache.set(key, result)
+    return {"dataset": dataset, "model": bundle.model_name, "version": bundle.version, **result}
+
+
+def _predict_one(bundle: ModelBundle, features: dict) -> dict:
+    # 1) Быстрый путь: скомпилированное дерево прямо по dict (None — вход не поддерживается)
+    fast = None
+    if bundle.compiled is not None:
+        with span("compiled_tree.predict"):
+            fast = bundle.compiled.predict_one(features)
+    if fast is not None:
+        return {"prediction": fast[0], "probability": fast[1]}
+
+    # 2) Микробатч: одновременные запросы к бандлу считаются одним transform + predict_proba
+    if PREDICT_MICROBATCH:
+        future = _batcher(bundle).submit(features)
+        if future is not None:
+            return future.result()
+
+    return _predict_sklearn(bundle, features)
+
+
+def _batcher(bundle: ModelBundle):
+    def _score(rows: List[dict]) -> List[dict]:
+        preds, probs = predict_frame(bundle, align_features_batch(rows, bundle.feature_columns))
+        return [
+            {"prediction": p, "probability": probs[i] if probs is not None else None}
+            for i, p in enumerate(preds)
+        ]
+
+    return batchers.get(
+        (bundle.dataset, bundle.model_name, bundle.version, bundle.revision),
+        f"{bundle.dataset}/{bundle.model_name}/{bundle.version}",
+        _score,
+        # упавший батч пересчитывается по строкам: каждый запрос получает свою ошибку
+        lambda features: _predict_sklearn(bundle, features),
+    )
+
+
+def _predict_sklearn(bundle: ModelBundle, features: dict) -> dict:
     # 1) Align columns
-    X = align_features(req.features, bundle.feature_columns)
+    X = align_features(features, bundle.feature_columns)
 
     # 2) Preprocess
     try:
-        X_ready = bundle.preprocess.transform(X)
+        with span("preprocess.transform"):
+            X_ready = bundle.preprocess.transform(X)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Preprocess error: {str(e)}")
 
-    # 3) Predict + probability
+    # 3) Predict + probability (один проход predict_proba)
     try:
-        pred = bundle.model.predict(X_ready)[0]
-        # predict_proba may not exist in some models
-        if hasattr(bundle.model, "predict_proba"):
-            prob = float(bundle.model.predict_proba(X_ready)[0, 1])
-        else:
-            prob = None
+        preds, probs = predict_ready(bundle.model, X_ready)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Model prediction error: {str(e)}")
 
     return {
-        "dataset": dataset,
-        "prediction": int(pred) if str(pred).isdigit() else pred,
-        "probability": prob
-    }
\ No newline at end of file
+        "prediction": preds[0],
+        "probability": probs[0] if probs is not None else None
+    }
+
+
+@router.get("/predict/cache")
+def predict_cache_stats():
+    """
+    Счётчики кэша /predict (hits/misses — по этому воркеру).
+    """
+    return prediction_cache.stats()
+
+
+@router.get("/predict/batcher")
+def predict_batcher_stats():
+    """
+    Микробатчинг /predict: размеры батчей, ожидание в очереди и время счёта (гистограммы, мс).
+    """
+    return {"enabled": PREDICT_MICROBATCH, "batchers": batchers.stats()}
+
+
+def _parse_batch_body(body: bytes, content_type: str) -> pd.DataFrame | List[dict]:
+    """
+    Поддерживаемые форматы тела:
+    - text/csv                          -> CSV с заголовком
+    - application/x-ndjson, jsonl       -> один JSON-объект на строку
+    - application/json                  -> массив объектов или {"rows": [...]}
+    """
+    ct = (content_type or "").split(";")[0].strip().lower()
+
+    if ct in ("text/csv", "application/csv"):
+        return pd.read_csv(BytesIO(body))
+
+    if ct in ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines"):
+        return pd.read_json(BytesIO(body), lines=True, dtype=False, convert_dates=False)
+
+    data = json.loads(body)
+    if isinstance(data, dict) and "rows" in data:
+        data = data["rows"]
+    if not isinstance(data, list) or not all(isinstance(r, dict) for r in data):
+        raise ValueError("JSON body must be an array of feature objects or {\"rows\": [...]}")
+    return data
+
+
+def _stream_ndjson(preds: List, probs: Optional[List[float]]) -> Iterator[bytes]:
+    out = pd.DataFrame({
+        "index": range(len(preds)),
+        "prediction": preds,
+        "probability": probs if probs is not None else [None] * len(preds),
+    })
+    # сериализация кусками через pandas (C-уровень), без json.dumps на каждую строку
+    for start in range(0, len(out), STREAM_CHUNK_ROWS):
+        chunk = out.iloc[start:start + STREAM_CHUNK_ROWS]
+        text = chunk.to_json(orient="records", lines=True, double_precision=15)
+        yield (text if text.endswith("\n") else text + "\n").encode("utf-8")
+
+
+@router.post("/predict/batch")
+async def predict_batch(request: Request, dataset: str, model: Optional[str] = None, version: Optional[str] = None):
+    """
+    Пакетный скоринг: тысячи строк за один запрос.
+    Строки выравниваются в один DataFrame, затем один transform и один predict_proba.
+    Ответ стримится как NDJSON: {"index", "prediction", "probability"} на строку.
+    model/version — выбор бандла; фактический — в заголовках X-Model / X-Model-Version.
+    """
+    dataset = dataset.lower()
+    bundle = resolve_bundle(dataset, model, version)
+
+    body = await request.body()
+    if not body:
+        raise HTTPException(status_code=400, detail="Request body is empty")
+
+    try:
+        rows = await run_in_threadpool(_parse_batch_body, body, request.headers.get("content-type", ""))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Batch parse error: {str(e)}")
+
+    if len(rows) == 0:
+        raise HTTPException(status_code=400, detail="Batch contains no rows")
+    if len(rows) > PREDICT_BATCH_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"Batch too large: max {PREDICT_BATCH_MAX_ROWS} rows")
+
+    def _score():
+        X = align_features_batch(rows, bundle.feature_columns)
+        return predict_frame(bundle, X)
+
+    # CPU-работа уходит в threadpool, чтобы не блокировать event loop
+    try:
+        preds, probs = await run_in_threadpool(_score)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Batch prediction error: {str(e)}")
+
+    return StreamingResponse(
+        _stream_ndjson(preds, probs),
+        media_type="application/x-ndjson",
+        headers={
+            "X-Batch-Rows": str(len(preds)),
+            "X-Model": bundle.model_name,
+            "X-Model-Version": bundle.version,
+        },
+    )
@@ -1,32 +1,50 @@
 # backend/app/api/rules.py
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException
+import numpy as np
+from fastapi import APIRouter, HTTPException, Request, Response
 from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
 
-from app.database import engine
-from app.schemas.rules import RulesRequest
+from app.config import PREDICT_BATCH_MAX_ROWS, RULES_CACHE_ENABLED
+from app.database import fetch_all
+from app.api.predict import resolve_bundle
+from app.services.model_registry import registry
+from app.schemas.rules import RuleMatchRequest, RulesRequest
+from app.services.pagination import decode_cursor, next_cursor
+from app.services.rule_cache import RULE_COLUMNS, rule_cache
+from app.services.rule_engine import compile_rules, get_compiled, match_rows, ready_feature_names
+from app.services.validation import align_features_batch
 
 router = APIRouter(tags=["rules"])
 
 
-@router.post("/rules")
-def get_rules(req: RulesRequest):
-    if req.limit <= 0 or req.limit > 500:
-        raise HTTPException(status_code=400, detail="limit must be between 1 and 500")
+def _etag(tag: str, req: RulesRequest) -> str:
+    # tag — отпечаток содержимого таблицы rules, общий для всех воркеров
+    return f'W/"rules-{tag}-{req.dataset}-{req.source}-{req.limit}-{req.cursor}"'
+
 
-    q = """
-    SELECT
-      id, dataset, source, rule_if, rule_then,
-      probability, coverage,
-      support, confidence, lift,
-      freq, created_at
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+async def _query_db(req: RulesRequest, after=None):
+    q = f"""
+    SELECT {RULE_COLUMNS}
     FROM rules
     WHERE 1=1
     """
 
     params = {"limit": req.limit}
 
+    if after is not None:
+        # keyset: индекс (dataset, source, created_at DESC, id DESC) -> поиск, без OFFSET-скана
+        q += " AND (created_at, id) < (:cursor_created_at, :cursor_id)"
+        params["cursor_created_at"], params["cursor_id"] = after
+
     if req.dataset:
         q += " AND dataset = :dataset"
         params["dataset"] = req.dataset
@@ -35,9 +53,95 @@ def get_rules(req: RulesRequest):
         q += " AND source = :source"
         params["source"] = req.source
 
+    # без OFFSET: следующая страница — по курсору, глубокие страницы стоят как первая
     q += " ORDER BY created_at DESC, id DESC LIMIT :limit"
 
-    with engine.connect() as conn:
-        rows = conn.execute(text(q), params).mappings().all()
+    return await fetch_all(text(q), params)
+
+
+@router.post("/rules")
+async def get_rules(req: RulesRequest, request: Request, response: Response):
+    if req.limit <= 0 or req.limit > 500:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 500")
+    if req.offset:
+        raise HTTPException(status_code=400, detail="offset is not supported, page with cursor (next_cursor)")
+
+    after = None
+    if req.cursor:
+        try:
+            after = decode_cursor(req.cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    # горячий путь: снимок в памяти, БД не трогаем
+    cached = rule_cache.query(req.dataset, req.source, req.limit, after) if RULES_CACHE_ENABLED else None
+    if cached is None:
+        rows = await _query_db(req, after)
+        return {"count": len(rows), "items": rows, "next_cursor": next_cursor(rows, req.limit)}
+
+    rows, tag = cached
+    etag = _etag(tag, req)
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    response.headers["ETag"] = etag
+    return {"count": len(rows), "items": rows, "next_cursor": next_cursor(rows, req.limit)}
+
+
+# поля правила, которые отдаём вместе с совпадениями
+MATCH_RULE_FIELDS = ("id", "source", "rule_if", "rule_then", "probability", "coverage", "support", "confidence", "lift")
+
+
+@router.post("/rules/match")
+async def match_rules(req: RuleMatchRequest):
+    """
+    Применяет извлечённые правила (DecisionTree / Apriori) к батчу строк.
+    Правила компилируются один раз на версию набора и вычисляются векторно.
+    Ответ: для каждой строки — id сработавших правил; метаданные правил — один раз в "rules".
+    """
+    if not req.rows:
+        raise HTTPException(status_code=400, detail="rows must not be empty")
+    if len(req.rows) > PREDICT_BATCH_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"Batch too large: max {PREDICT_BATCH_MAX_ROWS} rows")
+
+    # матчинг не участвует в A/B: всегда бандл по умолчанию
+    bundle = resolve_bundle(req.dataset, split=False)
+
+    cached = rule_cache.items(req.dataset, req.source) if RULES_CACHE_ENABLED else None
+    if cached is not None:
+        rules, version = cached
+        key = (req.dataset, req.source, version, registry.generation)
+    else:
+        rules = await _query_db(RulesRequest(dataset=req.dataset, source=req.source, limit=1_000_000))
+        key = None
+
+    def _match():
+        if key is not None:
+            compiled = get_compiled(key, rules, bundle)
+        else:
+            compiled = compile_rules(rules, ready_feature_names(bundle), bundle.feature_columns)
+        X = align_features_batch(req.rows, bundle.feature_columns)
+        return compiled, X, match_rows(compiled, bundle, X)
+
+    # компиляция и матчинг — CPU, уходят в threadpool
+    try:
+        compiled, X, (row_idx, rule_idx) = await run_in_threadpool(_match)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Rule matching error: {str(e)}")
+
+    # группируем пары (строка, правило) по строкам
+    bounds = np.searchsorted(row_idx, np.arange(len(X) + 1))
+    rule_ids = np.asarray([r["id"] for r in compiled.rules], dtype=np.int64)[rule_idx] if len(rule_idx) else rule_idx
+    per_row = np.split(rule_ids, bounds[1:-1])
 
-    return {"count": len(rows), "items": rows}
\ No newline at end of file
+    fired = {int(i) for i in np.unique(rule_idx)}
+    return {
+        "count": len(X),
+        "matched_rows": int(np.count_nonzero(np.diff(bounds))),
+        "unresolved_rules": compiled.unresolved,
+        "rules": {
+            str(compiled.rules[i]["id"]): {k: compiled.rules[i].get(k) for k in MATCH_RULE_FIELDS}
+            for i in sorted(fired)
+        },
+        "items": [{"index": i, "rule_ids": ids.tolist()} for i, ids in enumerate(per_row)],
+    }
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,4 +9,118 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 SUPABASE_BUCKET = os.getenv("SUPABASE_BUCKET", "datasets")
 ENV = os.getenv("ENV", "development")
-CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*")
\ No newline at end of file
+CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*")
+PREDICT_BATCH_MAX_ROWS = int(os.getenv("PREDICT_BATCH_MAX_ROWS", "100000"))
+
+# фоновая обработка загрузок
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "32"))
+JOB_RESULT_TTL_SEC = float(os.getenv("JOB_RESULT_TTL_SEC", "3600"))
+# статусы задач пишутся в таблицу jobs (общая для воркеров); прогресс скоринга — не чаще раза в N секунд
+JOB_PROGRESS_WRITE_SEC = float(os.getenv("JOB_PROGRESS_WRITE_SEC", "1"))
+# повторная загрузка того же файла (sha256 содержимого уже в datasets) не хранится и не обрабатывается заново
+UPLOAD_DEDUP = os.getenv("UPLOAD_DEDUP", "true").lower() in ("1", "true", "yes")
+
+# хранилище датасетов: supabase | s3 | local | memory
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "supabase").lower()
+STORAGE_LOCAL_DIR = os.getenv("STORAGE_LOCAL_DIR", "storage_data")
+STORAGE_RETRIES = int(os.getenv("STORAGE_RETRIES", "3"))
+STORAGE_RETRY_BACKOFF_SEC = float(os.getenv("STORAGE_RETRY_BACKOFF_SEC", "0.5"))
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
+S3_ACCESS_KEY_ID = os.getenv("S3_ACCESS_KEY_ID")
+S3_SECRET_ACCESS_KEY = os.getenv("S3_SECRET_ACCESS_KEY")
+S3_REGION = os.getenv("S3_REGION")
+S3_MULTIPART_CHUNK_MB = int(os.getenv("S3_MULTIPART_CHUNK_MB", "8"))
+S3_MULTIPART_CONCURRENCY = int(os.getenv("S3_MULTIPART_CONCURRENCY", "4"))
+
+# U-индекс по всему файлу (чанками) вместо первых строк выборки
+U_INDEX_FULL_SCAN = os.getenv("U_INDEX_FULL_SCAN", "false").lower() in ("1", "true", "yes")
+U_INDEX_CHUNK_ROWS = int(os.getenv("U_INDEX_CHUNK_ROWS", "100000"))
+
+# кэш правил в памяти процесса
+RULES_CACHE_ENABLED = os.getenv("RULES_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RULES_CACHE_CHECK_SEC = float(os.getenv("RULES_CACHE_CHECK_SEC", "30"))
+
+# пул соединений с БД
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_RECYCLE_SEC = int(os.getenv("DB_POOL_RECYCLE_SEC", "1800"))
+DB_POOL_TIMEOUT_SEC = float(os.getenv("DB_POOL_TIMEOUT_SEC", "30"))
+# pre-ping = лишний round-trip на каждый checkout; с recycle его можно выключить
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# асинхронный движок (asyncpg) для async-хендлеров
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+
+# загрузка моделей: eager (на старте, блокирующе) | background (на старте, в фоне) | lazy (при первом запросе)
+MODELS_LOAD_MODE = os.getenv("MODELS_LOAD_MODE", "eager").lower()
+MODELS_LOAD_WORKERS = int(os.getenv("MODELS_LOAD_WORKERS", "4"))
+# joblib.load(mmap_mode="r"): массивы делятся между форкнутыми воркерами
+MODELS_MMAP = os.getenv("MODELS_MMAP", "true").lower() in ("1", "true", "yes")
+# как часто проверять ARTIFACTS_DIR на новые/изменённые модели (0 — не следить)
+MODELS_RELOAD_SEC = float(os.getenv("MODELS_RELOAD_SEC", "10"))
+# компилировать DecisionTree + препроцессинг в быстрый путь для /predict (с самопроверкой)
+MODELS_COMPILE = os.getenv("MODELS_COMPILE", "true").lower() in ("1", "true", "yes")
+
+# кэш ответов /predict: memory (в процессе) | sqlite (общий для воркеров одной машины) | redis | off
+PREDICT_CACHE_BACKEND = os.getenv("PREDICT_CACHE_BACKEND", "memory").lower()
+PREDICT_CACHE_SIZE = int(os.getenv("PREDICT_CACHE_SIZE", "10000"))
+PREDICT_CACHE_TTL_SEC = float(os.getenv("PREDICT_CACHE_TTL_SEC", "300"))
+PREDICT_CACHE_SQLITE_PATH = os.getenv("PREDICT_CACHE_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "predict_cache.sqlite"))
+REDIS_URL = os.getenv("REDIS_URL")
+
+# микробатчинг одиночных /predict (для моделей без скомпилированного быстрого пути)
+PREDICT_MICROBATCH = os.getenv("PREDICT_MICROBATCH", "true").lower() in ("1", "true", "yes")
+PREDICT_MICROBATCH_MAX_SIZE = int(os.getenv("PREDICT_MICROBATCH_MAX_SIZE", "64"))
+PREDICT_MICROBATCH_MAX_WAIT_MS = float(os.getenv("PREDICT_MICROBATCH_MAX_WAIT_MS", "2"))
+
+# NLP по всему новостному корпусу после загрузки (пул процессов; 0 воркеров = доля ядер на веб-воркер)
+NLP_CORPUS_MINING = os.getenv("NLP_CORPUS_MINING", "true").lower() in ("1", "true", "yes")
+NLP_WORKERS = int(os.getenv("NLP_WORKERS", "0"))
+NLP_CHUNK_ROWS = int(os.getenv("NLP_CHUNK_ROWS", "2000"))
+NLP_MIN_FREQ = int(os.getenv("NLP_MIN_FREQ", "1"))
+NLP_TOP_N = int(os.getenv("NLP_TOP_N", "1000"))
+
+# поиск правил (Apriori / DecisionTree) по всему загруженному табличному файлу
+RULE_MINING = os.getenv("RULE_MINING", "true").lower() in ("1", "true", "yes")
+# процессы-воркеры (spawn): одновременно майнится не больше стольких файлов;
+# -1 — доля ядер на веб-воркер (одно ядро — в текущем процессе), см. cpu_quota.pool_workers
+MINING_WORKERS = int(os.getenv("MINING_WORKERS", "-1"))
+MINING_CHUNK_ROWS = int(os.getenv("MINING_CHUNK_ROWS", "100000"))
+# выборка для границ бинов, частых категорий и обучения дерева
+MINING_SAMPLE_ROWS = int(os.getenv("MINING_SAMPLE_ROWS", "200000"))
+# целевые колонки по типу датасета: "bank:deposit,credit:loan_status" (иначе — последняя колонка)
+MINING_TARGETS = os.getenv("MINING_TARGETS", "bank:deposit,credit:loan_status")
+MINING_NUM_BINS = int(os.getenv("MINING_NUM_BINS", "4"))
+MINING_MAX_CATEGORIES = int(os.getenv("MINING_MAX_CATEGORIES", "20"))
+MINING_MIN_SUPPORT = float(os.getenv("MINING_MIN_SUPPORT", "0.05"))
+MINING_MIN_CONFIDENCE = float(os.getenv("MINING_MIN_CONFIDENCE", "0.6"))
+MINING_MAX_LEN = int(os.getenv("MINING_MAX_LEN", "4"))
+MINING_MAX_ITEMSETS = int(os.getenv("MINING_MAX_ITEMSETS", "200000"))
+# битовые множества Apriori: строк x признаков / 8 байт; больше — майним по равномерной выборке строк
+MINING_BITSET_MB = int(os.getenv("MINING_BITSET_MB", "256"))
+MINING_DT_MAX_DEPTH = int(os.getenv("MINING_DT_MAX_DEPTH", "6"))
+MINING_DT_MIN_SAMPLES = int(os.getenv("MINING_DT_MIN_SAMPLES", "20"))
+MINING_TOP_N = int(os.getenv("MINING_TOP_N", "500"))
+# сколько найденных майнингом правил хранить на (dataset, source): старые вытесняются (0 — без ограничения)
+MINING_MAX_STORED_RULES = int(os.getenv("MINING_MAX_STORED_RULES", "5000"))
+
+# пакетный скоринг загруженного датасета целиком (пул процессов; 0 — в потоке задачи,
+# -1 — доля ядер на веб-воркер, а при одном ядре — в потоке задачи с уже загруженной моделью)
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", "-1"))
+SCORING_CHUNK_ROWS = int(os.getenv("SCORING_CHUNK_ROWS", "50000"))
+
+# типизированная колоночная копия загрузки (Parquet, нужен pyarrow): U-индекс, майнинг и скоринг читают её, а не CSV
+COLUMNAR_CACHE = os.getenv("COLUMNAR_CACHE", "true").lower() in ("1", "true", "yes")
+# строковые колонки с не больше чем столькими значениями хранятся словарём (читаются как category)
+COLUMNAR_DICT_MAX_VALUES = int(os.getenv("COLUMNAR_DICT_MAX_VALUES", "1000"))
+COLUMNAR_BLOCK_MB = int(os.getenv("COLUMNAR_BLOCK_MB", "16"))
+
+# гистограммы времени запросов и этапов (GET /metrics/runtime, формат Prometheus)
+RUNTIME_METRICS = os.getenv("RUNTIME_METRICS", "true").lower() in ("1", "true", "yes")
+# каталог, через который складываются снимки воркеров uvicorn/gunicorn;
+# по умолчанию — общий для воркеров одного мастер-процесса
+RUNTIME_METRICS_DIR = os.getenv(
+    "RUNTIME_METRICS_DIR", os.path.join(tempfile.gettempdir(), f"runtime-metrics-{os.getppid()}")
+)
+RUNTIME_METRICS_FLUSH_SEC = float(os.getenv("RUNTIME_METRICS_FLUSH_SEC", "5"))
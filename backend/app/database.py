@@ -1,18 +1,191 @@
+import threading
+import time
+from dataclasses import dataclass
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
-from app.config import DATABASE_URL
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import run_in_threadpool
+
+from app.config import (
+    DATABASE_URL,
+    DB_ASYNC,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE_SEC,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT_SEC,
+    DB_STATEMENT_CACHE_SIZE,
+)
+from app.services.runtime_metrics import instrument_engine
+
+
+@dataclass
+class PoolStats:
+    checkouts: int = 0
+    waiters: int = 0
+    max_waiters: int = 0
+    wait_total_sec: float = 0.0
+    wait_max_sec: float = 0.0
+
+
+_pool_stats = {"sync": PoolStats(), "async": PoolStats()}
+_pool_stats_lock = threading.Lock()
+
+
+class _TimedPoolMixin:
+    """
+    Считает ожидание свободного соединения в пуле: сколько запросов ждут сейчас,
+    суммарное и максимальное время ожидания.
+    """
+
+    stats_key = "sync"
+
+    def _do_get(self):
+        stats = _pool_stats[self.stats_key]
+        with _pool_stats_lock:
+            stats.waiters += 1
+            stats.max_waiters = max(stats.max_waiters, stats.waiters)
+        t0 = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            dt = time.perf_counter() - t0
+            with _pool_stats_lock:
+                stats.waiters -= 1
+                stats.checkouts += 1
+                stats.wait_total_sec += dt
+                stats.wait_max_sec = max(stats.wait_max_sec, dt)
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    stats_key = "sync"
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    stats_key = "async"
+
+
+_pool_kwargs = dict(
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_recycle=DB_POOL_RECYCLE_SEC,
+    pool_timeout=DB_POOL_TIMEOUT_SEC,
+    pool_pre_ping=DB_POOL_PRE_PING,
+)
 
 engine = create_engine(
     DATABASE_URL,
-    pool_pre_ping=True,
+    poolclass=TimedQueuePool,
+    **_pool_kwargs,
 )
 
+instrument_engine(engine)
+
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
     bind=engine
 )
 
+
+# параметры строки подключения libpq, которых asyncpg не принимает
+_LIBPQ_ONLY_PARAMS = ("sslmode", "sslrootcert", "sslcert", "sslkey", "channel_binding", "connect_timeout")
+
+
+def _async_url(url: str) -> tuple[str, dict]:
+    """
+    URL для asyncpg и его connect_args. sslmode=require (Neon, Supabase) asyncpg в URL
+    отвергает: режим переносится в connect_args["ssl"], остальные libpq-параметры отбрасываются.
+    """
+    u = make_url(url)
+    connect_args = {}
+    if u.drivername in ("postgresql", "postgresql+psycopg2", "postgres"):
+        u = u.set(drivername="postgresql+asyncpg")
+    if u.drivername == "postgresql+asyncpg":
+        sslmode = u.query.get("sslmode")
+        if sslmode:
+            # asyncpg понимает те же имена режимов: disable, allow, prefer, require, verify-ca, verify-full
+            connect_args["ssl"] = sslmode
+        u = u.difference_update_query(_LIBPQ_ONLY_PARAMS)
+    return u.render_as_string(hide_password=False), connect_args
+
+
+# асинхронный движок (asyncpg) — включается DB_ASYNC=true
+async_engine = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    _async_database_url, _async_connect_args = _async_url(DATABASE_URL)
+    async_engine = create_async_engine(
+        _async_database_url,
+        poolclass=TimedAsyncQueuePool,
+        # statement_cache_size=0 нужен за pgbouncer/Neon pooler в transaction mode
+        connect_args={"statement_cache_size": DB_STATEMENT_CACHE_SIZE, **_async_connect_args},
+        **_pool_kwargs,
+    )
+    instrument_engine(async_engine.sync_engine)
+
+
+async def fetch_all(statement, params=None):
+    """
+    SELECT -> список dict. Через asyncpg, если включён async_engine,
+    иначе синхронный движок в threadpool (event loop не блокируется).
+    """
+    if async_engine is not None:
+        async with async_engine.connect() as conn:
+            result = await conn.execute(statement, params or {})
+            return [dict(r) for r in result.mappings().all()]
+
+    def _run():
+        with engine.connect() as conn:
+            return [dict(r) for r in conn.execute(statement, params or {}).mappings().all()]
+
+    return await run_in_threadpool(_run)
+
+
+async def fetch_one(statement, params=None):
+    rows = await fetch_all(statement, params)
+    return rows[0] if rows else None
+
+
+def _pool_snapshot(pool, key: str):
+    stats = _pool_stats[key]
+    with _pool_stats_lock:
+        waits = {
+            "checkouts": stats.checkouts,
+            "waiters": stats.waiters,
+            "max_waiters": stats.max_waiters,
+            "wait_avg_ms": (stats.wait_total_sec / stats.checkouts * 1000.0) if stats.checkouts else 0.0,
+            "wait_max_ms": stats.wait_max_sec * 1000.0,
+        }
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        **waits,
+    }
+
+
+def pool_status():
+    out = {"sync": _pool_snapshot(engine.pool, "sync")}
+    if async_engine is not None:
+        out["async"] = _pool_snapshot(async_engine.sync_engine.pool, "async")
+    return out
+
+
+def dispose_after_fork():
+    """
+    Вызывается в дочернем процессе после fork (gunicorn --preload): соединения,
+    открытые в мастере, не закрываются (они принадлежат ему), а только забываются —
+    воркер откроет свои.
+    """
+    engine.dispose(close=False)
+    if async_engine is not None:
+        async_engine.sync_engine.dispose(close=False)
+
 # backend/app/database.py (добавьте в конец)
 from typing import Generator
 
@@ -21,4 +194,4 @@ def get_db() -> Generator:
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -0,0 +1,16 @@
+# backend/app/gunicorn_worker.py
+from __future__ import annotations
+
+from uvicorn.workers import UvicornWorker
+
+# Воркер gunicorn для FastAPI (см. gunicorn.conf.py).
+# Стандартный UvicornWorker ждёт открытые соединения без ограничения, и по истечении
+# graceful_timeout мастер убивает воркер до lifespan shutdown: микробатчи и фоновые задачи
+# не досчитываются. Здесь на соединения отводится половина graceful_timeout,
+# вторая половина остаётся на shutdown-хуки приложения.
+
+
+class Worker(UvicornWorker):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.config.timeout_graceful_shutdown = max(1, int(self.cfg.graceful_timeout) // 2)
@@ -3,10 +3,17 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.datasets import router as datasets_router
 from app.api.predict import router as predict_router
-from app.services.model_registry import load_all_models
+from app.services.model_registry import load_all_models, registry
 from app.api.rules import router as rules_router
 from app.api.metrics import router as metrics_router
-from app.config import CORS_ORIGINS
+from app.api.models import router as models_router
+from app.config import CORS_ORIGINS, MODELS_LOAD_MODE, RULES_CACHE_ENABLED
+from app.services.jobs import jobs
+from app.services.micro_batcher import batchers
+from app.services.prediction_cache import prediction_cache
+from app.services.rule_cache import rule_cache
+from app.services.runtime_metrics import TimingMiddleware, runtime_metrics
+from app.services import batch_scoring, rule_mining
 
 app = FastAPI(title="Adaptive ML Knowledge Extraction API")
 
@@ -20,11 +27,35 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# время запросов по шаблону маршрута -> GET /metrics/runtime
+app.add_middleware(TimingMiddleware)
 
 @app.on_event("startup")
 def startup_event():
-    # Загружаем joblib артефакты в память
-    load_all_models()
+    # Загружаем joblib артефакты в память (lazy — при первом запросе)
+    if MODELS_LOAD_MODE == "eager":
+        load_all_models()
+    elif MODELS_LOAD_MODE == "background":
+        registry.start_background()
+    # горячая перезагрузка моделей при изменении ARTIFACTS_DIR; кэш /predict сбрасывается
+    registry.on_reload(prediction_cache.on_reload)
+    registry.on_reload(batchers.reset)
+    registry.start_watcher()
+    # кэш правил: первичная загрузка + фоновое обновление
+    if RULES_CACHE_ENABLED:
+        rule_cache.start()
+    runtime_metrics.start()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    rule_cache.stop()
+    registry.stop_watcher()
+    batchers.reset()
+    # дожидаемся фоновых загрузок, чтобы не оставлять их на полпути
+    jobs.shutdown(wait=True)
+    rule_mining.shutdown()
+    batch_scoring.shutdown()
+    runtime_metrics.stop()
 
 @app.get("/health")
 def health():
@@ -33,4 +64,5 @@ def health():
 app.include_router(datasets_router)
 app.include_router(predict_router)
 app.include_router(rules_router)
-app.include_router(metrics_router)
\ No newline at end of file
+app.include_router(metrics_router)
+app.include_router(models_router)
\ No newline at end of file
@@ -3,7 +3,7 @@ from __future__ import annotations
 
 import uuid
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import String, BigInteger, TIMESTAMP, text
+from sqlalchemy import String, BigInteger, Text, TIMESTAMP, text
 
 
 class Base(DeclarativeBase):
@@ -19,4 +19,11 @@ class Dataset(Base):
     storage_path: Mapped[str] = mapped_column(String, nullable=False)
     size_bytes: Mapped[int] = mapped_column(BigInteger, nullable=False)
     mime_type: Mapped[str | None] = mapped_column(String, nullable=True)
+    # sha256 содержимого загрузки (дедупликация повторных загрузок)
+    content_sha256: Mapped[str | None] = mapped_column(String, nullable=True)
+    # Parquet-копия storage_path (app/services/columnar.py)
+    columnar_path: Mapped[str | None] = mapped_column(String, nullable=True)
+    # processing | done | failed и результат пайплайна загрузки (JSON)
+    status: Mapped[str | None] = mapped_column(String, nullable=True)
+    result: Mapped[str | None] = mapped_column(Text, nullable=True)
     created_at: Mapped[str] = mapped_column(TIMESTAMP, server_default=text("NOW()"), nullable=False)
\ No newline at end of file
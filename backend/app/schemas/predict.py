@@ -1,8 +1,11 @@
 # backend/app/schemas/predict.py
 from pydantic import BaseModel
-from typing import Any, Dict, Literal
+from typing import Any, Dict, Literal, Optional
 
 
 class PredictRequest(BaseModel):
     dataset: Literal["bank", "credit"]
-    features: Dict[str, Any]
\ No newline at end of file
+    features: Dict[str, Any]
+    # модель/версия из манифеста артефактов; по умолчанию — default манифеста
+    model: Optional[str] = None
+    version: Optional[str] = None
\ No newline at end of file
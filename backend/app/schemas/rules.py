@@ -1,9 +1,19 @@
 # backend/app/schemas/rules.py
 from pydantic import BaseModel
-from typing import Optional, Literal
+from typing import Any, Dict, List, Optional, Literal
 
 
 class RulesRequest(BaseModel):
     dataset: Optional[Literal["bank", "credit", "news"]] = None
     source: Optional[Literal["DecisionTree", "Apriori", "NLP"]] = None
-    limit: int = 50
\ No newline at end of file
+    limit: int = 50
+    # устарело: листание только курсором; принимается лишь 0 (совместимость со старыми клиентами)
+    offset: int = 0
+    # keyset-курсор из next_cursor предыдущей страницы
+    cursor: Optional[str] = None
+
+
+class RuleMatchRequest(BaseModel):
+    dataset: Literal["bank", "credit"]
+    source: Optional[Literal["DecisionTree", "Apriori"]] = None
+    rows: List[Dict[str, Any]]
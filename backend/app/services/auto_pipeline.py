@@ -1,19 +1,50 @@
 from __future__ import annotations
+import traceback
 import pandas as pd
 from io import BytesIO
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Union
 
-from app.services.u_index import compute_U
+from app.config import NLP_CORPUS_MINING, RULE_MINING, U_INDEX_CHUNK_ROWS, U_INDEX_FULL_SCAN
+from app.database import engine
+from app.services.columnar import iter_frames
+from app.services.u_index import compute_U, compute_U_chunked
 from app.services.dataset_classifier import detect_dataset_type
 from app.services.method_selector import select_method
 from app.services.rules_loader import ensure_rules_exist
 from app.services.model_registry import registry
 from app.services.validation import align_features
+from app.services.inference import predict_frame
 from app.services.news_nlp import extract_triples_safe
+from app.services.nlp_corpus import mine_news_rules
+from app.services.rule_cache import rule_cache
+from app.services.rule_mining import is_minable, mine_rules
+from app.services.runtime_metrics import span
 
+# сколько строк читаем для расчёта (первых 200 строк достаточно)
+SAMPLE_ROWS = 200
 
-def run_after_upload(file_bytes: bytes) -> Dict[str, Any]:
+
+def read_sample(source: Union[str, bytes], nrows: int = SAMPLE_ROWS) -> pd.DataFrame:
+    """
+    Читает только первые nrows строк CSV: парсер останавливается,
+    не дочитывая файл, поэтому память ограничена размером выборки.
+    source — путь к файлу (spooled temp file загрузки) или bytes.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = BytesIO(source)
+    with span("read_csv"):
+        return pd.read_csv(source, nrows=nrows)
+
+
+def run_after_upload(
+    source: Union[str, bytes],
+    columnar: Optional[str] = None,
+    dataset_id: Optional[str] = None,
+) -> Dict[str, Any]:
     """
+    columnar — локальная колоночная копия source (Parquet): проходы по всему файлу читают её.
+    dataset_id — загрузка, которой помечаются найденные по файлу правила.
+    Ошибка майнинга не роняет загрузку: вместо статистики — {"error": ...}.
     Возвращает:
     - dataset_type
     - U
@@ -22,35 +53,55 @@ def run_after_upload(file_bytes: bytes) -> Dict[str, Any]:
     - prediction (если bank/credit)
     - nlp_triples (если news)
     """
-    # читаем небольшую часть для расчёта (первые 200 строк достаточно)
-    df = pd.read_csv(BytesIO(file_bytes))
-    df_head = df.head(200)
+    # читаем только небольшую часть для расчёта, а не весь файл
+    df_head = read_sample(source)
 
     dataset_type = detect_dataset_type(df_head)
-    U = compute_U(df_head, alpha=0.5, beta=0.5)
+    full = columnar or (source if isinstance(source, str) else None)
+    with span("compute_U"):
+        if U_INDEX_FULL_SCAN and full:
+            U = compute_U_chunked((frame for frame, _ in iter_frames(full, U_INDEX_CHUNK_ROWS)), alpha=0.5, beta=0.5)
+        else:
+            U = compute_U(df_head, alpha=0.5, beta=0.5)
     method = select_method(dataset_type, U)
 
     # гарантируем правила в БД (если нет — загрузим из JSON)
     ensure_rules_exist(dataset_type, method)
 
+    # правила по самому загруженному файлу (Apriori / DecisionTree), только для датасетов с известной целью
+    mining = None
+    if RULE_MINING and method in ("Apriori", "DecisionTree") and full and is_minable(dataset_type):
+        try:
+            with span("rule_mining"):
+                mining = mine_rules(engine, full, dataset_type, method, dataset_id=dataset_id)
+        except Exception as e:
+            traceback.print_exc()
+            mining = {"error": str(e)}
+        if mining.get("rules_written") or mining.get("rules_pruned"):
+            rule_cache.invalidate()
+
     preview_row = df_head.iloc[0].to_dict() if len(df_head) else {}
 
     if dataset_type in ("bank", "credit"):
-        bundle = registry.bank if dataset_type == "bank" else registry.credit
+        bundle = registry.get(dataset_type, split=False)
         if bundle is None:
-            return {"dataset_type": dataset_type, "U": U, "method": method, "preview": preview_row, "prediction": None}
+            return {
+                "dataset_type": dataset_type, "U": U, "method": method, "preview": preview_row,
+                "prediction": None, "rule_mining": mining,
+            }
 
         X = align_features(preview_row, bundle.feature_columns)
-        X_ready = bundle.preprocess.transform(X)
-        pred = bundle.model.predict(X_ready)[0]
-        prob = float(bundle.model.predict_proba(X_ready)[0, 1]) if hasattr(bundle.model, "predict_proba") else None
+        preds, probs = predict_frame(bundle, X)
+        pred = preds[0]
+        prob = probs[0] if probs is not None else None
 
         return {
             "dataset_type": dataset_type,
             "U": U,
             "method": method,
             "preview": preview_row,
-            "prediction": {"prediction": int(pred) if str(pred).isdigit() else pred, "probability": prob}
+            "prediction": {"prediction": pred, "probability": prob},
+            "rule_mining": mining,
         }
 
     if dataset_type == "news":
@@ -59,12 +110,26 @@ def run_after_upload(file_bytes: bytes) -> Dict[str, Any]:
         for _, row in df_head.head(3).iterrows():
             text = str(row.get("content", "")) or ""
             triples.extend(extract_triples_safe(text))
+
+        # весь корпус: триплеты по всем строкам -> правила NLP с частотами
+        corpus = None
+        if NLP_CORPUS_MINING and full:
+            try:
+                with span("nlp_corpus"):
+                    corpus = mine_news_rules(engine, full)
+            except Exception as e:
+                traceback.print_exc()
+                corpus = {"error": str(e)}
+            if corpus.get("rules_written"):
+                rule_cache.invalidate()
+
         return {
             "dataset_type": dataset_type,
             "U": U,
             "method": method,
             "preview": preview_row,
-            "nlp_triples": triples[:15]
+            "nlp_triples": triples[:15],
+            "nlp_corpus": corpus,
         }
 
-    return {"dataset_type": "unknown", "U": U, "method": method, "preview": preview_row}
\ No newline at end of file
+    return {"dataset_type": "unknown", "U": U, "method": method, "preview": preview_row, "rule_mining": mining}
\ No newline at end of file
@@ -0,0 +1,232 @@
+# backend/app/services/batch_scoring.py
+from __future__ import annotations
+
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import BigInteger, Column, Float, MetaData, String, Table, Uuid
+
+from app.config import SCORING_CHUNK_ROWS, SCORING_WORKERS
+from app.services.columnar import iter_frames, read_head
+from app.services.cpu_quota import pool_workers
+from app.services.dataset_classifier import detect_dataset_type
+from app.services.inference import predict_frame
+from app.services.model_registry import ModelBundle, registry
+from app.services.storage import get_storage, results_storage_path
+from app.services.validation import align_features_batch
+
+# Скоринг загруженного датасета целиком:
+# - файл из хранилища (колоночная копия, если есть, иначе CSV) читается чанками по SCORING_CHUNK_ROWS,
+#   только колонками признаков модели;
+# - чанк выравнивается в потоке задачи, transform + predict_proba — в пуле процессов;
+# - в полёте не больше 2 * workers чанков, результаты пишутся по порядку
+#   в CSV (потом — в хранилище results/<dataset_id>/<job_id>.csv) и, по желанию, в predictions.
+# Память ограничена размером чанка, а не файла.
+
+predictions_table = Table(
+    "predictions", MetaData(),
+    Column("dataset_id", Uuid), Column("job_id", String), Column("row_index", BigInteger),
+    Column("model", String), Column("version", String),
+    Column("prediction", String), Column("probability", Float),
+)
+
+BundleKey = Tuple[str, str, str]
+
+# размер пула с учётом числа веб-воркеров (SCORING_WORKERS=-1 — авто)
+WORKERS = pool_workers(SCORING_WORKERS)
+
+
+def _score_chunk(key: BundleKey, revision: str, X: pd.DataFrame) -> Tuple[List[Any], Optional[List[float]]]:
+    """
+    Выполняется в процессе-воркере: бандл грузится из реестра воркера один раз.
+    """
+    bundle = registry.get(*key, split=False)
+    if bundle is None:
+        raise RuntimeError(f"Model bundle {key} is not available")
+    if bundle.revision != revision:
+        raise RuntimeError(f"Model bundle {key} changed during scoring")
+    return predict_frame(bundle, X)
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: сервер многопоточный, fork из него небезопасен
+            _pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown(wait: bool = True):
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait)
+
+
+def _insert_predictions(engine, dataset_id: uuid.UUID, job_id: str, bundle: ModelBundle, out: pd.DataFrame):
+    rows = [
+        {
+            "dataset_id": dataset_id,
+            "job_id": job_id,
+            "row_index": int(i),
+            "model": bundle.model_name,
+            "version": bundle.version,
+            "prediction": None if p is None else str(p),
+            "probability": None if pr is None or pr != pr else float(pr),
+        }
+        for i, p, pr in zip(out["row_index"], out["prediction"], out["probability"])
+    ]
+    # транзакция на чанк: незавершённый прогон оставляет только целые чанки
+    with engine.begin() as conn:
+        conn.execute(predictions_table.insert(), rows)
+
+
+def score_file(
+    path: str,
+    bundle: ModelBundle,
+    out_path: str,
+    chunk_rows: int = SCORING_CHUNK_ROWS,
+    workers: int = WORKERS,
+    on_chunk: Optional[Callable[[pd.DataFrame], None]] = None,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Предсказания для всех строк path -> CSV out_path (row_index, prediction, probability).
+    on_chunk(out) — для каждого готового чанка по порядку (например, запись в таблицу).
+    """
+    key = (bundle.dataset, bundle.model_name, bundle.version)
+    t0 = time.perf_counter()
+    rows = 0
+    chunks = 0
+    pending: "deque[Tuple[Future, int, int, float]]" = deque()
+
+    with open(out_path, "w", encoding="utf-8", newline="") as f:
+
+        def _emit(preds, probs, start: int, n: int, fraction: float):
+            nonlocal rows, chunks
+            out = pd.DataFrame({
+                "row_index": range(start, start + n),
+                "prediction": preds,
+                "probability": probs if probs is not None else [None] * n,
+            })
+            out.to_csv(f, header=chunks == 0, index=False)
+            if on_chunk is not None:
+                on_chunk(out)
+            rows += n
+            chunks += 1
+            if progress is not None:
+                seconds = time.perf_counter() - t0
+                progress({
+                    "rows": rows,
+                    "chunks": chunks,
+                    "fraction": fraction,
+                    "rows_per_sec": rows / seconds if seconds > 0 else 0.0,
+                })
+
+        start = 0
+        try:
+            for frame, fraction in iter_frames(path, chunk_rows, columns=bundle.feature_columns):
+                X = align_features_batch(frame, bundle.feature_columns)
+                n = len(X)
+                if workers <= 0:
+                    preds, probs = predict_frame(bundle, X)
+                    _emit(preds, probs, start, n, fraction)
+                else:
+                    if len(pending) >= 2 * workers:
+                        fut, s, m, fr = pending.popleft()
+                        _emit(*fut.result(), s, m, fr)
+                    pending.append((_executor().submit(_score_chunk, key, bundle.revision, X), start, n, fraction))
+                start += n
+            while pending:
+                fut, s, m, fr = pending.popleft()
+                _emit(*fut.result(), s, m, fr)
+        except BrokenProcessPool:
+            # воркер убит (например, по памяти): следующий вызов создаст новый пул
+            shutdown(wait=False)
+            raise
+        finally:
+            for fut, *_ in pending:
+                fut.cancel()
+        if chunks == 0:
+            f.write("row_index,prediction,probability\n")
+
+    seconds = time.perf_counter() - t0
+    return {
+        "rows": rows,
+        "chunks": chunks,
+        "workers": max(workers, 0),
+        "seconds": seconds,
+        "rows_per_sec": rows / seconds if seconds > 0 else 0.0,
+    }
+
+
+def score_dataset(
+    engine,
+    dataset_id: uuid.UUID,
+    storage_path: str,
+    job_id: str,
+    dataset: Optional[str] = None,
+    model: Optional[str] = None,
+    version: Optional[str] = None,
+    to_table: bool = False,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Задача POST /datasets/{id}/score: файл из хранилища -> предсказания по всем строкам.
+    storage_path — колоночная копия (datasets.columnar_path), если она есть, иначе исходный файл.
+    Тип датасета (bank/credit) без явного dataset определяется по первым строкам.
+    """
+    storage = get_storage()
+    suffix = os.path.splitext(storage_path)[1]
+    fd, src = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    fd, out = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    try:
+        storage.get_file(storage_path, src)
+        if dataset is None:
+            dataset = detect_dataset_type(read_head(src, 200))
+        dataset = dataset.lower()
+        key = registry.resolve(dataset, model, version, split=False)
+        if key is None:
+            raise ValueError(f"No model for dataset={dataset!r}, model={model!r}, version={version!r}")
+        bundle = registry.get(*key, split=False)
+        if bundle is None:
+            raise RuntimeError(f"Model bundle {key} failed to load")
+
+        on_chunk = None
+        if to_table:
+            def on_chunk(frame: pd.DataFrame):
+                _insert_predictions(engine, dataset_id, job_id, bundle, frame)
+
+        stats = score_file(src, bundle, out, on_chunk=on_chunk, progress=progress)
+        upload = storage.put_file(results_storage_path(str(dataset_id), f"{job_id}.csv"), out, "text/csv")
+        return {
+            "dataset_id": str(dataset_id),
+            "dataset": dataset,
+            "model": bundle.model_name,
+            "version": bundle.version,
+            "results_path": upload.storage_path,
+            "results_bytes": upload.size_bytes,
+            "to_table": to_table,
+            **stats,
+        }
+    finally:
+        for p in (src, out):
+            if os.path.exists(p):
+                os.unlink(p)
@@ -0,0 +1,203 @@
+# backend/app/services/columnar.py
+from __future__ import annotations
+
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from app.config import COLUMNAR_BLOCK_MB, COLUMNAR_DICT_MAX_VALUES
+
+# Типизированная колоночная копия загруженного CSV (Parquet) и общее чтение CSV / Parquet чанками.
+# CSV разбирается один раз, при загрузке:
+# - проход 1: все колонки читаются как строки; для каждой находится самый узкий тип,
+#   в который приводятся все её значения (int64 -> float64 -> строка), и считаются различные строки.
+#   Как у pd.read_csv: числа с пробелами по краям (" 5") — числа, колонка только из
+#   True/False (true/TRUE, false/FALSE) — bool;
+# - проход 2: CSV читается уже с этими типами и по блокам пишется в Parquet;
+#   строки с небольшим числом значений хранятся словарём (в pandas читаются как category, а не object).
+# Тип выбирается по всему файлу: у блоков Parquet должна быть одна схема.
+# Parquet читается через memory map и только нужными колонками (U-индекс, майнинг, скоринг).
+
+PARQUET_CONTENT_TYPE = "application/vnd.apache.parquet"
+
+# значения, которые pd.read_csv читает как bool
+TRUE_VALUES = ["True", "TRUE", "true"]
+FALSE_VALUES = ["False", "FALSE", "false"]
+
+
+def is_parquet(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(4) == b"PAR1"
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.csv
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError("Parquet support requires the 'pyarrow' package") from e
+    return pyarrow
+
+
+def _csv_options(pa, block_mb: int):
+    read = pa.csv.ReadOptions(block_size=block_mb * 1024 * 1024)
+    return read, pa.csv.ParseOptions()
+
+
+def _infer_types(pa, src: str, block_mb: int, dict_max_values: int) -> Dict[str, Any]:
+    """
+    Проход 1: тип Arrow для каждой колонки по всем значениям файла.
+    """
+    read, parse = _csv_options(pa, block_mb)
+    with pa.csv.open_csv(src, read_options=read, parse_options=parse) as head:
+        names = head.schema.names
+    if len(set(names)) != len(names):
+        raise ValueError("CSV header has duplicate column names")
+
+    convert = pa.csv.ConvertOptions(
+        column_types={n: pa.string() for n in names},
+        strings_can_be_null=True,
+    )
+    kinds = {n: "int" for n in names}
+    # различные строки колонки, пока их не больше dict_max_values (потом — None)
+    distinct: Dict[str, Optional[set]] = {n: set() for n in names}
+    with pa.csv.open_csv(src, read_options=read, parse_options=parse, convert_options=convert) as reader:
+        for batch in reader:
+            for name, col in zip(names, batch.columns):
+                # приведение проверяем на различных значениях, если их мало, иначе — на всей колонке
+                probe = col
+                if distinct[name] is not None:
+                    values = pa.compute.unique(col.drop_null())
+                    if len(values) > dict_max_values:
+                        distinct[name] = None
+                    else:
+                        distinct[name].update(values.to_pylist())
+                        if len(distinct[name]) > dict_max_values:
+                            distinct[name] = None
+                        probe = values
+                if kinds[name] == "str":
+                    continue
+                # пробелы по краям числа не мешают ни pd.read_csv, ни парсеру Arrow в проходе 2
+                probe = pa.compute.utf8_trim_whitespace(probe)
+                for kind, target in (("int", pa.int64()), ("float", pa.float64())):
+                    if kinds[name] != kind:
+                        continue
+                    try:
+                        # сначала начало колонки: строковые колонки отсеиваются без полного прохода
+                        pa.compute.cast(probe.slice(0, 1000), target)
+                        pa.compute.cast(probe, target)
+                    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                        kinds[name] = "float" if kind == "int" else "str"
+
+    bool_values = set(TRUE_VALUES + FALSE_VALUES)
+    types = {}
+    for name in names:
+        if kinds[name] == "int":
+            types[name] = pa.int64()
+        elif kinds[name] == "float":
+            types[name] = pa.float64()
+        elif distinct[name] and distinct[name] <= bool_values:
+            types[name] = pa.bool_()
+        elif distinct[name] is not None:
+            types[name] = pa.dictionary(pa.int32(), pa.string())
+        else:
+            types[name] = pa.string()
+    return types
+
+
+def convert_csv_to_parquet(
+    src: str,
+    dest: str,
+    block_mb: int = COLUMNAR_BLOCK_MB,
+    dict_max_values: int = COLUMNAR_DICT_MAX_VALUES,
+) -> Dict[str, Any]:
+    """
+    CSV src -> Parquet dest за два потоковых прохода (память — порядка блока, а не файла).
+    Возвращает {"rows", "columns", "types", "size_bytes", "seconds"}.
+    """
+    pa = _pyarrow()
+    t0 = time.perf_counter()
+    types = _infer_types(pa, src, block_mb, dict_max_values)
+    read, parse = _csv_options(pa, block_mb)
+    convert = pa.csv.ConvertOptions(
+        column_types=types,
+        strings_can_be_null=True,
+        true_values=TRUE_VALUES,
+        false_values=FALSE_VALUES,
+    )
+    rows = 0
+    with pa.csv.open_csv(src, read_options=read, parse_options=parse, convert_options=convert) as reader:
+        with pa.parquet.ParquetWriter(dest, reader.schema) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+                rows += batch.num_rows
+    return {
+        "rows": rows,
+        "columns": len(types),
+        "types": {n: str(t) for n, t in types.items()},
+        "size_bytes": os.path.getsize(dest),
+        "seconds": time.perf_counter() - t0,
+    }
+
+
+def columns_of(path: str) -> List[str]:
+    if is_parquet(path):
+        pa = _pyarrow()
+        return list(pa.parquet.ParquetFile(path, memory_map=True).schema_arrow.names)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def _project(path: str, columns: Optional[Sequence[str]]) -> Optional[List[str]]:
+    # только существующие колонки, в порядке файла (как usecols у read_csv)
+    if columns is None:
+        return None
+    wanted = set(columns)
+    return [c for c in columns_of(path) if c in wanted]
+
+
+def iter_frames(
+    path: str,
+    chunk_rows: int,
+    columns: Optional[Sequence[str]] = None,
+    dtype: Optional[Dict[str, Any]] = None,
+) -> Iterator[Tuple[pd.DataFrame, float]]:
+    """
+    (чанк, доля прочитанного файла) для CSV или Parquet.
+    columns — только эти колонки (отсутствующие в файле пропускаются);
+    dtype — для CSV, у Parquet типы уже в файле.
+    """
+    cols = _project(path, columns)
+    if is_parquet(path):
+        pa = _pyarrow()
+        pf = pa.parquet.ParquetFile(path, memory_map=True)
+        total = pf.metadata.num_rows
+        done = 0
+        for batch in pf.iter_batches(batch_size=chunk_rows, columns=cols):
+            # split_blocks: числовые колонки без пропусков не копируются в общий блок
+            frame = batch.to_pandas(split_blocks=True)
+            done += len(frame)
+            yield frame, done / total if total else 1.0
+        return
+
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        for chunk in pd.read_csv(f, chunksize=chunk_rows, usecols=cols, dtype=dtype):
+            # парсер читает файл блоками, поэтому позиция — приблизительная
+            yield chunk, min(1.0, f.tell() / size) if size else 1.0
+
+
+def read_head(path: str, nrows: int, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    frames = []
+    n = 0
+    for frame, _ in iter_frames(path, nrows, columns):
+        frames.append(frame)
+        n += len(frame)
+        if n >= nrows:
+            break
+    if not frames:
+        return pd.DataFrame(columns=_project(path, columns) or [])
+    return pd.concat(frames, ignore_index=True).head(nrows) if len(frames) > 1 else frames[0]
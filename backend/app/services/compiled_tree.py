@@ -0,0 +1,248 @@
+# backend/app/services/compiled_tree.py
+from __future__ import annotations
+
+import math
+import numbers
+import traceback
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Быстрый путь инференса для одной строки: препроцессинг (SimpleImputer + KBinsDiscretizer
+# ordinal / SimpleImputer + OneHotEncoder) и обученное DecisionTreeClassifier
+# разворачиваются в плоские массивы, строка вычисляется прямо из dict без pandas/sklearn.
+# Дерево читает только признаки на своём пути, поэтому считаются только они.
+
+_NUM = 0
+_ONEHOT = 1
+
+
+class _Unsupported(Exception):
+    """Значение, которое быстрый путь не воспроизводит точно — уходим в sklearn."""
+
+
+@dataclass(frozen=True)
+class _ReadyFeature:
+    kind: int
+    column: str
+    # _NUM: медиана для пропусков и внутренние границы бинов (bin_edges[1:-1])
+    median: float = 0.0
+    edges: Tuple[float, ...] = ()
+    # _ONEHOT: категория колонки и значение, которым SimpleImputer заполняет NaN
+    category: Any = None
+    fill: Any = None
+
+
+def _num_value(f: _ReadyFeature, v: Any) -> float:
+    if v is None:
+        x = f.median
+    elif isinstance(v, numbers.Real) and not isinstance(v, (bool, np.bool_)):
+        x = float(v)
+        if math.isnan(x):
+            x = f.median
+        elif math.isinf(x):
+            raise _Unsupported
+    else:
+        raise _Unsupported
+    # = np.searchsorted(bin_edges[1:-1], x, side="right") в KBinsDiscretizer.transform
+    return float(bisect_right(f.edges, x))
+
+
+def _onehot_value(f: _ReadyFeature, v: Any) -> float:
+    if isinstance(v, str):
+        return 1.0 if v == f.category else 0.0
+    if v is None:
+        # None в object-колонке SimpleImputer не считает пропуском -> неизвестная категория
+        return 0.0
+    if isinstance(v, float) and math.isnan(v):
+        return 1.0 if f.fill == f.category else 0.0
+    raise _Unsupported
+
+
+class CompiledTree:
+    """
+    Плоское представление preprocess + DecisionTreeClassifier.
+    predict_one(features) возвращает (prediction, probability) бит-в-бит как
+    predict_proba sklearn, либо None, если вход не поддерживается (тогда — обычный путь).
+    """
+
+    def __init__(
+        self,
+        ready: List[_ReadyFeature],
+        tree: Any,
+        classes: np.ndarray,
+    ):
+        self.ready = ready
+        self.num_columns = tuple(dict.fromkeys(f.column for f in ready if f.kind == _NUM))
+        self.cat_columns = tuple(dict.fromkeys(f.column for f in ready if f.kind == _ONEHOT))
+        self.left = tree.children_left.tolist()
+        self.right = tree.children_right.tolist()
+        self.feature = tree.feature.tolist()
+        self.threshold = tree.threshold.tolist()
+        # в sklearn >= 1.4 tree_.value уже хранит доли классов: predict_proba = value[leaf]
+        proba = np.asarray(tree.value[:, 0, :len(classes)], dtype=np.float64)
+        self.leaf_proba = proba
+        self.leaf_prob1 = proba[:, 1].tolist() if proba.shape[1] > 1 else None
+        labels = classes.take(np.argmax(proba, axis=1))
+        self.leaf_pred = [_format_label(p) for p in labels.tolist()]
+
+    def _leaf(self, features: Dict[str, Any]) -> int:
+        left, right, feature, threshold, ready = self.left, self.right, self.feature, self.threshold, self.ready
+        node = 0
+        while left[node] != -1:
+            f = ready[feature[node]]
+            v = features.get(f.column)
+            x = _num_value(f, v) if f.kind == _NUM else _onehot_value(f, v)
+            # признаки после препроцессинга — целые (номер бина / 0-1), поэтому приведение
+            # к float32, которое делает sklearn перед сравнением, их не меняет
+            node = left[node] if x <= threshold[node] else right[node]
+        return node
+
+    def _supported(self, features: Dict[str, Any]) -> bool:
+        # проверяем все колонки, а не только те, что на пути в дереве:
+        # на некорректный вход sklearn отвечает ошибкой, и быстрый путь не должен её скрыть
+        for c in self.num_columns:
+            v = features.get(c)
+            t = type(v)
+            if t is float or t is int or v is None:
+                continue
+            if not isinstance(v, numbers.Real) or isinstance(v, (bool, np.bool_)):
+                return False
+        for c in self.cat_columns:
+            v = features.get(c)
+            t = type(v)
+            if t is str or v is None:
+                continue
+            if not (isinstance(v, float) and math.isnan(v)):
+                return False
+        return True
+
+    def predict_one(self, features: Dict[str, Any]) -> Optional[Tuple[Any, Optional[float]]]:
+        if not self._supported(features):
+            return None
+        try:
+            leaf = self._leaf(features)
+        except _Unsupported:
+            return None
+        prob = self.leaf_prob1[leaf] if self.leaf_prob1 is not None else None
+        return self.leaf_pred[leaf], prob
+
+
+def _format_label(p: Any) -> Any:
+    # как inference.predict_ready: числовые классы -> int
+    if isinstance(p, (int, np.integer)) and not isinstance(p, bool):
+        return int(p)
+    return int(p) if str(p).isdigit() else p
+
+
+def _pipeline_steps(pipe: Any) -> List[Any]:
+    return [s for _, s in pipe.steps] if hasattr(pipe, "steps") else [pipe]
+
+
+def _compile_preprocess(preprocess: Any, feature_columns: List[str]) -> List[_ReadyFeature]:
+    from sklearn.impute import SimpleImputer
+    from sklearn.preprocessing import KBinsDiscretizer, OneHotEncoder
+
+    if getattr(preprocess, "remainder", "drop") != "drop":
+        raise ValueError("remainder columns are not supported")
+
+    ready: List[_ReadyFeature] = []
+    for name, trans, cols in preprocess.transformers_:
+        if trans == "drop" or name == "remainder":
+            continue
+        cols = [feature_columns[c] if isinstance(c, (int, np.integer)) else c for c in cols]
+        steps = _pipeline_steps(trans)
+        types = [type(s) for s in steps]
+
+        if types == [SimpleImputer, KBinsDiscretizer]:
+            imp, kb = steps
+            if imp.strategy not in ("median", "mean") or imp.add_indicator or kb.encode != "ordinal":
+                raise ValueError(f"unsupported numeric pipeline in '{name}'")
+            for j, c in enumerate(cols):
+                ready.append(_ReadyFeature(
+                    kind=_NUM,
+                    column=c,
+                    median=float(imp.statistics_[j]),
+                    edges=tuple(float(e) for e in kb.bin_edges_[j][1:-1]),
+                ))
+        elif types == [SimpleImputer, OneHotEncoder]:
+            imp, oh = steps
+            if imp.add_indicator or oh.drop_idx_ is not None or oh.handle_unknown != "ignore":
+                raise ValueError(f"unsupported categorical pipeline in '{name}'")
+            if getattr(oh, "_infrequent_enabled", False):
+                raise ValueError("infrequent categories are not supported")
+            for j, c in enumerate(cols):
+                for cat in oh.categories_[j]:
+                    ready.append(_ReadyFeature(kind=_ONEHOT, column=c, category=cat, fill=imp.statistics_[j]))
+        else:
+            raise ValueError(f"unsupported transformer '{name}': {[t.__name__ for t in types]}")
+    return ready
+
+
+def _probe_rows(ready: List[_ReadyFeature], feature_columns: List[str], n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Строки для самопроверки: границы бинов и их окрестности, медианы, пропуски,
+    все категории и неизвестные значения.
+    """
+    rng = np.random.default_rng(seed)
+    values: Dict[str, List[Any]] = {c: [None, float("nan")] for c in feature_columns}
+    for f in ready:
+        if f.kind == _NUM:
+            vals = values[f.column]
+            vals.append(f.median)
+            for e in f.edges:
+                vals.extend([e, np.nextafter(e, -np.inf), np.nextafter(e, np.inf), e - 1.0, e + 1.0])
+        else:
+            values[f.column].extend([f.category, "__unknown__"])
+    rows = []
+    for _ in range(n):
+        rows.append({c: vals[rng.integers(len(vals))] for c, vals in values.items()})
+    return rows
+
+
+def verify(compiled: CompiledTree, model: Any, preprocess: Any, feature_columns: List[str], n: int = 512) -> int:
+    """
+    Сравнивает быстрый путь с preprocess.transform + predict_proba: класс и вероятность
+    должны совпасть точно (==), а не с допуском. Возвращает число несовпавших строк (0 — всё совпало).
+    """
+    rows = _probe_rows(compiled.ready, feature_columns, n)
+    X = pd.DataFrame.from_records(rows, columns=feature_columns)
+    proba = model.predict_proba(preprocess.transform(X))
+    labels = np.asarray(model.classes_).take(np.argmax(proba, axis=1)).tolist()
+    mismatches = 0
+    for i, row in enumerate(rows):
+        out = compiled.predict_one(row)
+        if (
+            out is None
+            or out[0] != _format_label(labels[i])
+            or (proba.shape[1] > 1 and out[1] != float(proba[i, 1]))
+        ):
+            mismatches += 1
+    return mismatches
+
+
+def compile_bundle(model: Any, preprocess: Any, feature_columns: List[str], name: str = "") -> Optional[CompiledTree]:
+    """
+    CompiledTree для пары (preprocess, DecisionTreeClassifier) или None, если
+    модель/препроцессинг не поддерживаются либо самопроверка не прошла (name — бандл для сообщения).
+    """
+    from sklearn.tree import DecisionTreeClassifier
+
+    if not isinstance(model, DecisionTreeClassifier) or model.n_outputs_ != 1:
+        return None
+    try:
+        ready = _compile_preprocess(preprocess, feature_columns)
+        if len(ready) != model.n_features_in_:
+            return None
+        compiled = CompiledTree(ready, model.tree_, np.asarray(model.classes_))
+        n = 512
+        mismatches = verify(compiled, model, preprocess, feature_columns, n)
+        if mismatches:
+            raise ValueError(f"compiled tree {name} does not match sklearn on {mismatches}/{n} probe rows")
+        return compiled
+    except Exception:
+        traceback.print_exc()
+        return None
@@ -0,0 +1,84 @@
+# backend/app/services/cpu_quota.py
+from __future__ import annotations
+
+import math
+import os
+from typing import Optional
+
+# Сколько ядер процессу реально доступно. os.cpu_count() в контейнере возвращает ядра хоста;
+# лимит контейнера — это квота CFS в cgroup (docker --cpus, Kubernetes limits.cpu)
+# и маска CPU (cpuset). Берётся меньшее, квота округляется вверх.
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_limit(root: str = CGROUP_ROOT) -> Optional[float]:
+    """
+    Квота CPU в ядрах (1.5 = полтора ядра) или None, если лимита нет.
+    cgroup v2: cpu.max "<quota> <period>" | "max <period>";
+    cgroup v1: cpu/cpu.cfs_quota_us (-1 — без лимита) и cpu/cpu.cfs_period_us.
+    """
+    v2 = _read(os.path.join(root, "cpu.max"))
+    if v2 is not None:
+        parts = v2.split()
+        if len(parts) == 2 and parts[0] != "max":
+            quota, period = int(parts[0]), int(parts[1])
+            return quota / period if quota > 0 and period > 0 else None
+        return None
+
+    quota = _read(os.path.join(root, "cpu", "cpu.cfs_quota_us"))
+    period = _read(os.path.join(root, "cpu", "cpu.cfs_period_us"))
+    if quota is None or period is None:
+        return None
+    q, p = int(quota), int(period)
+    return q / p if q > 0 and p > 0 else None
+
+
+def available_cpus() -> int:
+    """
+    Ядра, доступные процессу: min(маска CPU, квота cgroup), не меньше 1.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        cpus = os.cpu_count() or 1
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, math.ceil(limit))
+    return max(1, cpus)
+
+
+def web_workers() -> int:
+    """
+    Число веб-воркеров gunicorn на контейнер (gunicorn.conf.py выставляет WEB_CONCURRENCY
+    до импорта приложения); без gunicorn — один процесс.
+    """
+    return max(1, int(os.getenv("WEB_CONCURRENCY", "0") or 0) or 1)
+
+
+def worker_cpus() -> int:
+    """
+    Доля ядер на один веб-воркер: пулы процессов каждого воркера вместе не превышают
+    available_cpus(), а не available_cpus() * web_workers().
+    """
+    return max(1, available_cpus() // web_workers())
+
+
+def pool_workers(configured: int) -> int:
+    """
+    Размер пула процессов: configured >= 0 — как задано (0 — в текущем процессе);
+    < 0 — авто: worker_cpus(), а при одном ядре на воркер 0 — пул из одного процесса
+    не ускоряет работу, а лишь заново грузит модели в spawn-процессе.
+    """
+    if configured >= 0:
+        return configured
+    cpus = worker_cpus()
+    return cpus if cpus > 1 else 0
@@ -0,0 +1,127 @@
+# backend/app/services/histogram.py
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from typing import Any, Dict, List, Sequence, Tuple
+
+# границы по умолчанию для латентностей, мс
+LATENCY_BUCKETS_MS = (0.25, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class Histogram:
+    """
+    Потокобезопасная гистограмма с фиксированными верхними границами корзин
+    (как у Prometheus: значение попадает в первую корзину с границей >= значения).
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS_MS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+            self._count += 1
+            if value > self._max:
+                self._max = value
+
+    def _read(self) -> Tuple[List[int], int, float, float]:
+        # (счётчики корзин, число, сумма, максимум)
+        with self._lock:
+            return list(self._counts), self._count, self._sum, self._max
+
+    def quantile(self, q: float, counts=None, total=None, mx=None) -> float:
+        """
+        Оценка квантиля по корзинам (верхняя граница корзины).
+        """
+        if counts is None:
+            counts, total, _, mx = self._read()
+        mx = mx if mx is not None else self._max
+        if total == 0:
+            return 0.0
+        rank = q * total
+        acc = 0
+        for i, c in enumerate(counts):
+            acc += c
+            if acc >= rank:
+                return self.buckets[i] if i < len(self.buckets) else mx
+        return mx
+
+    def snapshot(self) -> Dict[str, Any]:
+        counts, total, s, mx = self._read()
+        cumulative = []
+        acc = 0
+        for c in counts:
+            acc += c
+            cumulative.append(acc)
+        return {
+            "count": total,
+            "sum": s,
+            "avg": s / total if total else 0.0,
+            "max": mx,
+            "p50": self.quantile(0.5, counts, total, mx),
+            "p95": self.quantile(0.95, counts, total, mx),
+            "p99": self.quantile(0.99, counts, total, mx),
+            # кумулятивные счётчики "<= le", последняя корзина — +Inf
+            "buckets": {**{str(b): n for b, n in zip(self.buckets, cumulative)}, "+Inf": total},
+        }
+
+
+class _Shard:
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self, n: int):
+        self.counts = [0] * n
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+
+class ShardedHistogram(Histogram):
+    """
+    Та же гистограмма без общей блокировки на запись: у каждого потока свои счётчики
+    (пишет в них только он), снимок складывает счётчики всех потоков.
+    Для горячих путей, где observe зовётся из многих потоков на каждый запрос.
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS_MS):
+        super().__init__(buckets)
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = _Shard(len(self.buckets) + 1)
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def observe(self, value: float):
+        shard = self._shard()
+        shard.counts[bisect_left(self.buckets, value)] += 1
+        shard.sum += value
+        shard.count += 1
+        if value > shard.max:
+            shard.max = value
+
+    def _read(self) -> Tuple[List[int], int, float, float]:
+        with self._lock:
+            shards = list(self._shards)
+        counts = [0] * (len(self.buckets) + 1)
+        total, s, mx = 0, 0.0, 0.0
+        for shard in shards:
+            for i, c in enumerate(shard.counts):
+                counts[i] += c
+            total += shard.count
+            s += shard.sum
+            mx = max(mx, shard.max)
+        return counts, total, s, mx
@@ -0,0 +1,49 @@
+# backend/app/services/inference.py
+from __future__ import annotations
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.services.model_registry import ModelBundle
+from app.services.runtime_metrics import span
+
+
+def format_prediction(pred: Any) -> Any:
+    # numpy-скаляры -> python; числовые классы отдаём как int
+    if isinstance(pred, np.generic):
+        pred = pred.item()
+    return int(pred) if str(pred).isdigit() else pred
+
+
+def predict_ready(model: Any, X_ready: Any) -> Tuple[List[Any], Optional[List[float]]]:
+    """
+    Один predict_proba на уже препроцессированную матрицу.
+    Класс выводится из вероятностей (argmax по classes_), как это делает sklearn,
+    поэтому второй проход model.predict не нужен.
+    Возвращает (predictions, probabilities | None).
+    """
+    if hasattr(model, "predict_proba") and hasattr(model, "classes_"):
+        with span("model.predict"):
+            proba = model.predict_proba(X_ready)
+        classes = np.asarray(model.classes_)
+        preds = classes.take(np.argmax(proba, axis=1))
+        # вероятность положительного класса (колонка 1), как в /predict
+        probs = proba[:, 1].astype(float).tolist() if proba.shape[1] > 1 else None
+    else:
+        with span("model.predict"):
+            preds = np.asarray(model.predict(X_ready))
+        probs = None
+
+    if preds.dtype.kind in "iu":
+        return preds.tolist(), probs
+    return [format_prediction(p) for p in preds.tolist()], probs
+
+
+def predict_frame(bundle: ModelBundle, X: pd.DataFrame) -> Tuple[List[Any], Optional[List[float]]]:
+    """
+    Один transform + один predict_proba на весь выровненный DataFrame.
+    """
+    with span("preprocess.transform"):
+        X_ready = bundle.preprocess.transform(X)
+    return predict_ready(bundle.model, X_ready)
@@ -0,0 +1,245 @@
+# backend/app/services/jobs.py
+from __future__ import annotations
+
+import json
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Literal, Optional
+
+from sqlalchemy import text
+
+from app.config import JOB_MAX_PENDING, JOB_PROGRESS_WRITE_SEC, JOB_RESULT_TTL_SEC, JOB_WORKERS
+from app.database import engine, fetch_one
+
+JobStatus = Literal["queued", "running", "done", "failed"]
+
+
+class QueueFullError(RuntimeError):
+    pass
+
+
+@dataclass
+class Job:
+    id: str
+    status: JobStatus = "queued"
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    # долгие задачи (скоринг) сообщают ход выполнения через set_progress
+    progress: Optional[Dict[str, Any]] = None
+    # загрузка, к которой относится задача (проверка владельца в статусе)
+    dataset_id: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": self.progress,
+        }
+
+
+def _json_default(v: Any):
+    # numpy-скаляры и массивы в результатах пайплайна
+    if hasattr(v, "tolist"):
+        return v.tolist()
+    return str(v)
+
+
+def dumps_json(v: Optional[Dict[str, Any]]) -> Optional[str]:
+    return None if v is None else json.dumps(v, default=_json_default)
+
+
+class JobStore:
+    """
+    Статусы задач в таблице jobs (migrations/006_jobs.sql): задача выполняется в принявшем
+    её воркере, а запрос статуса может прийти в любой. Ошибка записи не роняет задачу —
+    в своём процессе статус всё равно есть в памяти.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def _execute(self, sql: str, params: Dict[str, Any]):
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(text(sql), params)
+        except Exception:
+            traceback.print_exc()
+
+    def insert(self, job: Job, cutoff: float):
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(text("DELETE FROM jobs WHERE finished_at < :cutoff"), {"cutoff": cutoff})
+                conn.execute(
+                    text(
+                        "INSERT INTO jobs (id, status, created_at, dataset_id) "
+                        "VALUES (:id, :status, :created_at, :dataset_id)"
+                    ),
+                    {"id": job.id, "status": job.status, "created_at": job.created_at, "dataset_id": job.dataset_id},
+                )
+        except Exception:
+            traceback.print_exc()
+
+    def update(self, job: Job):
+        self._execute(
+            "UPDATE jobs SET status = :status, result = :result, error = :error, progress = :progress, "
+            "started_at = :started_at, finished_at = :finished_at WHERE id = :id",
+            {
+                "id": job.id,
+                "status": job.status,
+                "result": dumps_json(job.result),
+                "error": job.error,
+                "progress": dumps_json(job.progress),
+                "started_at": job.started_at,
+                "finished_at": job.finished_at,
+            },
+        )
+
+    def update_progress(self, job: Job):
+        self._execute("UPDATE jobs SET progress = :progress WHERE id = :id", {"id": job.id, "progress": dumps_json(job.progress)})
+
+    async def find(self, job_id: str) -> Optional[Job]:
+        row = await fetch_one(text("SELECT * FROM jobs WHERE id = :id"), {"id": job_id})
+        if row is None:
+            return None
+        return Job(
+            id=row["id"],
+            status=row["status"],
+            result=json.loads(row["result"]) if row["result"] else None,
+            error=row["error"],
+            created_at=row["created_at"],
+            started_at=row["started_at"],
+            finished_at=row["finished_at"],
+            progress=json.loads(row["progress"]) if row["progress"] else None,
+            dataset_id=row.get("dataset_id"),
+        )
+
+
+class LocalJobQueue:
+    """
+    Очередь фоновых задач в пределах процесса: ограниченный пул потоков
+    + таблица статусов в памяти, продублированная в store (общая для всех воркеров).
+    Интерфейс (submit/get/find) минимальный, чтобы позже заменить реализацию на Redis/RQ без изменения API.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_pending: int,
+        result_ttl_sec: float,
+        store: Optional[JobStore] = None,
+        progress_write_sec: float = 1.0,
+    ):
+        self._workers = workers
+        self._max_pending = max_pending
+        self._result_ttl_sec = result_ttl_sec
+        self._store = store
+        self._progress_write_sec = progress_write_sec
+        self._progress_written: Dict[str, float] = {}
+        self._executor: ThreadPoolExecutor | None = None
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="job")
+        return self._executor
+
+    def _pending(self) -> int:
+        return sum(1 for j in self._jobs.values() if j.status in ("queued", "running"))
+
+    def _evict_finished(self):
+        cutoff = time.time() - self._result_ttl_sec
+        stale = [k for k, j in self._jobs.items() if j.finished_at is not None and j.finished_at < cutoff]
+        for k in stale:
+            del self._jobs[k]
+            self._progress_written.pop(k, None)
+
+    def submit(
+        self,
+        job_id: str,
+        fn: Callable[..., Dict[str, Any]],
+        *args,
+        dataset_id: Optional[str] = None,
+        **kwargs,
+    ) -> Job:
+        """
+        С store — синхронная запись в БД: из async-кода вызывать через run_in_threadpool.
+        dataset_id — загрузка, к которой относится задача (в fn не передаётся).
+        """
+        with self._lock:
+            self._evict_finished()
+            if self._pending() >= self._max_pending:
+                raise QueueFullError(f"Job queue is full ({self._max_pending} pending)")
+            job = Job(id=job_id, dataset_id=dataset_id)
+            self._jobs[job_id] = job
+
+        # строка в jobs появляется до ответа клиенту: статус виден из любого воркера сразу
+        if self._store is not None:
+            self._store.insert(job, cutoff=time.time() - self._result_ttl_sec)
+        self._get_executor().submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job: Job, fn: Callable[..., Dict[str, Any]], args, kwargs):
+        job.status = "running"
+        job.started_at = time.time()
+        if self._store is not None:
+            self._store.update(job)
+        try:
+            job.result = fn(*args, **kwargs)
+            job.status = "done"
+        except Exception as e:
+            traceback.print_exc()
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            if self._store is not None:
+                self._store.update(job)
+
+    def set_progress(self, job_id: str, progress: Dict[str, Any]):
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        job.progress = progress
+        # в БД — не чаще раза в progress_write_sec
+        now = time.monotonic()
+        if self._store is not None and now - self._progress_written.get(job_id, 0.0) >= self._progress_write_sec:
+            self._progress_written[job_id] = now
+            self._store.update_progress(job)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    async def find(self, job_id: str) -> Optional[Job]:
+        """
+        Задача этого процесса — из памяти, иначе (другой воркер, перезапуск) — из store.
+        """
+        job = self._jobs.get(job_id)
+        if job is None and self._store is not None:
+            job = await self._store.find(job_id)
+        return job
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+jobs = LocalJobQueue(
+    workers=JOB_WORKERS,
+    max_pending=JOB_MAX_PENDING,
+    result_ttl_sec=JOB_RESULT_TTL_SEC,
+    store=JobStore(engine),
+    progress_write_sec=JOB_PROGRESS_WRITE_SEC,
+)
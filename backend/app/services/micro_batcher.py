@@ -0,0 +1,190 @@
+# backend/app/services/micro_batcher.py
+from __future__ import annotations
+
+import queue
+import threading
+import time
+import traceback
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from app.config import PREDICT_MICROBATCH_MAX_SIZE, PREDICT_MICROBATCH_MAX_WAIT_MS
+from app.services.histogram import Histogram
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+_STOP = object()
+
+
+@dataclass
+class _Item:
+    payload: Any
+    future: Future = field(default_factory=Future)
+    enqueued: float = field(default_factory=time.perf_counter)
+
+
+class MicroBatcher:
+    """
+    Динамический батчинг одиночных запросов к одной модели.
+    - submit() кладёт запрос в очередь и возвращает Future;
+    - поток-обработчик берёт первый запрос и добирает следующие, пока не наберёт
+      max_batch_size или не истечёт max_wait_ms с момента прихода первого;
+    - batch_fn(payloads) -> results считается один раз на весь батч;
+    - если batch_fn упал, запросы батча считаются по одному через single_fn,
+      чтобы ошибка одного запроса не доставалась соседям.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        single_fn: Optional[Callable[[Any], Any]],
+        max_batch_size: int,
+        max_wait_ms: float,
+    ):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.single_fn = single_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_sec = max(0.0, max_wait_ms) / 1000.0
+        self._q: "queue.Queue[Any]" = queue.Queue()
+        self.queue_wait_ms = Histogram()
+        self.compute_ms = Histogram()
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+        self.fallbacks = 0
+        self._stopped = False
+        self._state_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=f"microbatch-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, payload: Any) -> Optional[Future]:
+        """
+        Future с результатом или None, если батчер уже остановлен (считаем без него).
+        """
+        item = _Item(payload)
+        with self._state_lock:
+            if self._stopped:
+                return None
+            self._q.put(item)
+        return item.future
+
+    def _collect(self, first: _Item) -> tuple[List[_Item], bool]:
+        batch = [first]
+        deadline = first.enqueued + self.max_wait_sec
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                # после дедлайна забираем только то, что уже лежит в очереди
+                item = self._q.get(timeout=timeout) if timeout > 0 else self._q.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _process(self, batch: List[_Item]):
+        t0 = time.perf_counter()
+        for it in batch:
+            self.queue_wait_ms.observe((t0 - it.enqueued) * 1000.0)
+        self.batch_size.observe(len(batch))
+        try:
+            results = self.batch_fn([it.payload for it in batch])
+            for it, r in zip(batch, results):
+                it.future.set_result(r)
+        except Exception as e:
+            if self.single_fn is None:
+                for it in batch:
+                    it.future.set_exception(e)
+            else:
+                self.fallbacks += 1
+                for it in batch:
+                    try:
+                        it.future.set_result(self.single_fn(it.payload))
+                    except Exception as err:
+                        it.future.set_exception(err)
+        self.compute_ms.observe((time.perf_counter() - t0) * 1000.0)
+
+    def _run(self):
+        while True:
+            first = self._q.get()
+            if first is _STOP:
+                return
+            batch, stop = self._collect(first)
+            try:
+                self._process(batch)
+            except Exception:
+                traceback.print_exc()
+                for it in batch:
+                    if not it.future.done():
+                        it.future.set_exception(RuntimeError("micro-batch processing failed"))
+            if stop:
+                return
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Уже поставленные в очередь запросы досчитываются, затем поток завершается.
+        """
+        with self._state_lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._q.put(_STOP)
+        self._thread.join(timeout=timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_sec * 1000.0,
+            "queued": self._q.qsize(),
+            "fallbacks": self.fallbacks,
+            "batch_size": self.batch_size.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+            "compute_ms": self.compute_ms.snapshot(),
+        }
+
+
+class BatcherPool:
+    """
+    По одному MicroBatcher на бандл. reset() (при перезагрузке моделей)
+    останавливает старые — новые создаются при следующем запросе.
+    """
+
+    def __init__(self, max_batch_size: int, max_wait_ms: float):
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._batchers: Dict[Hashable, MicroBatcher] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        key: Hashable,
+        name: str,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        single_fn: Optional[Callable[[Any], Any]] = None,
+    ) -> MicroBatcher:
+        b = self._batchers.get(key)
+        if b is not None:
+            return b
+        with self._lock:
+            b = self._batchers.get(key)
+            if b is None:
+                b = self._batchers[key] = MicroBatcher(
+                    name, batch_fn, single_fn, self.max_batch_size, self.max_wait_ms
+                )
+            return b
+
+    def reset(self, *_):
+        with self._lock:
+            old = list(self._batchers.values())
+            self._batchers = {}
+        for b in old:
+            b.stop()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [b.stats() for b in list(self._batchers.values())]
+
+
+batchers = BatcherPool(PREDICT_MICROBATCH_MAX_SIZE, PREDICT_MICROBATCH_MAX_WAIT_MS)
@@ -1,10 +1,59 @@
 # backend/app/services/model_registry.py
 from __future__ import annotations
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+import hashlib
+import json
 import os
+import random
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
 import joblib
 
+from app.config import MODELS_COMPILE, MODELS_LOAD_MODE, MODELS_LOAD_WORKERS, MODELS_MMAP, MODELS_RELOAD_SEC
+from app.services.compiled_tree import compile_bundle
+
 ARTIFACTS_DIR = os.getenv("ARTIFACTS_DIR", "artifacts")
+MANIFEST_FILE = "manifest.json"
+
+# Используется, если в ARTIFACTS_DIR нет manifest.json (совпадает с artifacts/manifest.json)
+DEFAULT_MANIFEST: Dict[str, Any] = {
+    "defaults": {"bank": "dt", "credit": "dt"},
+    "bundles": [
+        {
+            "dataset": "bank", "model": "dt", "version": "1",
+            "files": {
+                "model": "bank_dt_model.joblib",
+                "preprocess": "bank_preprocess.joblib",
+                "feature_columns": "bank_feature_columns.joblib",
+            },
+        },
+        {
+            "dataset": "credit", "model": "dt", "version": "1",
+            "files": {
+                "model": "credit_dt_model.joblib",
+                "preprocess": "credit_preprocess.joblib",
+                "feature_columns": "credit_feature_columns.joblib",
+            },
+        },
+        {
+            "dataset": "credit", "model": "lr", "version": "1",
+            "files": {
+                "model": "credit_lr_model.joblib",
+                "preprocess": "credit_preprocess.joblib",
+                "feature_columns": "credit_feature_columns.joblib",
+            },
+        },
+    ],
+}
+
+BUNDLE_PARTS = ("model", "preprocess", "feature_columns")
+
+# (dataset, model, version)
+BundleKey = Tuple[str, str, str]
 
 
 @dataclass
@@ -12,33 +61,430 @@ class ModelBundle:
     model: object
     preprocess: object
     feature_columns: list[str]
+    dataset: str = ""
+    model_name: str = ""
+    version: str = ""
+    # быстрый путь для одной строки (compiled_tree.CompiledTree), если модель поддерживается
+    compiled: Optional[Any] = None
+    # хэш размеров/mtime файлов бандла: одинаков во всех воркерах, меняется при перевыкладке
+    revision: str = ""
 
 
-class Registry:
-    bank: ModelBundle | None = None
-    credit: ModelBundle | None = None
+@dataclass
+class ArtifactStats:
+    file: str
+    size_bytes: int
+    load_sec: float
+    mmap: bool
 
 
-registry = Registry()
+@dataclass
+class _Entry:
+    """
+    Запись манифеста + состояние загрузки. Если файлы записи не менялись,
+    объект переходит в новый снимок как есть (вместе с загруженным бандлом).
+    """
+    key: BundleKey
+    files: Dict[str, str]
+    fingerprint: Tuple[Any, ...]
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    bundle: Optional[ModelBundle] = None
+    error: Optional[str] = None
+    artifacts: Dict[str, ArtifactStats] = field(default_factory=dict)
 
 
-def _load(path: str):
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"Artifact not found: {path}")
-    return joblib.load(path)
+@dataclass
+class _Snapshot:
+    generation: int
+    fingerprint: Tuple[Any, ...]
+    entries: Dict[BundleKey, _Entry]
+    # dataset -> модель по умолчанию
+    defaults: Dict[str, str]
+    # (dataset, model) -> версия по умолчанию
+    versions: Dict[Tuple[str, str], str]
+    # dataset -> [(model, weight)] — A/B-разбиение трафика без явного model
+    split: Dict[str, List[Tuple[str, float]]]
+    loaded_at: float = field(default_factory=time.time)
 
 
-def load_all_models():
+def _version_key(v: str):
+    return (0, int(v), "") if v.isdigit() else (1, 0, v)
+
+
+def _stat(path: str) -> Tuple[Any, ...]:
+    try:
+        st = os.stat(path)
+        return (st.st_size, st.st_mtime_ns)
+    except FileNotFoundError:
+        return (None, None)
+
+
+class Registry:
     """
-    Загружает модели и препроцессоры в память при старте приложения.
+    Реестр моделей по ключу (dataset, model, version), описанный manifest.json в ARTIFACTS_DIR.
+    - текущий набор бандлов — неизменяемый снимок; запросы берут ссылку на него
+      и никогда не ждут перезагрузку;
+    - reload() собирает новый снимок (неизменённые бандлы переиспользуются,
+      изменённые грузятся заново параллельно) и подменяет его одним присваиванием;
+      если новый бандл не загрузился, остаётся старый снимок;
+    - фоновый поток раз в reload_sec сверяет mtime/размер манифеста и файлов;
+    - mode=lazy: бандлы грузятся при первом обращении;
+    - mmap_mode="r": numpy-массивы из несжатых joblib-файлов отображаются из файла
+      и делятся между форкнутыми воркерами (copy-on-write). Поэтому новую версию
+      выкладываем новым файлом или атомарным rename, а не перезаписью на месте.
     """
-    bank_dt = _load(os.path.join(ARTIFACTS_DIR, "bank_dt_model.joblib"))
-    bank_pp = _load(os.path.join(ARTIFACTS_DIR, "bank_preprocess.joblib"))
-    bank_cols = _load(os.path.join(ARTIFACTS_DIR, "bank_feature_columns.joblib"))
 
-    credit_dt = _load(os.path.join(ARTIFACTS_DIR, "credit_dt_model.joblib"))
-    credit_pp = _load(os.path.join(ARTIFACTS_DIR, "credit_preprocess.joblib"))
-    credit_cols = _load(os.path.join(ARTIFACTS_DIR, "credit_feature_columns.joblib"))
+    def __init__(self, artifacts_dir: str, mmap: bool, workers: int, mode: str, reload_sec: float = 0.0):
+        self.artifacts_dir = artifacts_dir
+        self.mmap = mmap
+        self.workers = max(1, workers)
+        self.mode = mode
+        self.reload_sec = reload_sec
+        self.last_reload_error: Optional[str] = None
+        self._snapshot: Optional[_Snapshot] = None
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._listeners: List[Callable[[int], None]] = []
+
+    # --- манифест ---
+
+    def _path(self, file: str) -> str:
+        return os.path.join(self.artifacts_dir, file)
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        path = self._path(MANIFEST_FILE)
+        if not os.path.exists(path):
+            return DEFAULT_MANIFEST
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _fingerprint_now(self, snap: _Snapshot) -> Tuple[Any, ...]:
+        files = sorted({f for e in snap.entries.values() for f in e.files.values()})
+        return (_stat(self._path(MANIFEST_FILE)),) + tuple((f, _stat(self._path(f))) for f in files)
+
+    def _build_snapshot(self, manifest: Dict[str, Any], current: Optional[_Snapshot]) -> _Snapshot:
+        entries: Dict[BundleKey, _Entry] = {}
+        for spec in manifest.get("bundles", []):
+            key = (str(spec["dataset"]).lower(), str(spec["model"]), str(spec.get("version", "1")))
+            files = {part: spec["files"][part] for part in BUNDLE_PARTS}
+            fp = tuple((f, _stat(self._path(f))) for f in files.values())
+            old = current.entries.get(key) if current else None
+            if old is not None and old.files == files and old.fingerprint == fp and old.error is None:
+                entries[key] = old
+            else:
+                entries[key] = _Entry(key=key, files=files, fingerprint=fp)
+
+        # версия по умолчанию: помеченная "default": true, иначе максимальная
+        versions: Dict[Tuple[str, str], str] = {}
+        for d, m, v in entries:
+            cur = versions.get((d, m))
+            if cur is None or _version_key(v) > _version_key(cur):
+                versions[(d, m)] = v
+        for spec in manifest.get("bundles", []):
+            if spec.get("default"):
+                versions[(str(spec["dataset"]).lower(), str(spec["model"]))] = str(spec.get("version", "1"))
+
+        defaults = {str(d).lower(): str(m) for d, m in manifest.get("defaults", {}).items()}
+        for d, m, _ in entries:
+            defaults.setdefault(d, m)
+
+        split = {
+            str(d).lower(): [(str(m), float(w)) for m, w in weights.items() if float(w) > 0]
+            for d, weights in manifest.get("split", {}).items()
+        }
+
+        snap = _Snapshot(
+            generation=(current.generation + 1) if current else 1,
+            fingerprint=(),
+            entries=entries,
+            defaults=defaults,
+            versions=versions,
+            split=split,
+        )
+        snap.fingerprint = self._fingerprint_now(snap)
+        return snap
+
+    # --- загрузка ---
+
+    def _load_artifact(self, file: str) -> tuple[Any, ArtifactStats]:
+        path = self._path(file)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Artifact not found: {path}")
+        t0 = time.perf_counter()
+        obj = joblib.load(path, mmap_mode="r" if self.mmap else None)
+        stats = ArtifactStats(
+            file=file,
+            size_bytes=os.path.getsize(path),
+            load_sec=time.perf_counter() - t0,
+            mmap=self.mmap,
+        )
+        return obj, stats
 
-    registry.bank = ModelBundle(model=bank_dt, preprocess=bank_pp, feature_columns=list(bank_cols))
-    registry.credit = ModelBundle(model=credit_dt, preprocess=credit_pp, feature_columns=list(credit_cols))
\ No newline at end of file
+    def _load_entry(self, entry: _Entry, map_fn: Callable[..., Iterable] = map) -> ModelBundle:
+        """
+        Загружает бандл записи (один раз; параллельные вызовы ждут первый).
+        map_fn — чем грузить артефакты: map (по очереди) или pool.map.
+        """
+        with entry.lock:
+            if entry.bundle is not None:
+                return entry.bundle
+            try:
+                loaded = dict(zip(entry.files, map_fn(self._load_artifact, entry.files.values())))
+            except Exception as e:
+                entry.error = f"{type(e).__name__}: {e}"
+                raise
+            d, m, v = entry.key
+            entry.artifacts = {part: stats for part, (_, stats) in loaded.items()}
+            entry.bundle = ModelBundle(
+                model=loaded["model"][0],
+                preprocess=loaded["preprocess"][0],
+                feature_columns=list(loaded["feature_columns"][0]),
+                dataset=d,
+                model_name=m,
+                version=v,
+                revision=hashlib.md5(repr(entry.fingerprint).encode("utf-8")).hexdigest()[:12],
+            )
+            if MODELS_COMPILE:
+                entry.bundle.compiled = compile_bundle(
+                    entry.bundle.model, entry.bundle.preprocess, entry.bundle.feature_columns, f"{d}/{m}/{v}"
+                )
+            entry.error = None
+            return entry.bundle
+
+    def _load_entries(self, entries: List[_Entry]) -> Dict[BundleKey, str]:
+        """
+        Параллельная загрузка записей. Возвращает {key: ошибка} для неудачных.
+        """
+        errors: Dict[BundleKey, str] = {}
+        pending = [e for e in entries if e.bundle is None]
+        if not pending:
+            return errors
+        # внешний пул ждёт бандлы, внутренний грузит файлы — вложенных submit в один пул нет
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="artifact") as files_pool, \
+                ThreadPoolExecutor(max_workers=len(pending), thread_name_prefix="bundle") as bundles_pool:
+            futures = {e.key: bundles_pool.submit(self._load_entry, e, files_pool.map) for e in pending}
+            for key, fut in futures.items():
+                try:
+                    fut.result()
+                except Exception as e:
+                    errors[key] = f"{type(e).__name__}: {e}"
+        return errors
+
+    def reload(self, preload: Optional[bool] = None) -> Dict[BundleKey, str]:
+        """
+        Перечитывает манифест и атомарно подменяет снимок.
+        preload (по умолчанию — кроме mode=lazy): загрузить бандлы до подмены;
+        при ошибке загрузки снимок не меняется. Возвращает {key: ошибка}.
+        """
+        if preload is None:
+            preload = self.mode != "lazy"
+        with self._reload_lock:
+            try:
+                snap = self._build_snapshot(self._read_manifest(), self._snapshot)
+            except Exception as e:
+                self.last_reload_error = f"manifest: {type(e).__name__}: {e}"
+                raise
+            errors = self._load_entries(list(snap.entries.values())) if preload else {}
+            if errors and self._snapshot is not None:
+                self.last_reload_error = "; ".join(f"{'/'.join(k)}: {err}" for k, err in errors.items())
+                return errors
+            self._snapshot = snap
+            self.last_reload_error = None
+        for fn in list(self._listeners):
+            try:
+                fn(snap.generation)
+            except Exception:
+                traceback.print_exc()
+        return errors
+
+    def on_reload(self, fn: Callable[[int], None]):
+        """
+        fn(generation) вызывается после каждой подмены снимка (например, сброс кэшей).
+        """
+        self._listeners.append(fn)
+
+    def _snap(self) -> _Snapshot:
+        snap = self._snapshot
+        if snap is None:
+            self.reload(preload=False)
+            snap = self._snapshot
+        return snap
+
+    # --- доступ ---
+
+    @property
+    def generation(self) -> int:
+        """
+        Растёт при каждой подмене снимка — для инвалидации производных кэшей.
+        """
+        return self._snapshot.generation if self._snapshot else 0
+
+    @property
+    def bank(self) -> Optional[ModelBundle]:
+        return self.get("bank", split=False)
+
+    @property
+    def credit(self) -> Optional[ModelBundle]:
+        return self.get("credit", split=False)
+
+    def datasets(self) -> List[str]:
+        return sorted({d for d, _, _ in self._snap().entries})
+
+    def resolve(
+        self,
+        dataset: str,
+        model: Optional[str] = None,
+        version: Optional[str] = None,
+        split: bool = True,
+    ) -> Optional[BundleKey]:
+        """
+        Ключ бандла: без model и version — A/B-разбиение из манифеста (split=True)
+        или модель по умолчанию, без version — версия по умолчанию.
+        None, если такого бандла нет.
+        """
+        snap = self._snap()
+        dataset = dataset.lower()
+        if model is None:
+            weights = snap.split.get(dataset) if split and version is None else None
+            if weights:
+                models, w = zip(*weights)
+                model = random.choices(models, weights=w)[0]
+            else:
+                model = snap.defaults.get(dataset)
+            if model is None:
+                return None
+        if version is None:
+            version = snap.versions.get((dataset, model))
+            if version is None:
+                return None
+        key = (dataset, model, str(version))
+        return key if key in snap.entries else None
+
+    def get(
+        self,
+        dataset: str,
+        model: Optional[str] = None,
+        version: Optional[str] = None,
+        split: bool = True,
+    ) -> Optional[ModelBundle]:
+        """
+        Бандл или None, если его нет в манифесте или не удалось загрузить (ошибка — в status()).
+        """
+        snap = self._snap()
+        key = self.resolve(dataset, model, version, split)
+        if key is None:
+            return None
+        entry = snap.entries[key]
+        if entry.bundle is not None:
+            return entry.bundle
+        try:
+            return self._load_entry(entry)
+        except Exception:
+            traceback.print_exc()
+            return None
+
+    # --- фоновые потоки ---
+
+    def start_background(self) -> threading.Thread:
+        t = threading.Thread(target=self._reload_logged, name="model-loader", daemon=True)
+        t.start()
+        return t
+
+    def _reload_logged(self):
+        try:
+            self.reload()
+        except Exception:
+            traceback.print_exc()
+
+    def _watch(self):
+        while not self._stop.wait(self.reload_sec):
+            snap = self._snapshot
+            if snap is None:
+                continue
+            try:
+                if self._fingerprint_now(snap) != snap.fingerprint:
+                    self.reload()
+            except Exception:
+                traceback.print_exc()
+
+    def start_watcher(self):
+        if self.reload_sec <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+        self._thread.start()
+
+    def stop_watcher(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    # --- состояние ---
+
+    @property
+    def ready(self) -> bool:
+        """
+        eager/background: снимок собран и все бандлы загружены.
+        lazy: бандлы грузятся по запросу, поэтому готовы, пока нет ошибок загрузки.
+        """
+        snap = self._snapshot
+        if snap is None:
+            return self.mode == "lazy"
+        entries = snap.entries.values()
+        if self.mode == "lazy":
+            return all(e.error is None for e in entries)
+        return all(e.bundle is not None for e in entries)
+
+    def status(self) -> Dict[str, Any]:
+        snap = self._snapshot
+        bundles = []
+        total_sec = 0.0
+        total_bytes = 0
+        for (d, m, v), e in (snap.entries.items() if snap else []):
+            total_sec += sum(a.load_sec for a in e.artifacts.values())
+            total_bytes += sum(a.size_bytes for a in e.artifacts.values())
+            bundles.append({
+                "dataset": d,
+                "model": m,
+                "version": v,
+                "default": snap.defaults.get(d) == m and snap.versions.get((d, m)) == v,
+                "loaded": e.bundle is not None,
+                "compiled": e.bundle is not None and e.bundle.compiled is not None,
+                "error": e.error,
+                "artifacts": {part: asdict(a) for part, a in e.artifacts.items()},
+            })
+        return {
+            "ready": self.ready,
+            "mode": self.mode,
+            "mmap": self.mmap,
+            "artifacts_dir": self.artifacts_dir,
+            "generation": snap.generation if snap else 0,
+            "loaded_at": snap.loaded_at if snap else None,
+            "split": {d: dict(s) for d, s in snap.split.items()} if snap else {},
+            "last_reload_error": self.last_reload_error,
+            "total_load_sec": total_sec,
+            "total_size_bytes": total_bytes,
+            "bundles": bundles,
+        }
+
+
+registry = Registry(
+    ARTIFACTS_DIR,
+    mmap=MODELS_MMAP,
+    workers=MODELS_LOAD_WORKERS,
+    mode=MODELS_LOAD_MODE,
+    reload_sec=MODELS_RELOAD_SEC,
+)
+
+
+def load_all_models():
+    """
+    Загружает модели и препроцессоры в память при старте приложения
+    (параллельно; падает на первой ошибке, как и раньше).
+    """
+    errors = registry.reload(preload=True)
+    if errors:
+        key, err = next(iter(errors.items()))
+        raise RuntimeError(f"Failed to load model bundle {'/'.join(key)}: {err}")
@@ -1,9 +1,17 @@
 from __future__ import annotations
 import re
-from typing import List, Dict
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+from app.services.triple_matcher import TripleMatcher
 
 # очень простой шаблон: "<Entity> <verb> <Entity>"
-VERBS = r"(signed|met|discussed|announced|opened|invested|published|introduced|developed|reported|strengthened|released)"
+VERB_LIST = (
+    "signed", "met", "discussed", "announced", "opened", "invested",
+    "published", "introduced", "developed", "reported", "strengthened", "released",
+)
+VERBS = "(" + "|".join(VERB_LIST) + ")"
+# эталон; в работе используется MATCHER (те же триплеты за линейное время)
 PATTERN = re.compile(rf"\b([A-Z][A-Za-z0-9\s&\-]+?)\s+{VERBS}\s+([A-Z][A-Za-z0-9\s&\-]+?)\b")
 
 def extract_triples(text: str) -> List[Dict[str, str]]:
@@ -15,7 +23,20 @@ def extract_triples(text: str) -> List[Dict[str, str]]:
     # group(2) is verb by our regex? Actually VERBS is capturing.
     return triples
 
-def extract_triples_safe(text: str) -> List[Dict[str, str]]:
+MATCHER = TripleMatcher(VERB_LIST)
+
+
+def extract_triples_safe(text: str, matcher: Optional[TripleMatcher] = None) -> List[Dict[str, str]]:
+    """
+    Триплеты {"entity1", "verb", "entity2"}; matcher — свой словарь глаголов (по умолчанию VERBS).
+    """
+    return (matcher or MATCHER).extract(text)
+
+
+def extract_triples_regex(text: str) -> List[Dict[str, str]]:
+    """
+    Исходная реализация на PATTERN — для сверки с TripleMatcher.
+    """
     triples = []
     for m in PATTERN.finditer(text):
         e1 = m.group(1).strip()
@@ -23,4 +44,37 @@ def extract_triples_safe(text: str) -> List[Dict[str, str]]:
         e2 = m.group(3).strip() if m.lastindex and m.lastindex >= 3 else ""
         if e2:
             triples.append({"entity1": e1, "verb": verb, "entity2": e2})
-    return triples
\ No newline at end of file
+    return triples
+
+# базовые формы глаголов из VERBS — в rules_news_nlp.json правила хранятся как "e1 <lemma> e2"
+VERB_LEMMAS = {
+    "signed": "sign", "met": "meet", "discussed": "discuss", "announced": "announce",
+    "opened": "open", "invested": "invest", "published": "publish", "introduced": "introduce",
+    "developed": "develop", "reported": "report", "strengthened": "strengthen", "released": "release",
+}
+
+
+def _key(e1: str, verb: str, e2: str) -> str:
+    verb = VERB_LEMMAS.get(verb, verb)
+    return " ".join(f"{e1} {verb} {e2}".lower().split())
+
+
+def triple_key(t: Dict[str, str]) -> str:
+    """
+    {"entity1", "verb", "entity2"} -> "entity1 lemma entity2" (нижний регистр, пробелы схлопнуты).
+    """
+    return _key(t["entity1"], t["verb"], t["entity2"])
+
+
+def count_triples(texts: Iterable[str]) -> tuple[Dict[str, int], int]:
+    """
+    Частоты триплетов по пачке документов: ({key: freq}, число документов).
+    Выполняется в отдельном процессе, поэтому модуль держим без тяжёлых импортов.
+    """
+    counts: Counter = Counter()
+    docs = 0
+    for text in texts:
+        docs += 1
+        if text:
+            counts.update(_key(*t) for t in MATCHER.scan(text))
+    return dict(counts), docs
@@ -0,0 +1,121 @@
+# backend/app/services/nlp_corpus.py
+from __future__ import annotations
+
+import itertools
+import multiprocessing
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.config import NLP_CHUNK_ROWS, NLP_MIN_FREQ, NLP_TOP_N, NLP_WORKERS
+from app.services.columnar import iter_frames
+from app.services.cpu_quota import worker_cpus
+from app.services.news_nlp import count_triples
+from app.services.rules_bulk import bulk_insert_rules, normalize_nlp_rules
+
+# Извлечение триплетов по всему новостному корпусу:
+# CSV (или его колоночная копия) читается чанками, документы раздаются пулу процессов
+# (регулярки упираются в GIL, потоки не масштабируются), частоты "e1 verb e2"
+# суммируются как freq в rules_news_nlp.json.
+
+
+def _text_chunks(path: str, text_column: str, chunk_rows: int) -> Iterator[List[str]]:
+    for chunk, _ in iter_frames(path, chunk_rows, columns=[text_column], dtype=str):
+        # в колоночной копии короткие словари строк читаются как category
+        yield chunk[text_column].astype(object).fillna("").tolist()
+
+
+def _executor(workers: int) -> ProcessPoolExecutor:
+    # spawn: сервер многопоточный, fork из него небезопасен; воркеру нужен только news_nlp
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def extract_corpus(
+    path: str,
+    text_column: str = "content",
+    chunk_rows: int = NLP_CHUNK_ROWS,
+    workers: int = NLP_WORKERS,
+) -> tuple[Counter, Dict[str, Any]]:
+    """
+    Частоты триплетов по всему CSV. Возвращает (Counter{key: freq}, stats).
+    В полёте держим не больше 2 * workers чанков, поэтому память ограничена.
+    """
+    # 0 — доля ядер этого веб-воркера, а не все ядра контейнера
+    workers = workers or worker_cpus()
+    t0 = time.perf_counter()
+    counts: Counter = Counter()
+    docs = 0
+
+    def _merge(fut):
+        nonlocal docs
+        part, n = fut.result()
+        counts.update(part)
+        docs += n
+
+    chunks = _text_chunks(path, text_column, chunk_rows)
+    first = next(chunks, None)
+    second = next(chunks, None)
+    rest = itertools.chain([c for c in (first, second) if c is not None], chunks)
+
+    # один чанк (или один воркер) — считаем в этом процессе: запуск пула дороже работы
+    if workers == 1 or second is None:
+        workers = 1
+        for texts in rest:
+            part, n = count_triples(texts)
+            counts.update(part)
+            docs += n
+    else:
+        with _executor(workers) as ex:
+            in_flight = set()
+            for texts in rest:
+                if len(in_flight) >= 2 * workers:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        _merge(fut)
+                in_flight.add(ex.submit(count_triples, texts))
+            for fut in in_flight:
+                _merge(fut)
+
+    seconds = time.perf_counter() - t0
+    stats = {
+        "docs": docs,
+        "triples": sum(counts.values()),
+        "unique_triples": len(counts),
+        "workers": workers,
+        "seconds": seconds,
+        "docs_per_sec": docs / seconds if seconds > 0 else 0.0,
+    }
+    return counts, stats
+
+
+def top_triples(counts: Counter, min_freq: int = NLP_MIN_FREQ, top_n: Optional[int] = NLP_TOP_N) -> List[Dict[str, Any]]:
+    """
+    Элементы в формате rules_news_nlp.json: {"if": "e1 verb e2", "then": "knowledge_rule", "metrics": {"freq"}}.
+    """
+    items = [(k, n) for k, n in counts.most_common(top_n or None) if n >= min_freq]
+    return [{"if": k, "then": "knowledge_rule", "metrics": {"freq": n}} for k, n in items]
+
+
+def mine_news_rules(
+    engine,
+    path: str,
+    text_column: str = "content",
+    chunk_rows: int = NLP_CHUNK_ROWS,
+    workers: int = NLP_WORKERS,
+    min_freq: int = NLP_MIN_FREQ,
+    top_n: Optional[int] = NLP_TOP_N,
+) -> Dict[str, Any]:
+    """
+    Корпус -> частоты -> правила NLP в таблице rules (dataset="news").
+    У уже существующих правил freq увеличивается на частоту в этом корпусе.
+    """
+    counts, stats = extract_corpus(path, text_column, chunk_rows, workers)
+    items = top_triples(counts, min_freq, top_n)
+    written = bulk_insert_rules(engine, normalize_nlp_rules(items, "news"), update_metrics=True)
+    return {
+        **stats,
+        "rules_written": written["read"],
+        "rules_new": written["inserted"],
+        "top": items[:15],
+    }
@@ -0,0 +1,59 @@
+# backend/app/services/pagination.py
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+# Keyset-пагинация по (created_at, id) при сортировке DESC:
+# следующая страница — строки с (created_at, id) < (cursor.created_at, cursor.id).
+# Стоимость любой страницы одинакова (поиск по индексу), без OFFSET-сканов.
+
+
+def _as_datetime(v: Any) -> datetime:
+    if isinstance(v, datetime):
+        return v
+    return datetime.fromisoformat(str(v))
+
+
+def encode_cursor(created_at: Any, id_: int) -> str:
+    raw = json.dumps({"t": _as_datetime(created_at).isoformat(), "id": int(id_)})
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    ValueError, если курсор повреждён.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(data["t"]), int(data["id"])
+    except Exception as e:
+        raise ValueError("invalid cursor") from e
+
+
+def next_cursor(rows: List[Dict[str, Any]], limit: int) -> str | None:
+    # полная страница -> возможно, есть продолжение
+    if len(rows) < limit or not rows:
+        return None
+    last = rows[-1]
+    return encode_cursor(last["created_at"], last["id"])
+
+
+def seek_desc(items: List[Dict[str, Any]], created_at: datetime, id_: int) -> int:
+    """
+    Индекс первого элемента списка (отсортированного по created_at DESC, id DESC),
+    который строго "после" курсора. Бинарный поиск, O(log n).
+    """
+    key = (created_at, id_)
+    lo, hi = 0, len(items)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        item = items[mid]
+        if (_as_datetime(item["created_at"]), item["id"]) < key:
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
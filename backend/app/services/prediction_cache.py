@@ -0,0 +1,303 @@
+# backend/app/services/prediction_cache.py
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+from app.config import (
+    PREDICT_CACHE_BACKEND,
+    PREDICT_CACHE_SIZE,
+    PREDICT_CACHE_SQLITE_PATH,
+    PREDICT_CACHE_TTL_SEC,
+    REDIS_URL,
+)
+
+# Кэш ответов /predict. Ключ: (dataset, model, version, revision бандла, хэш
+# канонизированных признаков), т.е. того же, что align_features отдал бы модели.
+
+
+_NAN = ("__nan__",)
+
+
+def _canonical(v: Any) -> Any:
+    # 30 и 30.0 дают одну и ту же строку после препроцессинга -> один ключ;
+    # строки, None и NaN различаются (для sklearn это разные входы).
+    # NaN -> маркер-список: в JSON он не совпадает ни с одной строкой (в т.ч. "NaN") или числом
+    if isinstance(v, bool) or v is None or isinstance(v, str):
+        return v
+    if isinstance(v, (int, float)):
+        f = float(v)
+        return _NAN if math.isnan(f) else f
+    if hasattr(v, "item"):
+        return _canonical(v.item())
+    return repr(v)
+
+
+def features_hash(features: Dict[str, Any], expected_columns: List[str]) -> str:
+    """
+    Хэш вектора признаков в порядке expected_columns: лишние поля отброшены,
+    отсутствующие = None — как в align_features, но без DataFrame.
+    """
+    vec = [_canonical(features.get(c)) for c in expected_columns]
+    raw = json.dumps(vec, separators=(",", ":"), ensure_ascii=False, allow_nan=False)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def cache_key(bundle: Any, features: Dict[str, Any]) -> str:
+    h = features_hash(features, bundle.feature_columns)
+    return f"predict:{bundle.dataset}:{bundle.model_name}:{bundle.version}:{bundle.revision}:{h}"
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    sets: int = 0
+    evictions: int = 0
+
+
+class PredictionCache(ABC):
+    name = "base"
+
+    def __init__(self, max_size: int, ttl_sec: float):
+        self.max_size = max_size
+        self.ttl_sec = ttl_sec
+        self._stats = CacheStats()
+        self._stats_lock = threading.Lock()
+
+    def _count(self, field_name: str, n: int = 1):
+        with self._stats_lock:
+            setattr(self._stats, field_name, getattr(self._stats, field_name) + n)
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def _set(self, key: str, value: Dict[str, Any]):
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+    def size(self) -> Optional[int]:
+        return None
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self._get(key)
+        self._count("hits" if value is not None else "misses")
+        return value
+
+    def set(self, key: str, value: Dict[str, Any]):
+        self._set(key, value)
+        self._count("sets")
+
+    def on_reload(self, generation: int):
+        """
+        Новые бандлы получают новый revision, поэтому старые ключи просто перестают
+        совпадать; локальный кэш дополнительно очищаем, чтобы не держать память.
+        """
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            s = asdict(self._stats)
+        total = s["hits"] + s["misses"]
+        return {
+            "backend": self.name,
+            "max_size": self.max_size,
+            "ttl_sec": self.ttl_sec,
+            "size": self.size(),
+            "hit_rate": s["hits"] / total if total else 0.0,
+            **s,
+        }
+
+
+class NullCache(PredictionCache):
+    name = "off"
+
+    def _get(self, key):
+        return None
+
+    def _set(self, key, value):
+        pass
+
+    def clear(self):
+        pass
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+
+class MemoryCache(PredictionCache):
+    """
+    LRU + TTL в памяти процесса (у каждого воркера свой).
+    """
+    name = "memory"
+
+    def __init__(self, max_size: int, ttl_sec: float):
+        super().__init__(max_size, ttl_sec)
+        self._data: "OrderedDict[str, tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def _set(self, key, value):
+        evicted = 0
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_sec, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                evicted += 1
+        if evicted:
+            self._count("evictions", evicted)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def size(self):
+        return len(self._data)
+
+    def on_reload(self, generation: int):
+        self.clear()
+
+
+class SqliteCache(PredictionCache):
+    """
+    Общий кэш воркеров на одной машине (локальная замена Redis): файл SQLite в WAL-режиме.
+    LRU по времени последнего чтения, размер подрезается раз в prune_every записей.
+    """
+    name = "sqlite"
+    prune_every = 256
+
+    def __init__(self, max_size: int, ttl_sec: float, path: str):
+        super().__init__(max_size, ttl_sec)
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS predict_cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_predict_cache_accessed ON predict_cache (accessed)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        # соединение SQLite нельзя переносить через fork: в воркере открываем своё
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _get(self, key):
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute("SELECT value, expires FROM predict_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] < now:
+            conn.execute("DELETE FROM predict_cache WHERE key = ?", (key,))
+            return None
+        conn.execute("UPDATE predict_cache SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def _set(self, key, value):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO predict_cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), now + self.ttl_sec, now),
+        )
+        self._writes += 1
+        if self._writes % self.prune_every == 0:
+            self._prune(conn, now)
+
+    def _prune(self, conn: sqlite3.Connection, now: float):
+        evicted = conn.execute("DELETE FROM predict_cache WHERE expires < ?", (now,)).rowcount
+        evicted += conn.execute(
+            "DELETE FROM predict_cache WHERE key IN ("
+            " SELECT key FROM predict_cache ORDER BY accessed ASC"
+            " LIMIT MAX(0, (SELECT COUNT(*) FROM predict_cache) - ?))",
+            (self.max_size,),
+        ).rowcount
+        if evicted:
+            self._count("evictions", evicted)
+
+    def clear(self):
+        self._conn().execute("DELETE FROM predict_cache")
+
+    def size(self):
+        return self._conn().execute("SELECT COUNT(*) FROM predict_cache").fetchone()[0]
+
+
+class RedisCache(PredictionCache):
+    """
+    Общий кэш через Redis (нужен пакет redis). Срок жизни — SETEX;
+    ограничение по размеру — политикой maxmemory (allkeys-lru) на стороне Redis.
+    """
+    name = "redis"
+
+    def __init__(self, max_size: int, ttl_sec: float, url: str):
+        super().__init__(max_size, ttl_sec)
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("PREDICT_CACHE_BACKEND=redis requires the 'redis' package") from e
+        if not url:
+            raise RuntimeError("REDIS_URL must be set for PREDICT_CACHE_BACKEND=redis")
+        self._client = redis.Redis.from_url(url)
+
+    def _get(self, key):
+        raw = self._client.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    def _set(self, key, value):
+        self._client.setex(key, max(1, int(self.ttl_sec)), json.dumps(value))
+
+    def clear(self):
+        for k in self._client.scan_iter(match="predict:*", count=1000):
+            self._client.delete(k)
+
+
+def _create() -> PredictionCache:
+    if PREDICT_CACHE_BACKEND in ("off", "none", "false", "0") or PREDICT_CACHE_SIZE <= 0:
+        return NullCache(0, 0)
+    if PREDICT_CACHE_BACKEND == "sqlite":
+        return SqliteCache(PREDICT_CACHE_SIZE, PREDICT_CACHE_TTL_SEC, PREDICT_CACHE_SQLITE_PATH)
+    if PREDICT_CACHE_BACKEND == "redis":
+        return RedisCache(PREDICT_CACHE_SIZE, PREDICT_CACHE_TTL_SEC, REDIS_URL)
+    if PREDICT_CACHE_BACKEND == "memory":
+        return MemoryCache(PREDICT_CACHE_SIZE, PREDICT_CACHE_TTL_SEC)
+    raise ValueError(f"Unknown PREDICT_CACHE_BACKEND: {PREDICT_CACHE_BACKEND}")
+
+
+prediction_cache = _create()
@@ -0,0 +1,168 @@
+# backend/app/services/rule_cache.py
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+import traceback
+from datetime import datetime
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.config import RULES_CACHE_CHECK_SEC
+from app.database import engine
+from app.services.pagination import seek_desc
+
+RULE_COLUMNS = """
+      id, dataset, source, rule_if, rule_then,
+      probability, coverage,
+      support, confidence, lift,
+      freq, dataset_id, created_at
+"""
+
+IndexKey = Tuple[Optional[str], Optional[str]]
+
+
+@dataclass
+class _Snapshot:
+    version: int
+    fingerprint: Tuple[Any, ...]
+    index: Dict[IndexKey, List[Dict[str, Any]]] = field(default_factory=dict)
+    loaded_at: float = field(default_factory=time.time)
+
+    @property
+    def tag(self) -> str:
+        # отпечаток содержимого таблицы: одинаков во всех воркерах с одним и тем же снимком
+        return hashlib.blake2b(repr(self.fingerprint).encode("utf-8"), digest_size=8).hexdigest()
+
+
+class RuleCache:
+    """
+    Кэш таблицы rules в памяти процесса.
+    - правила индексируются по (dataset, source), а также (dataset, *), (*, source), (*, *);
+      каждый список уже отсортирован по created_at DESC, id DESC;
+    - чтения работают только со снимком в памяти и никогда не ходят в БД;
+    - фоновый поток раз в check_interval_sec читает счётчик изменений rules_version
+      (одна строка; его увеличивает каждая запись в rules через rules_bulk — upsert и обрезка
+      найденных правил) и перезагружает снимок при изменении. COUNT/MAX по rules не нужны:
+      на миллионах строк это полный скан в каждом воркере;
+      invalidate() будит его сразу (например, после импорта правил);
+    - ETag строится из отпечатка (tag), а не из version: version растёт при каждой
+      перезагрузке и у каждого воркера своя, а отпечаток у одинаковых снимков совпадает.
+    """
+
+    def __init__(self, check_interval_sec: float):
+        self.check_interval_sec = check_interval_sec
+        self._snapshot: _Snapshot | None = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._reload_lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._snapshot is not None
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version if self._snapshot else 0
+
+    def _fingerprint(self, conn) -> Tuple[Any, ...]:
+        version = conn.execute(text("SELECT version FROM rules_version WHERE id = 1")).scalar()
+        return (str(version),)
+
+    def load(self):
+        """
+        Полная перезагрузка снимка из БД. Новый снимок подменяется атомарно.
+        """
+        with self._reload_lock:
+            with engine.connect() as conn:
+                fingerprint = self._fingerprint(conn)
+                rows = conn.execute(text(
+                    f"SELECT {RULE_COLUMNS} FROM rules ORDER BY created_at DESC, id DESC"
+                )).mappings().all()
+
+            index: Dict[IndexKey, List[Dict[str, Any]]] = {(None, None): []}
+            for r in rows:
+                item = dict(r)
+                d, s = item["dataset"], item["source"]
+                for key in ((d, s), (d, None), (None, s), (None, None)):
+                    bucket = index.get(key)
+                    if bucket is None:
+                        bucket = index[key] = []
+                    bucket.append(item)
+
+            self._snapshot = _Snapshot(version=self.version + 1, fingerprint=fingerprint, index=index)
+
+    def refresh_if_changed(self):
+        with engine.connect() as conn:
+            fingerprint = self._fingerprint(conn)
+        if self._snapshot is None or fingerprint != self._snapshot.fingerprint:
+            self.load()
+
+    def invalidate(self):
+        self._wake.set()
+
+    def query(
+        self,
+        dataset: Optional[str],
+        source: Optional[str],
+        limit: int,
+        after: Optional[Tuple[datetime, int]] = None,
+    ) -> Optional[Tuple[List[Dict[str, Any]], str]]:
+        """
+        Возвращает (items, tag) или None, если кэш ещё не загружен.
+        after — keyset-курсор (created_at, id): начинаем со строк строго после него.
+        """
+        snap = self._snapshot
+        if snap is None:
+            return None
+        items = snap.index.get((dataset, source), [])
+        start = seek_desc(items, *after) if after is not None else 0
+        return items[start:start + limit], snap.tag
+
+    def items(self, dataset: Optional[str], source: Optional[str]) -> Optional[Tuple[List[Dict[str, Any]], int]]:
+        """
+        Все правила (dataset, source) из снимка: (items, version) или None.
+        """
+        snap = self._snapshot
+        if snap is None:
+            return None
+        return snap.index.get((dataset, source), []), snap.version
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.check_interval_sec)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.refresh_if_changed()
+            except Exception:
+                traceback.print_exc()
+
+    def start(self):
+        """
+        Первичная загрузка + фоновый поток обновления.
+        Если БД недоступна, кэш остаётся пустым и /rules читает из БД напрямую.
+        """
+        try:
+            self.load()
+        except Exception:
+            traceback.print_exc()
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="rule-cache", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+rule_cache = RuleCache(check_interval_sec=RULES_CACHE_CHECK_SEC)
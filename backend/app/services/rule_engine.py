@@ -0,0 +1,257 @@
+# backend/app/services/rule_engine.py
+from __future__ import annotations
+
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.services.model_registry import ModelBundle
+
+# "duration > 1.500000", "loan_grade_D <= 0.5"
+_DT_COND = re.compile(r"^\s*(.+?)\s*(<=|>=|==|!=|<|>)\s*(\S+)\s*$")
+# "(17.999, 31.0]" — интервалы pd.cut/qcut в Apriori-айтемах
+_INTERVAL = re.compile(r"^([\(\[])\s*(-?[\d.eE+\-]+|-?inf)\s*,\s*(-?[\d.eE+\-]+|-?inf)\s*([\)\]])$")
+
+# Условие: (kind, column, op, arg)
+#   kind = "ready" — колонка препроцессированной матрицы (DecisionTree)
+#   kind = "raw"   — колонка исходных данных (Apriori-айтемы, one-hot вне энкодера)
+#   kind = "never" — не удалось сопоставить ни с одной колонкой
+Condition = Tuple[str, str, str, Any]
+
+
+@dataclass
+class _TrieNode:
+    cond: Optional[Condition] = None
+    children: Dict[Condition, "_TrieNode"] = field(default_factory=dict)
+    rule_ids: List[int] = field(default_factory=list)
+
+
+@dataclass
+class CompiledRuleSet:
+    """
+    Набор правил, скомпилированный в префиксное дерево условий.
+    Правила Decision Tree — пути одного дерева, поэтому у них общие префиксы:
+    каждое условие вычисляется один раз, векторно, только на строках,
+    дошедших до узла. Итоговая стоимость ~ O(строки x глубина), а не O(строки x правила).
+    """
+    rules: List[Dict[str, Any]]
+    root: _TrieNode
+    unresolved: int = 0
+
+
+def _strip_prefix(name: str) -> str:
+    # "num__duration" -> "duration", "cat__job_admin." -> "job_admin."
+    return name.split("__", 1)[1] if "__" in name else name
+
+
+def preprocess_feature_names(preprocess: Any) -> List[str]:
+    return [_strip_prefix(str(n)) for n in preprocess.get_feature_names_out()]
+
+
+def ready_feature_names(bundle: ModelBundle) -> List[str]:
+    return preprocess_feature_names(bundle.preprocess)
+
+
+def _split_item(item: str, raw_columns: Sequence[str]) -> Optional[Tuple[str, str]]:
+    # самый длинный известный префикс "<column>_"
+    best = None
+    for c in raw_columns:
+        if item.startswith(c + "_") and (best is None or len(c) > len(best)):
+            best = c
+    if best is None:
+        return None
+    return best, item[len(best) + 1:]
+
+
+def _compile_dt(rule_if: str, ready_names: Dict[str, int], raw_columns: Sequence[str]) -> List[Condition]:
+    conds: List[Condition] = []
+    for part in rule_if.split(" AND "):
+        m = _DT_COND.match(part)
+        if not m:
+            return [("never", part, "", None)]
+        feature, op, thr = m.group(1), m.group(2), float(m.group(3))
+        if feature in ready_names:
+            conds.append(("ready", feature, op, thr))
+            continue
+        split = _split_item(feature, raw_columns)
+        if split is None:
+            return [("never", feature, op, thr)]
+        # one-hot признак, которого нет в энкодере: считаем индикатор по исходной колонке
+        column, value = split
+        conds.append(("raw", column, "onehot" + op, (value, thr)))
+    return conds
+
+
+def _compile_itemset(rule_if: str, raw_columns: Sequence[str]) -> List[Condition]:
+    conds: List[Condition] = []
+    # порядок айтемов не важен: сортируем, чтобы у правил было больше общих префиксов
+    for item in sorted(p.strip() for p in rule_if.split(" AND ")):
+        split = _split_item(item, raw_columns)
+        if split is None:
+            return [("never", item, "", None)]
+        column, value = split
+        m = _INTERVAL.match(value)
+        if m:
+            lo, hi = float(m.group(2)), float(m.group(3))
+            conds.append(("raw", column, "interval", (m.group(1) == "[", lo, hi, m.group(4) == "]")))
+        else:
+            conds.append(("raw", column, "==", value))
+    return conds
+
+
+def compile_rules(rules: List[Dict[str, Any]], ready_names: List[str], raw_columns: Sequence[str]) -> CompiledRuleSet:
+    """
+    rules — строки таблицы rules (rule_if, source, ...).
+    ready_names — имена колонок после preprocess (без префиксов ColumnTransformer).
+    raw_columns — исходные колонки датасета.
+    """
+    name_idx = {n: i for i, n in enumerate(ready_names)}
+    root = _TrieNode()
+    unresolved = 0
+
+    for rid, r in enumerate(rules):
+        if r["source"] == "DecisionTree":
+            conds = _compile_dt(r["rule_if"], name_idx, raw_columns)
+        elif r["source"] == "Apriori":
+            conds = _compile_itemset(r["rule_if"], raw_columns)
+        else:
+            continue
+        if any(c[0] == "never" for c in conds):
+            unresolved += 1
+            continue
+
+        node = root
+        for c in conds:
+            child = node.children.get(c)
+            if child is None:
+                child = node.children[c] = _TrieNode(cond=c)
+            node = child
+        node.rule_ids.append(rid)
+
+    return CompiledRuleSet(rules=rules, root=root, unresolved=unresolved)
+
+
+class _Columns:
+    """
+    Ленивый доступ к колонкам: препроцессированная матрица (по индексу) и исходный DataFrame.
+    Каждая колонка приводится к numpy один раз.
+    """
+
+    def __init__(self, X_ready: Any, ready_names: List[str], raw: pd.DataFrame):
+        if hasattr(X_ready, "toarray"):
+            X_ready = X_ready.toarray()
+        self.X = np.asfortranarray(np.asarray(X_ready, dtype=np.float64))
+        self.ready_idx = {n: i for i, n in enumerate(ready_names)}
+        self.raw = raw
+        self._raw_num: Dict[str, np.ndarray] = {}
+        self._raw_str: Dict[str, np.ndarray] = {}
+
+    def ready(self, name: str) -> np.ndarray:
+        return self.X[:, self.ready_idx[name]]
+
+    def raw_num(self, column: str) -> np.ndarray:
+        v = self._raw_num.get(column)
+        if v is None:
+            v = self._raw_num[column] = pd.to_numeric(self.raw[column], errors="coerce").to_numpy(dtype=np.float64)
+        return v
+
+    def raw_str(self, column: str) -> np.ndarray:
+        v = self._raw_str.get(column)
+        if v is None:
+            v = self._raw_str[column] = self.raw[column].astype(str).to_numpy()
+        return v
+
+
+def _compare(x: np.ndarray, op: str, thr: Any) -> np.ndarray:
+    if op == "<=":
+        return x <= thr
+    if op == ">":
+        return x > thr
+    if op == "<":
+        return x < thr
+    if op == ">=":
+        return x >= thr
+    if op == "==":
+        return x == thr
+    return x != thr
+
+
+def _eval(cols: _Columns, cond: Condition, rows: np.ndarray) -> np.ndarray:
+    kind, column, op, arg = cond
+    if kind == "ready":
+        return _compare(cols.ready(column)[rows], op, arg)
+
+    if column not in cols.raw.columns:
+        return np.zeros(len(rows), dtype=bool)
+    if op == "interval":
+        lo_closed, lo, hi, hi_closed = arg
+        x = cols.raw_num(column)[rows]
+        left = x >= lo if lo_closed else x > lo
+        right = x <= hi if hi_closed else x < hi
+        return left & right
+    if op == "==":
+        return cols.raw_str(column)[rows] == arg
+    # onehot<op>: индикатор (raw == value), сравнённый с порогом
+    value, thr = arg
+    indicator = (cols.raw_str(column)[rows] == value).astype(np.float64)
+    return _compare(indicator, op[len("onehot"):], thr)
+
+
+def match(compiled: CompiledRuleSet, cols: _Columns, n_rows: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Возвращает пары (row_index, rule_id) для всех сработавших правил,
+    отсортированные по строке.
+    """
+    hit_rows: List[np.ndarray] = []
+    hit_rules: List[np.ndarray] = []
+
+    stack: List[Tuple[_TrieNode, np.ndarray]] = [(compiled.root, np.arange(n_rows))]
+    while stack:
+        node, rows = stack.pop()
+        for child in node.children.values():
+            sub = rows[_eval(cols, child.cond, rows)]
+            if len(sub) == 0:
+                continue
+            for rid in child.rule_ids:
+                hit_rows.append(sub)
+                hit_rules.append(np.full(len(sub), rid, dtype=np.int64))
+            if child.children:
+                stack.append((child, sub))
+
+    if not hit_rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    r = np.concatenate(hit_rows)
+    k = np.concatenate(hit_rules)
+    order = np.argsort(r, kind="stable")
+    return r[order], k[order]
+
+
+_compiled_cache: Dict[Tuple[Any, ...], CompiledRuleSet] = {}
+_compiled_lock = threading.Lock()
+
+
+def get_compiled(key: Tuple[Any, ...], rules: List[Dict[str, Any]], bundle: ModelBundle) -> CompiledRuleSet:
+    """
+    Компиляция один раз на (dataset, source, версия набора правил, поколение реестра моделей).
+    """
+    with _compiled_lock:
+        compiled = _compiled_cache.get(key)
+        if compiled is None:
+            # старые версии того же набора больше не нужны
+            for k in [k for k in _compiled_cache if k[:2] == key[:2]]:
+                del _compiled_cache[k]
+            compiled = _compiled_cache[key] = compile_rules(rules, ready_feature_names(bundle), bundle.feature_columns)
+        return compiled
+
+
+def match_rows(compiled: CompiledRuleSet, bundle: ModelBundle, X: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    X — выровненный DataFrame (align_features_batch). Один transform на весь батч.
+    """
+    X_ready = bundle.preprocess.transform(X)
+    cols = _Columns(X_ready, ready_feature_names(bundle), X)
+    return match(compiled, cols, len(X))
@@ -0,0 +1,560 @@
+# backend/app/services/rule_mining.py
+from __future__ import annotations
+
+import heapq
+import math
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from itertools import combinations
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.config import (
+    MINING_BITSET_MB,
+    MINING_CHUNK_ROWS,
+    MINING_DT_MAX_DEPTH,
+    MINING_DT_MIN_SAMPLES,
+    MINING_MAX_CATEGORIES,
+    MINING_MAX_ITEMSETS,
+    MINING_MAX_LEN,
+    MINING_MAX_STORED_RULES,
+    MINING_MIN_CONFIDENCE,
+    MINING_MIN_SUPPORT,
+    MINING_NUM_BINS,
+    MINING_SAMPLE_ROWS,
+    MINING_TARGETS,
+    MINING_TOP_N,
+    MINING_WORKERS,
+)
+from app.services.columnar import iter_frames
+from app.services.cpu_quota import pool_workers
+from app.services.model_registry import registry
+from app.services.rule_engine import preprocess_feature_names
+from app.services.rules_bulk import NORMALIZERS, bulk_insert_rules, prune_mined_rules
+
+# Поиск правил по загруженному табличному файлу (а не только готовые rules_json/*.json):
+# - проход 1: файл (CSV или колоночная копия) читается чанками, держится равномерная выборка строк — по ней
+#   строятся признаки (интервалы по квантилям, частые категории) и обучается дерево;
+# - Apriori: проход 2 кодирует все строки в битовые множества (1 бит на строку и признак),
+#   поддержка набора = popcount(AND битовых множеств); наборы перебираются в глубину,
+#   признаки одной колонки не комбинируются;
+# - DecisionTree: правила — пути от корня до листьев по массивам tree_. Если у датасета есть модель,
+#   дерево учится на матрице её preprocess — условия в тех же признаках, что у правил из rules_json
+#   и у /rules/match ("duration" = номер интервала KBinsDiscretizer, "job_admin." = one-hot);
+#   иначе — на исходных значениях числовых колонок (пороги — реальные значения) и one-hot категорий.
+# Считается в отдельном процессе (spawn), результат пишется в rules через bulk_insert_rules.
+
+
+@dataclass(frozen=True)
+class MiningParams:
+    chunk_rows: int = MINING_CHUNK_ROWS
+    sample_rows: int = MINING_SAMPLE_ROWS
+    num_bins: int = MINING_NUM_BINS
+    max_categories: int = MINING_MAX_CATEGORIES
+    min_support: float = MINING_MIN_SUPPORT
+    min_confidence: float = MINING_MIN_CONFIDENCE
+    max_len: int = MINING_MAX_LEN
+    max_itemsets: int = MINING_MAX_ITEMSETS
+    bitset_mb: int = MINING_BITSET_MB
+    dt_max_depth: int = MINING_DT_MAX_DEPTH
+    dt_min_samples: int = MINING_DT_MIN_SAMPLES
+    top_n: int = MINING_TOP_N
+    seed: int = 0
+
+
+def _fmt(v: Any) -> str:
+    if isinstance(v, (float, np.floating)):
+        if math.isinf(v):
+            return "inf" if v > 0 else "-inf"
+        if float(v).is_integer():
+            return str(int(v))
+        return np.format_float_positional(float(v), precision=6, trim="-")
+    if isinstance(v, np.integer):
+        return str(int(v))
+    return str(v)
+
+
+@dataclass
+class _Column:
+    name: str
+    # num — интервалы по квантилям; val — число с немногими значениями; cat — строки
+    kind: str
+    values: Tuple[Any, ...] = ()
+    # num: внутренние границы, значение x попадает в интервал (e[i-1], e[i]]
+    edges: Tuple[float, ...] = ()
+
+    def labels(self) -> List[str]:
+        if self.kind == "num":
+            bounds = (-math.inf,) + self.edges + (math.inf,)
+            return [
+                f"{self.name}_({_fmt(lo)}, {_fmt(hi)}{')' if math.isinf(hi) else ']'}"
+                for lo, hi in zip(bounds[:-1], bounds[1:])
+            ]
+        return [f"{self.name}_{_fmt(v)}" for v in self.values]
+
+    def codes(self, s: pd.Series) -> np.ndarray:
+        """
+        Номер признака колонки для каждой строки, -1 — пропуск или редкое значение.
+        """
+        if self.kind == "num":
+            x = pd.to_numeric(s, errors="coerce").to_numpy(dtype=np.float64)
+            idx = np.searchsorted(np.asarray(self.edges, dtype=np.float64), x, side="left")
+            idx[np.isnan(x)] = -1
+            return idx
+        if self.kind == "val":
+            x = pd.to_numeric(s, errors="coerce").to_numpy(dtype=np.float64)
+        else:
+            x = s.to_numpy(dtype=object) if s.dtype == object else s.astype(str).where(s.notna()).to_numpy(dtype=object)
+        return pd.Categorical(x, categories=list(self.values)).codes.astype(np.int64)
+
+
+class ItemEncoder:
+    """
+    Колонки CSV -> бинарные признаки "колонка_значение" (для Apriori)
+    и матрица признаков для дерева (числа — как есть, категории — one-hot).
+    """
+
+    def __init__(self, columns: List[_Column]):
+        self.columns = columns
+        self.items: List[str] = []
+        self.item_column: List[int] = []
+        self.offsets: List[int] = []
+        for j, c in enumerate(columns):
+            self.offsets.append(len(self.items))
+            labels = c.labels()
+            self.items.extend(labels)
+            self.item_column.extend([j] * len(labels))
+
+    @classmethod
+    def fit(cls, sample: pd.DataFrame, num_bins: int, max_categories: int) -> "ItemEncoder":
+        columns: List[_Column] = []
+        n = len(sample)
+        for name in sample.columns:
+            s = sample[name].dropna()
+            if s.empty:
+                continue
+            nunique = int(s.nunique())
+            if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+                if nunique <= max_categories:
+                    columns.append(_Column(name, "val", values=tuple(sorted(float(v) for v in s.unique()))))
+                    continue
+                qs = np.linspace(0.0, 1.0, num_bins + 1)[1:-1]
+                edges = np.unique(np.quantile(s.to_numpy(dtype=np.float64), qs))
+                columns.append(_Column(name, "num", edges=tuple(float(e) for e in edges)))
+                continue
+            # идентификаторы и свободный текст признаками не делаем
+            if nunique > max_categories and nunique > 0.5 * n:
+                continue
+            counts = s.astype(str).value_counts()
+            columns.append(_Column(name, "cat", values=tuple(counts.index[:max_categories])))
+        return cls(columns)
+
+    @property
+    def read_dtypes(self) -> Dict[str, Any]:
+        return {c.name: str for c in self.columns if c.kind == "cat"}
+
+    def column(self, name: str) -> Optional[_Column]:
+        return next((c for c in self.columns if c.name == name), None)
+
+    def masks(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        bool-матрица строки x признаки.
+        """
+        M = np.zeros((len(df), len(self.items)), dtype=bool)
+        rows = np.arange(len(df))
+        for off, c in zip(self.offsets, self.columns):
+            codes = c.codes(df[c.name])
+            ok = codes >= 0
+            M[rows[ok], off + codes[ok]] = True
+        return M
+
+    def tree_matrix(self, df: pd.DataFrame, exclude: str) -> Tuple[np.ndarray, List[str]]:
+        """
+        Числовые колонки — исходные значения (NaN дерево обрабатывает само),
+        поэтому порог в правиле — реальное значение колонки; категории — one-hot.
+        """
+        blocks, names = [], []
+        for c in self.columns:
+            if c.name == exclude:
+                continue
+            if c.kind in ("num", "val"):
+                blocks.append(pd.to_numeric(df[c.name], errors="coerce").to_numpy(dtype=np.float64)[:, None])
+                names.append(c.name)
+            else:
+                codes = c.codes(df[c.name])
+                blocks.append((codes[:, None] == np.arange(len(c.values))).astype(np.float64))
+                names.extend(c.labels())
+        X = np.hstack(blocks) if blocks else np.empty((len(df), 0))
+        return X, names
+
+
+def _chunks(path: str, chunk_rows: int, columns: Optional[List[str]] = None, dtype=None) -> Iterator[pd.DataFrame]:
+    # CSV или колоночная копия (Parquet): у неё типы уже в файле, читаются только columns
+    for frame, _ in iter_frames(path, chunk_rows, columns=columns, dtype=dtype):
+        yield frame
+
+
+def sample_rows(path: str, params: MiningParams) -> Tuple[pd.DataFrame, int]:
+    """
+    Равномерная выборка не больше sample_rows строк за один проход
+    (у каждой строки случайный ключ, остаются строки с наименьшими) и число строк в файле.
+    """
+    rng = np.random.default_rng(params.seed)
+    kept: Optional[pd.DataFrame] = None
+    keys = np.empty(0)
+    total = 0
+    for chunk in _chunks(path, params.chunk_rows):
+        total += len(chunk)
+        k = rng.random(len(chunk))
+        kept = chunk if kept is None else pd.concat([kept, chunk], ignore_index=True)
+        keys = np.concatenate([keys, k])
+        if len(kept) > params.sample_rows:
+            idx = np.sort(np.argpartition(keys, params.sample_rows)[:params.sample_rows])
+            kept = kept.iloc[idx].reset_index(drop=True)
+            keys = keys[idx]
+    return (kept if kept is not None else pd.DataFrame()), total
+
+
+def build_bitsets(path: str, encoder: ItemEncoder, total: int, params: MiningParams) -> Tuple[List[int], int]:
+    """
+    Битовое множество строк для каждого признака (int: бит i = строка i) и число строк.
+    Если строки x признаки не влезают в bitset_mb, берётся равномерная выборка строк.
+    """
+    budget_rows = params.bitset_mb * 8 * 1024 * 1024 // max(1, len(encoder.items))
+    keep = min(1.0, budget_rows / total) if total else 1.0
+    rng = np.random.default_rng(params.seed + 1)
+    bufs = [bytearray() for _ in encoder.items]
+    n = 0
+    usecols = [c.name for c in encoder.columns]
+    for chunk in _chunks(path, params.chunk_rows, columns=usecols, dtype=encoder.read_dtypes):
+        if keep < 1.0:
+            chunk = chunk[rng.random(len(chunk)) < keep]
+        if chunk.empty:
+            continue
+        M = encoder.masks(chunk)
+        n_real = len(M)
+        # каждый чанк начинается с границы байта: добиваем нулевыми строками (в счёт не идут)
+        pad = (-n_real) % 8
+        if pad:
+            M = np.vstack([M, np.zeros((pad, M.shape[1]), dtype=bool)])
+        packed = np.ascontiguousarray(np.packbits(M, axis=0, bitorder="little").T)
+        for j, row in enumerate(packed):
+            bufs[j] += row.tobytes()
+        n += n_real
+    bits = []
+    for j in range(len(bufs)):
+        bits.append(int.from_bytes(bufs[j], "little"))
+        bufs[j] = bytearray()
+    return bits, n
+
+
+class _Truncated(Exception):
+    pass
+
+
+def frequent_itemsets(
+    bits: List[int],
+    item_column: List[int],
+    n: int,
+    min_support: float,
+    max_len: int,
+    max_itemsets: int,
+) -> Tuple[Dict[Tuple[int, ...], int], bool]:
+    """
+    Все наборы до max_len признаков с поддержкой >= min_support.
+    Обход в глубину по префиксам: у префикса P список (a, bits(P + a)),
+    bits(P + a + b) = bits(P + a) & bits(P + b). В памяти только списки вдоль текущего
+    пути — не больше max_len * признаков битовых множеств, сколько бы ни было частых наборов.
+    Возвращает ({набор: число строк}, обрезано_по_max_itemsets).
+    """
+    min_count = max(1, math.ceil(min_support * n))
+    counts: Dict[Tuple[int, ...], int] = {}
+    roots: List[Tuple[int, int]] = []
+    for i, b in enumerate(bits):
+        c = b.bit_count()
+        if c >= min_count:
+            counts[(i,)] = c
+            roots.append((i, b))
+
+    def grow(prefix: Tuple[int, ...], ext: List[Tuple[int, int]]):
+        if len(prefix) + 2 > max_len:
+            return
+        for ai, (a, a_bits) in enumerate(ext):
+            child: List[Tuple[int, int]] = []
+            for b, b_bits in ext[ai + 1:]:
+                # значения одной колонки взаимоисключающие
+                if item_column[a] == item_column[b]:
+                    continue
+                x = a_bits & b_bits
+                c = x.bit_count()
+                if c >= min_count:
+                    counts[prefix + (a, b)] = c
+                    child.append((b, x))
+                    if len(counts) >= max_itemsets:
+                        raise _Truncated
+            if child:
+                grow(prefix + (a,), child)
+
+    try:
+        grow((), roots)
+    except _Truncated:
+        return counts, True
+    return counts, False
+
+
+def association_rules(
+    counts: Dict[Tuple[int, ...], int],
+    items: List[str],
+    n: int,
+    min_confidence: float,
+    top_n: int,
+) -> List[Dict[str, Any]]:
+    """
+    X -> Y для каждого частого набора X ∪ Y; top_n по lift (затем confidence, support).
+    Элементы в формате rules_json/*_apriori.json.
+    """
+    def gen():
+        for itemset, c in counts.items():
+            if len(itemset) < 2:
+                continue
+            for r in range(1, len(itemset)):
+                for lhs in combinations(itemset, r):
+                    rhs = tuple(i for i in itemset if i not in lhs)
+                    # после обрезки по max_itemsets подмножества могут отсутствовать
+                    if lhs not in counts or rhs not in counts:
+                        continue
+                    conf = c / counts[lhs]
+                    if conf < min_confidence:
+                        continue
+                    lift = conf / (counts[rhs] / n)
+                    yield lift, conf, c, lhs, rhs
+
+    best = heapq.nlargest(top_n, gen(), key=lambda t: (t[0], t[1], t[2]))
+    return [
+        {
+            "if": " AND ".join(sorted(items[i] for i in lhs)),
+            "then": " AND ".join(sorted(items[i] for i in rhs)),
+            "metrics": {"support": c / n, "confidence": conf, "lift": lift},
+        }
+        for lift, conf, c, lhs, rhs in best
+    ]
+
+
+def tree_rules(tree: Any, feature_names: List[str], target: str, min_samples: int, top_n: int) -> List[Dict[str, Any]]:
+    """
+    Путь корень -> лист по tree_.children_left/right, feature, threshold = одно правило.
+    Элементы в формате rules_json/*_decision_tree.json.
+    """
+    t = tree.tree_
+    left, right = t.children_left, t.children_right
+    feature, threshold = t.feature, t.threshold
+    n_samples = t.n_node_samples
+    value = t.value[:, 0, :]
+    classes = tree.classes_
+    total = int(n_samples[0])
+
+    out = []
+    stack: List[Tuple[int, List[str]]] = [(0, [])]
+    while stack:
+        node, conds = stack.pop()
+        if left[node] == -1:
+            samples = int(n_samples[node])
+            if not conds or samples < min_samples:
+                continue
+            p = value[node] / value[node].sum()
+            k = int(np.argmax(p))
+            out.append({
+                "if": " AND ".join(conds),
+                "then": f"{target}_{_fmt(classes[k])}",
+                "metrics": {"probability": float(p[k]), "coverage": samples / total, "samples": samples},
+            })
+            continue
+        name = feature_names[feature[node]]
+        stack.append((right[node], conds + [f"{name} > {threshold[node]:.6f}"]))
+        stack.append((left[node], conds + [f"{name} <= {threshold[node]:.6f}"]))
+    out.sort(key=lambda r: (-r["metrics"]["coverage"], -r["metrics"]["probability"]))
+    return out[:top_n]
+
+
+def _targets() -> Dict[str, str]:
+    return {
+        k.strip(): v.strip()
+        for k, v in (pair.split(":", 1) for pair in MINING_TARGETS.split(",") if ":" in pair)
+    }
+
+
+def target_column(dataset: str, columns: List[str]) -> str:
+    t = _targets().get(dataset, "")
+    return t if t in columns else columns[-1]
+
+
+def is_minable(dataset: str) -> bool:
+    """
+    Майнить ли загрузку: только bank/credit или датасеты с целевой колонкой в MINING_TARGETS.
+    Для нераспознанного CSV цель была бы случайной (последняя колонка), а правила
+    с dataset='unknown' попадали бы во все запросы /rules без фильтра.
+    """
+    return dataset in ("bank", "credit") or dataset in _targets()
+
+
+def preprocess_matrix(preprocess: Any, feature_columns: List[str], df: pd.DataFrame) -> Tuple[np.ndarray, List[str]]:
+    """
+    Матрица признаков модели (как в match_rows) и их имена без префиксов ColumnTransformer.
+    """
+    X = preprocess.transform(df.reindex(columns=feature_columns))
+    if hasattr(X, "toarray"):
+        X = X.toarray()
+    return np.asarray(X, dtype=np.float64), preprocess_feature_names(preprocess)
+
+
+def mine_file(
+    path: str,
+    dataset: str,
+    method: str,
+    params: Optional[MiningParams] = None,
+    preprocess: Any = None,
+    feature_columns: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Выполняется в процессе-воркере. Возвращает {"items": [...], "stats": {...}};
+    items — в формате rules_json/*.json для NORMALIZERS[method].
+    preprocess, feature_columns — из бандла модели датасета: дерево учится на её признаках.
+    """
+    params = params or MiningParams()
+    t0 = time.perf_counter()
+    sample, total = sample_rows(path, params)
+    encoder = ItemEncoder.fit(sample, params.num_bins, params.max_categories)
+    stats: Dict[str, Any] = {
+        "method": method,
+        "rows": total,
+        "sample_rows": len(sample),
+        "items": len(encoder.items),
+    }
+
+    if method == "Apriori":
+        bits, n = build_bitsets(path, encoder, total, params)
+        counts, truncated = frequent_itemsets(
+            bits, encoder.item_column, n, params.min_support, params.max_len, params.max_itemsets
+        )
+        del bits
+        items = association_rules(counts, encoder.items, n, params.min_confidence, params.top_n) if n else []
+        stats.update({"transactions": n, "itemsets": len(counts), "truncated": truncated})
+    elif method == "DecisionTree":
+        from sklearn.tree import DecisionTreeClassifier
+
+        target = target_column(dataset, list(sample.columns))
+        col = encoder.column(target)
+        items = []
+        if col is not None:
+            codes = col.codes(sample[target])
+            ok = codes >= 0
+            labels = np.asarray([lbl[len(target) + 1:] for lbl in col.labels()], dtype=object)
+            if preprocess is not None:
+                X, names = preprocess_matrix(preprocess, feature_columns, sample[ok])
+            else:
+                X, names = encoder.tree_matrix(sample[ok], exclude=target)
+            y = labels[codes[ok]]
+            if len(y) and X.shape[1] and len(set(y)) > 1:
+                tree = DecisionTreeClassifier(
+                    max_depth=params.dt_max_depth,
+                    min_samples_leaf=params.dt_min_samples,
+                    random_state=params.seed,
+                ).fit(X, y)
+                items = tree_rules(tree, names, target, params.dt_min_samples, params.top_n)
+        stats.update({
+            "target": target,
+            "train_rows": int(ok.sum()) if col is not None else 0,
+            "features": "preprocess" if preprocess is not None else "raw",
+        })
+    else:
+        raise ValueError(f"Unsupported mining method: {method}")
+
+    stats["seconds"] = time.perf_counter() - t0
+    return {"items": items, "stats": stats}
+
+
+# размер пула с учётом числа веб-воркеров (MINING_WORKERS=-1 — авто)
+WORKERS = pool_workers(MINING_WORKERS)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: сервер многопоточный, fork из него небезопасен
+            _pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown(wait: bool = True):
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait)
+
+
+def run_mining(
+    path: str,
+    dataset: str,
+    method: str,
+    params: Optional[MiningParams] = None,
+    preprocess: Any = None,
+    feature_columns: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    mine_file в пуле процессов (WORKERS=0 — в текущем процессе).
+    Пул ограничивает число одновременно майнящихся файлов, а значит и память.
+    """
+    args = (path, dataset, method, params, preprocess, feature_columns)
+    if WORKERS <= 0:
+        return mine_file(*args)
+    try:
+        return _executor().submit(mine_file, *args).result()
+    except BrokenProcessPool:
+        # воркер убит (например, по памяти): следующий вызов создаст новый пул
+        shutdown(wait=False)
+        raise
+
+
+def mine_rules(
+    engine,
+    path: str,
+    dataset: str,
+    method: str,
+    params: Optional[MiningParams] = None,
+    dataset_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Файл -> правила method в таблице rules. У уже найденных майнингом правил метрики
+    обновляются значениями по этому файлу, импортированные не меняются. Новые правила помечаются dataset_id загрузки;
+    найденных правил на (dataset, method) хранится не больше MINING_MAX_STORED_RULES.
+    DecisionTree для датасета с моделью учится на её preprocess (в воркер уходит только он,
+    сама модель не копируется), чтобы правила применялись через /rules/match.
+    """
+    bundle = registry.get(dataset, split=False) if method == "DecisionTree" else None
+    result = run_mining(
+        path, dataset, method, params,
+        preprocess=bundle.preprocess if bundle is not None else None,
+        feature_columns=bundle.feature_columns if bundle is not None else None,
+    )
+    items = result["items"]
+    rows = ({**r, "dataset_id": dataset_id} for r in NORMALIZERS[method](items, dataset))
+    written = bulk_insert_rules(engine, rows, update_metrics=True, mined_only=True)
+    pruned = prune_mined_rules(engine, dataset, method, MINING_MAX_STORED_RULES) if dataset_id else 0
+    return {
+        **result["stats"],
+        "rules_written": written["read"],
+        "rules_new": written["inserted"],
+        "rules_pruned": pruned,
+        "top": items[:10],
+    }
@@ -0,0 +1,375 @@
+# backend/app/services/rules_bulk.py
+from __future__ import annotations
+
+import csv
+import hashlib
+import io
+import json
+import time
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, case, func, text
+
+# Общий код импорта правил: используется и scripts/import_rules.py, и rules_loader.
+# - JSON читается потоково (ijson), без json.load всего файла;
+# - строки пишутся пачками: в Postgres через COPY во временную таблицу,
+#   в остальных СУБД — многострочным INSERT;
+# - дедупликация по content_hash (ON CONFLICT DO NOTHING), поэтому повторный импорт
+#   вставляет только новые правила.
+
+RULE_FIELDS = [
+    "dataset", "source", "rule_if", "rule_then",
+    "probability", "coverage", "support", "confidence", "lift", "freq",
+    "content_hash", "dataset_id",
+]
+
+rules_table = Table(
+    "rules", MetaData(),
+    Column("dataset", String), Column("source", String),
+    Column("rule_if", String), Column("rule_then", String),
+    Column("probability", Float), Column("coverage", Float),
+    Column("support", Float), Column("confidence", Float), Column("lift", Float),
+    Column("freq", Integer), Column("content_hash", String),
+    # загрузка, майнинг по которой нашёл правило (migrations/008); при upsert не меняется
+    Column("dataset_id", String),
+)
+
+DEFAULT_BATCH_SIZE = 50_000
+
+# колонки метрик: при update_metrics=True перезаписываются у уже существующих правил
+METRIC_FIELDS = ["probability", "coverage", "support", "confidence", "lift", "freq"]
+# при upsert метрики заменяются, а частоты (freq) складываются: новый корпус добавляет
+# вхождения к уже накопленным (в т.ч. к частотам из rules_*.json), а не затирает их
+ACCUMULATED_FIELDS = {"freq"}
+
+
+def _as_float(x: Any) -> Optional[float]:
+    try:
+        if x is None:
+            return None
+        return float(x)
+    except Exception:
+        return None
+
+
+def _as_int(x: Any) -> Optional[int]:
+    try:
+        if x is None:
+            return None
+        return int(x)
+    except Exception:
+        return None
+
+
+def _get_first(d: Dict[str, Any], keys: List[str], default=None):
+    for k in keys:
+        if k in d and d[k] is not None:
+            return d[k]
+    return default
+
+
+def _flat(r: Dict[str, Any]) -> Dict[str, Any]:
+    # метрики могут лежать во вложенном "metrics" (формат rules_json/*.json)
+    metrics = r.get("metrics")
+    return {**metrics, **r} if isinstance(metrics, dict) else r
+
+
+def content_hash(dataset: str, source: str, rule_if: str, rule_then: str) -> str:
+    """
+    md5(dataset|source|rule_if|rule_then) — совпадает с md5(...) в Postgres,
+    которым заполнены старые строки (migrations/002_rules_content_hash.sql).
+    """
+    raw = f"{dataset}|{source}|{rule_if}|{rule_then}"
+    return hashlib.md5(raw.encode("utf-8")).hexdigest()
+
+
+def _row(dataset: str, source: str, rule_if: Any, rule_then: Any, **metrics) -> Dict[str, Any]:
+    row = {
+        "dataset": dataset,
+        "source": source,
+        "rule_if": str(rule_if),
+        "rule_then": str(rule_then),
+        "probability": None,
+        "coverage": None,
+        "support": None,
+        "confidence": None,
+        "lift": None,
+        "freq": None,
+        "dataset_id": None,
+    }
+    row.update(metrics)
+    row["content_hash"] = content_hash(dataset, source, row["rule_if"], row["rule_then"])
+    return row
+
+
+def normalize_dt_rules(items: Iterable[Dict[str, Any]], dataset: str) -> Iterator[Dict[str, Any]]:
+    """
+    Expected keys may vary:
+      - "if"
+      - "then_class" or "then" or "class" or "prediction"
+      - "probability"
+      - "coverage"
+    """
+    for r in items:
+        r = _flat(r)
+        rule_if = _get_first(r, ["if", "rule_if", "conditions"])
+        rule_then = _get_first(r, ["then_class", "then", "rule_then", "class", "prediction"])
+        if rule_if is None or rule_then is None:
+            # пропускаем битые записи
+            continue
+        yield _row(
+            dataset, "DecisionTree", rule_if, rule_then,
+            probability=_as_float(_get_first(r, ["probability", "proba"])),
+            coverage=_as_float(_get_first(r, ["coverage"])),
+        )
+
+
+def normalize_apriori_rules(items: Iterable[Dict[str, Any]], dataset: str) -> Iterator[Dict[str, Any]]:
+    """
+    Expected keys may vary:
+      - "IF" / "THEN" (often upper)
+      - "if" / "then"
+      - "support", "confidence", "lift"
+    """
+    for r in items:
+        r = _flat(r)
+        rule_if = _get_first(r, ["IF", "if", "rule_if"])
+        rule_then = _get_first(r, ["THEN", "then", "rule_then"])
+        if rule_if is None or rule_then is None:
+            continue
+        yield _row(
+            dataset, "Apriori", rule_if, rule_then,
+            support=_as_float(_get_first(r, ["support"])),
+            confidence=_as_float(_get_first(r, ["confidence"])),
+            lift=_as_float(_get_first(r, ["lift"])),
+        )
+
+
+def normalize_nlp_rules(items: Iterable[Dict[str, Any]], dataset: str = "news") -> Iterator[Dict[str, Any]]:
+    """
+    Expected keys may vary:
+      - "if_then" (already full IF ... THEN ...)
+      - OR "if" + "then" style
+      - freq: "freq"
+    We store:
+      rule_if: if_then (or if)
+      rule_then: "knowledge_rule" (constant)
+    """
+    for r in items:
+        r = _flat(r)
+        rule_if = _get_first(r, ["if_then", "if", "rule_if"])
+        if rule_if is None:
+            continue
+        yield _row(dataset, "NLP", rule_if, "knowledge_rule", freq=_as_int(_get_first(r, ["freq", "count"])))
+
+
+NORMALIZERS = {
+    "DecisionTree": normalize_dt_rules,
+    "Apriori": normalize_apriori_rules,
+    "NLP": normalize_nlp_rules,
+}
+
+
+def iter_json_items(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Потоково отдаёт элементы JSON-файла вида [...] или {"items": [...]}.
+    Без ijson — откат на json.load (весь файл в памяти).
+    """
+    with open(path, "rb") as f:
+        head = f.read(64).lstrip()
+        f.seek(0)
+        prefix = "items.item" if head.startswith(b"{") else "item"
+        try:
+            import ijson
+        except ImportError:
+            data = json.load(f)
+            if isinstance(data, dict) and "items" in data:
+                data = data["items"]
+            yield from (data if isinstance(data, list) else [])
+            return
+        yield from ijson.items(f, prefix, use_float=True)
+
+
+def _batches(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    it = iter(rows)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _copy_postgres(
+    conn,
+    batches: Iterable[List[Dict[str, Any]]],
+    update_metrics: bool = False,
+    mined_only: bool = False,
+) -> tuple[int, int]:
+    """
+    COPY пачек во временную таблицу и один INSERT ... SELECT ... ON CONFLICT.
+    Возвращает (read, inserted).
+    """
+    cur = conn.connection.dbapi_connection.cursor()
+    cols = ", ".join(RULE_FIELDS)
+    cur.execute(f"""
+        CREATE TEMP TABLE rules_stage (
+          dataset TEXT, source TEXT, rule_if TEXT, rule_then TEXT,
+          probability DOUBLE PRECISION, coverage DOUBLE PRECISION,
+          support DOUBLE PRECISION, confidence DOUBLE PRECISION, lift DOUBLE PRECISION,
+          freq INTEGER, content_hash TEXT, dataset_id UUID
+        ) ON COMMIT DROP
+    """)
+    read = 0
+    for batch in batches:
+        buf = io.StringIO()
+        w = csv.writer(buf)
+        for r in batch:
+            # None -> \N без кавычек (NULL в COPY), пустая строка остаётся строкой
+            w.writerow([r"\N" if r[k] is None else r[k] for k in RULE_FIELDS])
+        buf.seek(0)
+        cur.copy_expert(f"COPY rules_stage ({cols}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buf)
+        read += len(batch)
+
+    if update_metrics:
+        # xmax = 0 только у вставленных строк: отличаем их от обновлённых
+        sets = ", ".join(
+            f"{c} = CASE WHEN EXCLUDED.{c} IS NULL THEN rules.{c} ELSE COALESCE(rules.{c}, 0) + EXCLUDED.{c} END"
+            if c in ACCUMULATED_FIELDS else f"{c} = EXCLUDED.{c}"
+            for c in METRIC_FIELDS
+        )
+        where = " WHERE rules.dataset_id IS NOT NULL" if mined_only else ""
+        cur.execute(f"""
+            WITH upserted AS (
+              INSERT INTO rules ({cols})
+              SELECT DISTINCT ON (content_hash) {cols} FROM rules_stage
+              ON CONFLICT (content_hash) DO UPDATE SET {sets}{where}
+              RETURNING (xmax = 0) AS is_new
+            )
+            SELECT COUNT(*) FILTER (WHERE is_new) FROM upserted
+        """)
+        inserted = cur.fetchone()[0]
+    else:
+        cur.execute(f"""
+            INSERT INTO rules ({cols})
+            SELECT DISTINCT ON (content_hash) {cols} FROM rules_stage
+            ON CONFLICT (content_hash) DO NOTHING
+        """)
+        inserted = cur.rowcount
+    cur.close()
+    return read, inserted
+
+
+def _insert_multirow(
+    conn,
+    batches: Iterable[List[Dict[str, Any]]],
+    update_metrics: bool = False,
+    mined_only: bool = False,
+) -> tuple[int, int]:
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif conn.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"Unsupported dialect for bulk rules import: {conn.dialect.name}")
+
+    # один скомпилированный INSERT + список параметров: SQLAlchemy 2.0 ("insertmanyvalues")
+    # сам склеивает его в многострочные VALUES, без executemany по строке
+    stmt = insert(rules_table)
+    if update_metrics:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["content_hash"],
+            set_={
+                c: case(
+                    (stmt.excluded[c].is_(None), rules_table.c[c]),
+                    else_=func.coalesce(rules_table.c[c], 0) + stmt.excluded[c],
+                ) if c in ACCUMULATED_FIELDS else stmt.excluded[c]
+                for c in METRIC_FIELDS
+            },
+            where=rules_table.c.dataset_id.isnot(None) if mined_only else None,
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=["content_hash"])
+    # rowcount у executemany ненадёжен, поэтому считаем строки до/после —
+    # только по своим (dataset, source): файлы могут грузиться параллельно
+    count = text("SELECT COUNT(*) FROM rules WHERE dataset = :dataset AND source = :source")
+    before: Dict[tuple, int] = {}
+    read = 0
+    for batch in batches:
+        for key in {(r["dataset"], r["source"]) for r in batch} - before.keys():
+            before[key] = conn.execute(count, {"dataset": key[0], "source": key[1]}).scalar() or 0
+        read += len(batch)
+        conn.execute(stmt, batch)
+    inserted = sum(
+        (conn.execute(count, {"dataset": d, "source": s}).scalar() or 0) - n
+        for (d, s), n in before.items()
+    )
+    return read, inserted
+
+
+def bump_rules_version(conn):
+    """
+    Отмечает изменение таблицы rules (migrations/007_rules_version.sql): кэши правил
+    во всех воркерах перечитают её при следующей проверке отпечатка.
+    """
+    conn.execute(text("UPDATE rules_version SET version = version + 1 WHERE id = 1"))
+
+
+def prune_mined_rules(engine, dataset: str, source: str, keep: int) -> int:
+    """
+    Оставляет keep самых новых найденных майнингом правил (dataset_id IS NOT NULL) для (dataset, source),
+    остальные удаляет. Импортированные правила (dataset_id IS NULL) не трогаются. Возвращает число удалённых.
+    """
+    if keep <= 0:
+        return 0
+    with engine.begin() as conn:
+        deleted = conn.execute(text("""
+            DELETE FROM rules
+            WHERE dataset = :dataset AND source = :source AND dataset_id IS NOT NULL
+              AND id NOT IN (
+                SELECT id FROM rules
+                WHERE dataset = :dataset AND source = :source AND dataset_id IS NOT NULL
+                ORDER BY id DESC
+                LIMIT :keep
+              )
+        """), {"dataset": dataset, "source": source, "keep": keep}).rowcount
+        if deleted:
+            bump_rules_version(conn)
+    return deleted
+
+
+def bulk_insert_rules(
+    engine,
+    rows: Iterable[Dict[str, Any]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    update_metrics: bool = False,
+    mined_only: bool = False,
+) -> Dict[str, Any]:
+    """
+    Одна транзакция на вызов. Возвращает {"read", "inserted", "seconds", "rows_per_sec"}.
+    update_metrics — у уже существующих правил (тот же content_hash) обновить метрики
+    (freq — прибавить, см. ACCUMULATED_FIELDS);
+    mined_only — обновлять только найденные майнингом правила (dataset_id IS NOT NULL):
+    метрики импортированных из rules_json/*.json не затираются значениями одной загрузки.
+    """
+    t0 = time.perf_counter()
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2":
+            read, inserted = _copy_postgres(conn, _batches(rows, batch_size), update_metrics, mined_only)
+        else:
+            read, inserted = _insert_multirow(conn, _batches(rows, batch_size), update_metrics, mined_only)
+        if inserted or (update_metrics and read):
+            bump_rules_version(conn)
+    seconds = time.perf_counter() - t0
+    return {
+        "read": read,
+        "inserted": inserted,
+        "seconds": seconds,
+        "rows_per_sec": read / seconds if seconds > 0 else 0.0,
+    }
+
+
+def load_rules_file(engine, path: str, dataset: str, source: str, batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, Any]:
+    normalize = NORMALIZERS[source]
+    stats = bulk_insert_rules(engine, normalize(iter_json_items(path), dataset), batch_size)
+    return {"path": path, "dataset": dataset, "source": source, **stats}
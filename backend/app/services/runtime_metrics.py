@@ -0,0 +1,362 @@
+# backend/app/services/runtime_metrics.py
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: один процесс (uvicorn --reload), блокировка не нужна
+    fcntl = None
+
+from app.config import RUNTIME_METRICS, RUNTIME_METRICS_DIR, RUNTIME_METRICS_FLUSH_SEC
+from app.services.histogram import ShardedHistogram
+
+# Время запросов и горячих этапов (align_features, preprocess.transform, model.predict,
+# read_csv, compute_U, storage, db.query) в гистограммах без блокировок на запись.
+# Воркеры uvicorn/gunicorn — отдельные процессы: каждый раз в RUNTIME_METRICS_FLUSH_SEC
+# пишет свой снимок в RUNTIME_METRICS_DIR, GET /metrics/runtime складывает снимки всех живых
+# воркеров и отдаёт их в текстовом формате Prometheus (секунды, кумулятивные корзины).
+# Счётчики остановленных и умерших воркеров не пропадают (иначе сумма уменьшится, и Prometheus
+# примет это за сброс счётчика): их снимки прибавляются к dead.json — как в multiprocess-режиме
+# prometheus_client.
+
+# мс, шаг 1-2.5-5: от долей миллисекунды (align_features) до минут (загрузка файла)
+RUNTIME_BUCKETS_MS = (
+    0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500,
+    1000, 2500, 5000, 10000, 30000, 60000, 300000,
+)
+
+HELP = {
+    "app_request_duration_seconds": "HTTP request latency by route template, method and status class.",
+    "app_stage_duration_seconds": "Latency of instrumented hot-path stages.",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+Key = Tuple[str, Labels]
+
+DEAD_FILE = "dead.json"
+LOCK_FILE = "dead.lock"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # процесс есть, но чужой (EPERM)
+        return True
+    return True
+
+
+def _merge(merged: Dict[Key, Dict[str, Any]], snap: Dict[str, Any]):
+    for h in snap["hists"]:
+        key = (h["metric"], tuple(sorted(h["labels"].items())))
+        acc = merged.get(key)
+        if acc is None:
+            merged[key] = {"counts": list(h["counts"]), "sum": h["sum"], "max": h["max"]}
+            continue
+        acc["counts"] = [a + b for a, b in zip(acc["counts"], h["counts"])]
+        acc["sum"] += h["sum"]
+        acc["max"] = max(acc["max"], h["max"])
+
+
+def _read_snapshot(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            snap = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return snap if snap.get("buckets") == list(RUNTIME_BUCKETS_MS) else None
+
+
+class RuntimeMetrics:
+    def __init__(self, directory: str, flush_sec: float, enabled: bool = True):
+        self.directory = directory
+        self.flush_sec = flush_sec
+        self.enabled = enabled
+        self._hists: Dict[Key, ShardedHistogram] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # --- запись ---
+    def histogram(self, metric: str, labels: Labels) -> ShardedHistogram:
+        key = (metric, labels)
+        h = self._hists.get(key)
+        if h is None:
+            with self._lock:
+                h = self._hists.setdefault(key, ShardedHistogram(RUNTIME_BUCKETS_MS))
+        return h
+
+    def observe(self, metric: str, labels: Labels, ms: float):
+        if self.enabled:
+            self.histogram(metric, labels).observe(ms)
+
+    def span(self, stage: str) -> "_Span":
+        return _Span(self, (("stage", stage),))
+
+    # --- снимки воркеров ---
+    def _path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"{pid}.json")
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        """
+        Межпроцессная блокировка на перенос снимков в dead.json и чтение суммы:
+        снимок воркера учитывается либо в своём файле, либо в dead.json, но не дважды.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, LOCK_FILE), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _fold_into_dead(self, snapshots: List[Dict[str, Any]]):
+        # вызывается под _locked()
+        merged: Dict[Key, Dict[str, Any]] = {}
+        dead = _read_snapshot(os.path.join(self.directory, DEAD_FILE))
+        for snap in ([dead] if dead else []) + snapshots:
+            _merge(merged, snap)
+        out = {
+            "pid": None,
+            "buckets": list(RUNTIME_BUCKETS_MS),
+            "hists": [
+                {"metric": m, "labels": dict(labels), **h} for (m, labels), h in merged.items()
+            ],
+        }
+        path = os.path.join(self.directory, DEAD_FILE)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(out, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def local_snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            items = list(self._hists.items())
+        hists = []
+        for (metric, labels), h in items:
+            counts, _, s, mx = h._read()
+            hists.append({"metric": metric, "labels": dict(labels), "counts": counts, "sum": s, "max": mx})
+        return {"pid": os.getpid(), "buckets": list(RUNTIME_BUCKETS_MS), "hists": hists}
+
+    def flush(self):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(os.getpid())
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.local_snapshot(), f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_sec):
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        # файл с нашим pid остался от умершего процесса с тем же pid: первый flush его бы затёр
+        try:
+            with self._locked():
+                path = self._path(os.getpid())
+                snap = _read_snapshot(path)
+                if snap is not None:
+                    self._fold_into_dead([snap])
+                if os.path.exists(path):
+                    os.unlink(path)
+        except OSError:
+            pass
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="runtime-metrics", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if not self.enabled:
+            return
+        # счётчики остановленного воркера переходят в dead.json, его файл удаляется — атомарно для collect
+        try:
+            with self._locked():
+                self._fold_into_dead([self.local_snapshot()])
+                path = self._path(os.getpid())
+                if os.path.exists(path):
+                    os.unlink(path)
+                # перенесённое больше не считается своим (повторный start в том же процессе — тесты)
+                with self._lock:
+                    self._hists = {}
+        except OSError:
+            pass
+
+    def collect(self) -> Tuple[Dict[Key, Dict[str, Any]], int]:
+        """
+        Сумма снимков: свой (живой), файлы других живых воркеров и dead.json.
+        Файл воркера, которого уже нет (убит без shutdown, например по timeout), переносится в dead.json.
+        Возвращает (сумму, число живых воркеров в ней).
+        """
+        snapshots = [self.local_snapshot()]
+        own = f"{os.getpid()}.json"
+        try:
+            with self._locked():
+                dead = []
+                for name in os.listdir(self.directory):
+                    stem = name[:-len(".json")]
+                    if not name.endswith(".json") or name == own or not stem.isdigit():
+                        continue
+                    path = os.path.join(self.directory, name)
+                    snap = _read_snapshot(path)
+                    if snap is None:
+                        continue
+                    if _pid_alive(int(stem)):
+                        snapshots.append(snap)
+                    else:
+                        dead.append(snap)
+                        os.unlink(path)
+                if dead:
+                    self._fold_into_dead(dead)
+                folded = _read_snapshot(os.path.join(self.directory, DEAD_FILE))
+        except OSError:
+            folded = None
+
+        merged: Dict[Key, Dict[str, Any]] = {}
+        for snap in snapshots + ([folded] if folded else []):
+            _merge(merged, snap)
+        return merged, len(snapshots)
+
+    def render(self) -> str:
+        merged, workers = self.collect()
+        lines: List[str] = [
+            "# HELP app_runtime_workers Worker processes included in this scrape.",
+            "# TYPE app_runtime_workers gauge",
+            f"app_runtime_workers {workers}",
+        ]
+        les = [format(b / 1000.0, "g") for b in RUNTIME_BUCKETS_MS] + ["+Inf"]
+        for metric in sorted({m for m, _ in merged}):
+            lines.append(f"# HELP {metric} {HELP.get(metric, metric)}")
+            lines.append(f"# TYPE {metric} histogram")
+            for (m, labels), h in sorted(merged.items()):
+                if m != metric:
+                    continue
+                acc = 0
+                for le, c in zip(les, h["counts"]):
+                    acc += c
+                    lines.append(f"{metric}_bucket{_labels(labels + (('le', le),))} {acc}")
+                lines.append(f"{metric}_sum{_labels(labels)} {h['sum'] / 1000.0!r}")
+                # count = +Inf: счётчики потоков читаются без блокировки, сумма корзин согласована
+                lines.append(f"{metric}_count{_labels(labels)} {acc}")
+        return "\n".join(lines) + "\n"
+
+
+class _Span:
+    """
+    with span("model.predict"): ... — время блока в гистограмму этапа (и при исключении тоже).
+    """
+
+    __slots__ = ("_metrics", "_labels", "_t0")
+
+    def __init__(self, metrics: RuntimeMetrics, labels: Labels):
+        self._metrics = metrics
+        self._labels = labels
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._metrics.observe("app_stage_duration_seconds", self._labels, (time.perf_counter() - self._t0) * 1000.0)
+        return False
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels) + "}"
+
+
+runtime_metrics = RuntimeMetrics(RUNTIME_METRICS_DIR, RUNTIME_METRICS_FLUSH_SEC, RUNTIME_METRICS)
+
+
+def span(stage: str) -> _Span:
+    return runtime_metrics.span(stage)
+
+
+class TimingMiddleware:
+    """
+    ASGI-мидлварь (без BaseHTTPMiddleware: не буферизует ответ и не ломает стриминг).
+    Метка route — шаблон пути (/datasets/{dataset_id}/status), а не сам путь,
+    чтобы число рядов не росло с числом id; status — класс ответа (2xx, 4xx, ...).
+    Время — до отправки последнего куска тела.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not runtime_metrics.enabled:
+            await self.app(scope, receive, send)
+            return
+        t0 = time.perf_counter()
+        status = 500
+
+        async def _send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            route = scope.get("route")
+            labels = (
+                ("method", scope["method"]),
+                ("route", getattr(route, "path", None) or "unmatched"),
+                ("status", f"{status // 100}xx"),
+            )
+            runtime_metrics.observe("app_request_duration_seconds", labels, (time.perf_counter() - t0) * 1000.0)
+
+
+def instrument_engine(engine):
+    """
+    Время каждого SQL-запроса (от отправки до ответа драйвера) — этап db.query.
+    Для async_engine передаётся async_engine.sync_engine.
+    """
+    from sqlalchemy import event
+
+    labels: Labels = (("stage", "db.query"),)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("runtime_metrics_t0", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("runtime_metrics_t0")
+        if stack:
+            runtime_metrics.observe("app_stage_duration_seconds", labels, (time.perf_counter() - stack.pop()) * 1000.0)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(ctx):
+        conn = ctx.connection
+        stack = conn.info.get("runtime_metrics_t0") if conn is not None else None
+        if stack:
+            stack.pop()
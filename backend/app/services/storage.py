@@ -1,36 +1,286 @@
 # backend/app/services/storage.py
 from __future__ import annotations
 
-from supabase import create_client
-from app.config import SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY, SUPABASE_BUCKET
+import os
+import shutil
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Callable, Dict, TypeVar
 
+from app.config import (
+    SUPABASE_URL,
+    SUPABASE_SERVICE_ROLE_KEY,
+    SUPABASE_BUCKET,
+    STORAGE_BACKEND,
+    STORAGE_LOCAL_DIR,
+    STORAGE_RETRIES,
+    STORAGE_RETRY_BACKOFF_SEC,
+    S3_ENDPOINT_URL,
+    S3_ACCESS_KEY_ID,
+    S3_SECRET_ACCESS_KEY,
+    S3_REGION,
+    S3_MULTIPART_CHUNK_MB,
+    S3_MULTIPART_CONCURRENCY,
+)
+from app.services.runtime_metrics import span
 
-def _get_supabase_client():
-    if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
-        raise RuntimeError("SUPABASE_URL or SUPABASE_SERVICE_ROLE_KEY is not set")
-    return create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+T = TypeVar("T")
 
+# размер куска при скачивании по HTTP (память на загрузку ограничена этим значением)
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# срок жизни подписанной ссылки на скачивание
+SIGNED_URL_TTL_SEC = 600
 
-def upload_dataset(file_bytes: bytes, filename: str, dataset_id: str, content_type: str | None = None) -> str:
+
+@dataclass
+class UploadResult:
+    storage_path: str
+    size_bytes: int
+    elapsed_sec: float
+    attempts: int
+
+
+class StorageBackend(ABC):
+    """
+    Базовый интерфейс хранилища датасетов.
+    Реализации: SupabaseStorage, S3Storage, LocalStorage, MemoryStorage.
+    Повторы с экспоненциальной задержкой и замер времени — здесь, общие для всех.
+    """
+
+    name = "base"
+
+    def __init__(self, bucket: str, retries: int = STORAGE_RETRIES, backoff_sec: float = STORAGE_RETRY_BACKOFF_SEC):
+        self.bucket = bucket
+        self.retries = max(1, retries)
+        self.backoff_sec = backoff_sec
+
+    # --- реализуется в наследниках ---
+    @abstractmethod
+    def _put_file(self, storage_path: str, path: str, content_type: str | None):
+        ...
+
+    @abstractmethod
+    def _get_file(self, storage_path: str, dest_path: str):
+        ...
+
+    # --- общее ---
+    def _with_retries(self, fn: Callable[[], T]) -> tuple[T, int]:
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return fn(), attempt
+            except Exception:
+                if attempt >= self.retries:
+                    raise
+                time.sleep(self.backoff_sec * (2 ** (attempt - 1)))
+
+    def put_file(self, storage_path: str, path: str, content_type: str | None = None) -> UploadResult:
+        size = os.path.getsize(path)
+        t0 = time.perf_counter()
+        with span("storage.put"):
+            _, attempts = self._with_retries(lambda: self._put_file(storage_path, path, content_type))
+        return UploadResult(
+            storage_path=storage_path,
+            size_bytes=size,
+            elapsed_sec=time.perf_counter() - t0,
+            attempts=attempts,
+        )
+
+    def get_file(self, storage_path: str, dest_path: str) -> str:
+        with span("storage.get"):
+            self._with_retries(lambda: self._get_file(storage_path, dest_path))
+        return dest_path
+
+
+class SupabaseStorage(StorageBackend):
+    """
+    Один долгоживущий клиент на процесс: httpx внутри держит пул соединений,
+    поэтому TLS-рукопожатие не повторяется на каждую загрузку.
+    Скачивание — по подписанной ссылке потоком на диск (download() клиента держит весь объект в памяти).
+    """
+
+    name = "supabase"
+
+    def __init__(self, bucket: str, **kwargs):
+        super().__init__(bucket, **kwargs)
+        self._client = None
+        self._http = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
+                        raise RuntimeError("SUPABASE_URL or SUPABASE_SERVICE_ROLE_KEY is not set")
+                    from supabase import create_client
+                    self._client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+        return self._client
+
+    def _get_http(self):
+        if self._http is None:
+            with self._lock:
+                if self._http is None:
+                    import httpx
+                    self._http = httpx.Client(timeout=httpx.Timeout(30.0), follow_redirects=True)
+        return self._http
+
+    def _put_file(self, storage_path: str, path: str, content_type: str | None):
+        # Note: upsert=False to avoid accidental overwrite (можно сделать True при необходимости)
+        options = {"content-type": content_type} if content_type else {}
+        with open(path, "rb") as f:
+            res = self._get_client().storage.from_(self.bucket).upload(
+                path=storage_path,
+                file=f,
+                file_options=options
+            )
+
+        # supabase-py returns dict-like; on error may contain "error"
+        if isinstance(res, dict) and res.get("error"):
+            raise RuntimeError(f"Supabase upload error: {res['error']}")
+
+    def _get_file(self, storage_path: str, dest_path: str):
+        signed = self._get_client().storage.from_(self.bucket).create_signed_url(storage_path, SIGNED_URL_TTL_SEC)
+        url = signed.get("signedURL") or signed.get("signedUrl")
+        if not url:
+            raise RuntimeError(f"Supabase signed URL error: {signed}")
+        with self._get_http().stream("GET", url) as res:
+            res.raise_for_status()
+            with open(dest_path, "wb") as f:
+                for chunk in res.iter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+
+
+class S3Storage(StorageBackend):
+    """
+    S3-совместимое хранилище (в т.ч. S3-эндпоинт Supabase Storage, MinIO).
+    Большие файлы грузятся multipart-частями параллельно (boto3 TransferConfig).
+    """
+
+    name = "s3"
+
+    def __init__(self, bucket: str, **kwargs):
+        super().__init__(bucket, **kwargs)
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+        except ImportError as e:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)") from e
+
+        self._client = boto3.client(
+            "s3",
+            endpoint_url=S3_ENDPOINT_URL,
+            aws_access_key_id=S3_ACCESS_KEY_ID,
+            aws_secret_access_key=S3_SECRET_ACCESS_KEY,
+            region_name=S3_REGION,
+        )
+        chunk = S3_MULTIPART_CHUNK_MB * 1024 * 1024
+        self._transfer_config = TransferConfig(
+            multipart_threshold=chunk,
+            multipart_chunksize=chunk,
+            max_concurrency=S3_MULTIPART_CONCURRENCY,
+        )
+
+    def _put_file(self, storage_path: str, path: str, content_type: str | None):
+        extra = {"ContentType": content_type} if content_type else None
+        self._client.upload_file(path, self.bucket, storage_path, ExtraArgs=extra, Config=self._transfer_config)
+
+    def _get_file(self, storage_path: str, dest_path: str):
+        self._client.download_file(self.bucket, storage_path, dest_path, Config=self._transfer_config)
+
+
+class LocalStorage(StorageBackend):
+    """
+    Файлы на локальном диске: <root>/<bucket>/<storage_path>.
+    Удобно для разработки и для замеров без сети.
+    """
+
+    name = "local"
+
+    def __init__(self, bucket: str, root: str = STORAGE_LOCAL_DIR, **kwargs):
+        super().__init__(bucket, **kwargs)
+        self.root = root
+
+    def _full_path(self, storage_path: str) -> str:
+        return os.path.join(self.root, self.bucket, storage_path)
+
+    def _put_file(self, storage_path: str, path: str, content_type: str | None):
+        dest = self._full_path(storage_path)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        shutil.copyfile(path, dest)
+
+    def _get_file(self, storage_path: str, dest_path: str):
+        shutil.copyfile(self._full_path(storage_path), dest_path)
+
+
+class MemoryStorage(StorageBackend):
     """
-    Upload file into Supabase Storage bucket.
-    Returns storage_path like: datasets/<dataset_id>/<original_filename>
+    Хранилище в памяти процесса — заглушка для тестов и бенчмарков.
     """
-    supabase = _get_supabase_client()
-    storage_path = f"datasets/{dataset_id}/{filename}"
 
-    # supabase-py storage upload
-    # Note: upsert=False to avoid accidental overwrite (можно сделать True при необходимости)
-    options = {"content-type": content_type} if content_type else {}
+    name = "memory"
+
+    def __init__(self, bucket: str, **kwargs):
+        super().__init__(bucket, **kwargs)
+        self.objects: Dict[str, bytes] = {}
+
+    def _put_file(self, storage_path: str, path: str, content_type: str | None):
+        with open(path, "rb") as f:
+            self.objects[storage_path] = f.read()
+
+    def _get_file(self, storage_path: str, dest_path: str):
+        with open(dest_path, "wb") as f:
+            f.write(self.objects[storage_path])
+
 
-    res = supabase.storage.from_(SUPABASE_BUCKET).upload(
-        path=storage_path,
-        file=file_bytes,
-        file_options=options
-    )
+BACKENDS = {
+    "supabase": SupabaseStorage,
+    "s3": S3Storage,
+    "local": LocalStorage,
+    "memory": MemoryStorage,
+}
 
-    # supabase-py returns dict-like; on error may contain "error"
-    if isinstance(res, dict) and res.get("error"):
-        raise RuntimeError(f"Supabase upload error: {res['error']}")
+_storage: StorageBackend | None = None
+_storage_lock = threading.Lock()
 
-    return storage_path
\ No newline at end of file
+
+def get_storage() -> StorageBackend:
+    """
+    Бэкенд хранилища для процесса (создаётся один раз, по STORAGE_BACKEND).
+    """
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                cls = BACKENDS.get(STORAGE_BACKEND)
+                if cls is None:
+                    raise RuntimeError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+                _storage = cls(SUPABASE_BUCKET)
+    return _storage
+
+
+def set_storage(backend: StorageBackend):
+    """
+    Подменяет бэкенд (тесты, бенчмарки).
+    """
+    global _storage
+    _storage = backend
+
+
+def dataset_storage_path(dataset_id: str, filename: str) -> str:
+    return f"datasets/{dataset_id}/{filename}"
+
+
+def results_storage_path(dataset_id: str, name: str) -> str:
+    return f"results/{dataset_id}/{name}"
+
+
+def upload_dataset_file(path: str, filename: str, dataset_id: str, content_type: str | None = None) -> UploadResult:
+    """
+    Загружает файл с диска в хранилище.
+    storage_path like: datasets/<dataset_id>/<original_filename>
+    """
+    return get_storage().put_file(dataset_storage_path(dataset_id, filename), path, content_type)
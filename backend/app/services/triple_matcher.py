@@ -0,0 +1,94 @@
+# backend/app/services/triple_matcher.py
+from __future__ import annotations
+
+import re
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+# Линейный поиск триплетов "<Entity> <verb> <Entity>" — замена news_nlp.PATTERN
+# с теми же результатами. Регулярка с ленивыми группами перебирает каждое начало
+# сущности и растягивает её до конца строки, поэтому на длинных прогонах заглавных
+# слов без глагола работает квадратично. Здесь:
+# - все глаголы словаря ищутся одним проходом: словарь собирается в префиксное дерево
+#   и компилируется в одну регулярку без общих префиксов у альтернатив (комбинированный автомат);
+# - для каждого глагола один раз проверяется правая сущность (она не зависит от левой);
+# - совпадение целиком состоит из символов сущности [A-Za-z0-9\s&-], поэтому для левой
+#   сущности достаточно найти первое \b[A-Z] перед глаголом без "чужих" символов до него.
+# Каждый символ текста просматривается поиском ограниченное число раз.
+
+_ENTITY_CLASS = r"A-Za-z0-9\s&\-"
+# начало левой сущности (\b[A-Z]) и её продолжение до первого "чужого" символа;
+# с символьного класса в начале sre ищет кандидатов намного быстрее, чем с \b
+_LEFT = re.compile(rf"[A-Z](?<!\w.)[{_ENTITY_CLASS}]*")
+_VERB_RE = re.compile(r"[A-Za-z0-9&\-]+")
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """
+    ["signed", "strengthened", "met"] -> "(?:met|s(?:igned|trengthened))" (с учётом escape).
+    """
+    trie: Dict[str, dict] = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: Dict[str, dict]) -> str:
+        alts = [re.escape(ch) + emit(sub) for ch, sub in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        # слово кончается в этом узле, но есть и более длинные — хвост необязателен
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(trie)
+
+
+class TripleMatcher:
+    """
+    Словарь глаголов компилируется один раз; scan(text) даёт (entity1, verb, entity2)
+    в том же порядке и с теми же границами, что PATTERN.finditer из news_nlp.
+    Глагол — одно слово из символов сущности (без пробелов), иначе эквивалентность не гарантирована.
+    """
+
+    def __init__(self, verbs: Iterable[str]):
+        self.verbs: Tuple[str, ...] = tuple(dict.fromkeys(verbs))
+        if not self.verbs:
+            raise ValueError("verb lexicon is empty")
+        bad = [v for v in self.verbs if not _VERB_RE.fullmatch(v)]
+        if bad:
+            raise ValueError(f"unsupported verbs in lexicon: {bad}")
+        # глагол окружён пробельными символами (\s+ до и после него в PATTERN);
+        # правая сущность — в lookahead, чтобы не съесть пробел перед следующим глаголом
+        self._verb_re = re.compile(rf"\s({_trie_pattern(self.verbs)})(?=\s+([A-Z][{_ENTITY_CLASS}]+?)\b)")
+
+    def scan(self, text: str) -> List[Tuple[str, str, str]]:
+        out: List[Tuple[str, str, str]] = []
+        left = _LEFT.search
+        # lo: левее этой позиции начала левой сущности уже не ищем
+        lo = 0
+        for m in self._verb_re.finditer(text):
+            r = m.start(1)
+            if r < lo:
+                continue
+            # левая сущность — минимум два символа перед \s+, т.е. начинается не позже r - 3
+            while True:
+                s = left(text, lo, r)
+                if s is None or s.start() > r - 3:
+                    s = None
+                    lo = max(lo, r - 2)
+                    break
+                if s.end() == r:
+                    break
+                # между началом и глаголом "чужой" символ: кандидаты до него не подходят
+                lo = s.end() + 1
+            if s is not None:
+                out.append((text[s.start():r].rstrip(), m.group(1), m.group(2).strip()))
+                lo = m.end(2)
+        return out
+
+    def finditer(self, text: str) -> Iterator[Tuple[str, str, str]]:
+        return iter(self.scan(text))
+
+    def extract(self, text: str) -> List[Dict[str, str]]:
+        return [{"entity1": e1, "verb": v, "entity2": e2} for e1, v, e2 in self.scan(text)]
@@ -1,25 +1,101 @@
 from __future__ import annotations
+import base64
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 import numpy as np
 import pandas as pd
 
-def compute_H(df: pd.DataFrame) -> float:
+EPS = 1e-12
+
+
+def _normalized_entropy(counts: np.ndarray) -> float:
+    # H / log(K), K = число различных значений (не меньше 2)
+    p = counts / counts.sum()
+    H = -float(np.sum(p * np.log(p + EPS)))
+    return H / np.log(max(len(counts), 2))
+
+
+def _numeric_block_stats(X: np.ndarray, numeric_bins: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
     """
-    H — нормализованная энтропия "разнообразия" значений (средняя по колонкам),
-    пригодна для слабоформализованных данных без целевой метки.
+    Векторно для всего числового блока (n строк x m колонок) за один проход:
+    - без bins: точные частоты значений через сортировку по колонкам и длины серий;
+    - с bins: гистограмма из numeric_bins равных интервалов [min, max] колонки.
+    Возвращает (H_norm[m], non_missing[m], missing[m]).
+    """
+    n, m = X.shape
+    nan_mask = np.isnan(X)
+    missing = nan_mask.sum(axis=0)
+    valid = n - missing
+
+    if numeric_bins:
+        lo = np.min(np.where(nan_mask, np.inf, X), axis=0)
+        hi = np.max(np.where(nan_mask, -np.inf, X), axis=0)
+        width = np.where(hi > lo, hi - lo, 1.0)
+        idx = np.floor((X - lo) / width * numeric_bins)
+        idx = np.clip(np.nan_to_num(idx, nan=0.0), 0, numeric_bins - 1).astype(np.int64)
+        flat = (idx + np.arange(m) * numeric_bins)[~nan_mask]
+        counts = np.bincount(flat, minlength=m * numeric_bins).reshape(m, numeric_bins)
+        p = counts / np.maximum(valid, 1)[:, None]
+        H = -np.sum(p * np.log(p + EPS), axis=1)
+        K = np.count_nonzero(counts, axis=1)
+    else:
+        # NaN сортируются в конец, поэтому валидная часть колонки j — первые valid[j] значений
+        S = np.sort(X, axis=0).T.ravel()
+        pos = np.arange(S.size)
+        col = pos // n
+        in_valid = (pos - col * n) < valid[col]
+        new_run = np.ones(S.size, dtype=bool)
+        new_run[1:] = S[1:] != S[:-1]
+        new_run[::n] = True
+        starts = np.flatnonzero(new_run & in_valid)
+        start_col = col[starts]
+        col_end = start_col * n + valid[start_col]
+        next_start = np.append(starts[1:], S.size)
+        lengths = np.minimum(next_start, col_end) - starts
+
+        p = lengths / valid[start_col]
+        H = -np.bincount(start_col, weights=p * np.log(p + EPS), minlength=m)
+        K = np.bincount(start_col, minlength=m)
+
+    H_norm = H / np.log(np.maximum(K, 2))
+    return H_norm, valid, missing
+
+
+def _column_stats(df: pd.DataFrame, numeric_bins: Optional[int] = None) -> Tuple[List[float], int]:
     """
-    eps = 1e-12
-    entropies = []
+    Один проход по данным: нормализованные энтропии непустых колонок и число пропусков.
+    Числовые колонки считаются одним блоком, остальные — через коды категорий (без astype(str)).
+    """
+    entropies: List[float] = []
+    missing_total = 0
+
+    num_cols = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c]) and not pd.api.types.is_bool_dtype(df[c])]
+    if num_cols and len(df):
+        X = df[num_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+        H_norm, valid, missing = _numeric_block_stats(X, numeric_bins)
+        entropies.extend(H_norm[valid > 0].tolist())
+        missing_total += int(missing.sum())
+
+    num_set = set(num_cols)
     for col in df.columns:
-        s = df[col].dropna()
-        if len(s) == 0:
+        if col in num_set:
+            continue
+        codes, _ = pd.factorize(df[col], use_na_sentinel=True)
+        present = codes[codes >= 0]
+        missing_total += int(len(codes) - len(present))
+        if len(present) == 0:
             continue
-        vc = s.astype(str).value_counts(normalize=True)
-        H = -float(np.sum(vc * np.log(vc + eps)))
-        # нормализация на log(K)
-        K = max(len(vc), 2)
-        H_norm = H / np.log(K)
-        entropies.append(H_norm)
+        counts = np.bincount(present)
+        entropies.append(_normalized_entropy(counts[counts > 0]))
 
+    return entropies, missing_total
+
+
+def compute_H(df: pd.DataFrame, numeric_bins: Optional[int] = None) -> float:
+    """
+    H — нормализованная энтропия "разнообразия" значений (средняя по колонкам),
+    пригодна для слабоформализованных данных без целевой метки.
+    """
+    entropies, _ = _column_stats(df, numeric_bins)
     if not entropies:
         return 1.0
     return float(np.mean(entropies))
@@ -36,11 +112,228 @@ def compute_C(df: pd.DataFrame) -> float:
     return float(1.0 - missing / total)
 
 
-def compute_U(df: pd.DataFrame, alpha: float = 0.5, beta: float = 0.5) -> float:
+def _combine_U(H: float, C: float, alpha: float, beta: float) -> float:
+    U = alpha * H + beta * (1.0 - C)
+    return float(max(0.0, min(1.0, U)))
+
+
+def compute_U(df: pd.DataFrame, alpha: float = 0.5, beta: float = 0.5, numeric_bins: Optional[int] = None) -> float:
     """
     U = αH + β(1 - C)
+    H и C считаются за один проход по данным.
     """
-    H = compute_H(df)
-    C = compute_C(df)
-    U = alpha * H + beta * (1.0 - C)
-    return float(max(0.0, min(1.0, U)))
\ No newline at end of file
+    entropies, missing = _column_stats(df, numeric_bins)
+    H = float(np.mean(entropies)) if entropies else 1.0
+    total = df.shape[0] * df.shape[1]
+    C = float(1.0 - missing / total) if total else 0.0
+    return _combine_U(H, C, alpha, beta)
+
+
+def _hash_values(s: pd.Series) -> np.ndarray:
+    """
+    64-битные хэши непустых значений колонки (детерминированные между процессами).
+    Числа приводятся к float64, чтобы int/float из разных чанков CSV совпадали.
+    """
+    s = s.dropna()
+    if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+        return pd.util.hash_array(s.to_numpy(dtype=np.float64))
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        # category (колоночная копия): хэшируем словарь один раз, значения — по кодам
+        return pd.util.hash_array(s.cat.categories.to_numpy(dtype=object))[s.cat.codes.to_numpy()]
+    return pd.util.hash_array(s.to_numpy(dtype=object))
+
+
+class _ColumnSketch:
+    """
+    Состояние одной колонки:
+    - точные частоты (хэш значения -> count), пока различных значений <= exact_threshold;
+    - после порога — хэшированная гистограмма фиксированной ширины (одна строка count-min);
+    - HyperLogLog-регистры для оценки числа различных значений K;
+    - счётчики непустых и пропущенных значений.
+    """
+
+    __slots__ = ("keys", "counts", "hashed", "hll", "n", "missing")
+
+    def __init__(self, hll_p: int):
+        self.keys = np.empty(0, dtype=np.uint64)
+        self.counts = np.empty(0, dtype=np.int64)
+        self.hashed: np.ndarray | None = None
+        self.hll = np.zeros(1 << hll_p, dtype=np.uint8)
+        self.n = 0
+        self.missing = 0
+
+
+class UIndexAccumulator:
+    """
+    Инкрементальный U-индекс для больших и растущих датасетов.
+    update(chunk) — O(размер чанка), память на колонку ограничена
+    exact_threshold ключами либо hashed_width счётчиками + 2^hll_p регистрами.
+    Аккумуляторы с одинаковыми параметрами можно складывать (merge) и сериализовать (to_dict/from_dict).
+    Пока в колонках меньше exact_threshold различных значений, результат совпадает с compute_U;
+    выше порога энтропия колонки оценивается по хэшированной гистограмме.
+    """
+
+    # разрядность "хвоста" хэша для HLL: точно представима во float64
+    _HLL_TAIL_BITS = 40
+
+    def __init__(self, exact_threshold: int = 10_000, hashed_width: int = 4096, hll_p: int = 12):
+        if hashed_width & (hashed_width - 1):
+            raise ValueError("hashed_width must be a power of two")
+        self.exact_threshold = exact_threshold
+        self.hashed_width = hashed_width
+        self.hll_p = hll_p
+        self.columns: Dict[str, _ColumnSketch] = {}
+
+    # --- обновление ---
+    def _column(self, name: str) -> _ColumnSketch:
+        sk = self.columns.get(name)
+        if sk is None:
+            sk = self.columns[name] = _ColumnSketch(self.hll_p)
+        return sk
+
+    def _hll_update(self, sk: _ColumnSketch, hashes: np.ndarray):
+        idx = (hashes >> np.uint64(64 - self.hll_p)).astype(np.int64)
+        tail_bits = self._HLL_TAIL_BITS
+        tail = (hashes >> np.uint64(64 - self.hll_p - tail_bits)) & np.uint64((1 << tail_bits) - 1)
+        tail_f = tail.astype(np.float64)
+        bit_len = np.where(tail_f > 0, np.floor(np.log2(np.maximum(tail_f, 1.0))) + 1, 0)
+        rho = (tail_bits - bit_len + 1).astype(np.uint8)
+        np.maximum.at(sk.hll, idx, rho)
+
+    def _promote(self, sk: _ColumnSketch):
+        buckets = (sk.keys & np.uint64(self.hashed_width - 1)).astype(np.int64)
+        sk.hashed = np.bincount(buckets, weights=sk.counts, minlength=self.hashed_width).astype(np.int64)
+        sk.keys = np.empty(0, dtype=np.uint64)
+        sk.counts = np.empty(0, dtype=np.int64)
+
+    def _add_counts(self, sk: _ColumnSketch, keys: np.ndarray, counts: np.ndarray):
+        if sk.hashed is not None:
+            buckets = (keys & np.uint64(self.hashed_width - 1)).astype(np.int64)
+            sk.hashed += np.bincount(buckets, weights=counts, minlength=self.hashed_width).astype(np.int64)
+            return
+        all_keys = np.concatenate([sk.keys, keys])
+        all_counts = np.concatenate([sk.counts, counts])
+        uniq, inv = np.unique(all_keys, return_inverse=True)
+        sk.keys = uniq
+        sk.counts = np.bincount(inv, weights=all_counts, minlength=len(uniq)).astype(np.int64)
+        if len(sk.keys) > self.exact_threshold:
+            self._promote(sk)
+
+    def update(self, chunk: pd.DataFrame) -> "UIndexAccumulator":
+        for col in chunk.columns:
+            s = chunk[col]
+            sk = self._column(str(col))
+            hashes = _hash_values(s)
+            sk.missing += int(len(s) - len(hashes))
+            sk.n += int(len(hashes))
+            if len(hashes) == 0:
+                continue
+            keys, counts = np.unique(hashes, return_counts=True)
+            self._hll_update(sk, keys)
+            self._add_counts(sk, keys, counts.astype(np.int64))
+        return self
+
+    def merge(self, other: "UIndexAccumulator") -> "UIndexAccumulator":
+        if (other.hashed_width, other.hll_p) != (self.hashed_width, self.hll_p):
+            raise ValueError("Cannot merge accumulators with different sketch parameters")
+        for name, osk in other.columns.items():
+            sk = self._column(name)
+            sk.n += osk.n
+            sk.missing += osk.missing
+            np.maximum(sk.hll, osk.hll, out=sk.hll)
+            if osk.hashed is not None:
+                if sk.hashed is None:
+                    self._promote(sk)
+                sk.hashed += osk.hashed
+            else:
+                self._add_counts(sk, osk.keys, osk.counts)
+        return self
+
+    # --- оценки ---
+    def _hll_estimate(self, sk: _ColumnSketch) -> float:
+        m = len(sk.hll)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        E = alpha * m * m / float(np.sum(np.power(2.0, -sk.hll.astype(np.float64))))
+        zeros = int(np.count_nonzero(sk.hll == 0))
+        if E <= 2.5 * m and zeros:
+            E = m * np.log(m / zeros)
+        return E
+
+    def _column_entropy(self, sk: _ColumnSketch) -> float:
+        if sk.hashed is None:
+            return _normalized_entropy(sk.counts.astype(np.float64))
+        counts = sk.hashed[sk.hashed > 0].astype(np.float64)
+        p = counts / counts.sum()
+        H = -float(np.sum(p * np.log(p + EPS)))
+        # энтропия хэш-гистограммы не превышает log(width): нормируем на log(min(K, width))
+        K = min(self._hll_estimate(sk), float(self.hashed_width))
+        return min(1.0, H / np.log(max(K, 2.0)))
+
+    def H(self) -> float:
+        entropies = [self._column_entropy(sk) for sk in self.columns.values() if sk.n > 0]
+        if not entropies:
+            return 1.0
+        return float(np.mean(entropies))
+
+    def C(self) -> float:
+        total = sum(sk.n + sk.missing for sk in self.columns.values())
+        if total == 0:
+            return 0.0
+        missing = sum(sk.missing for sk in self.columns.values())
+        return float(1.0 - missing / total)
+
+    def U(self, alpha: float = 0.5, beta: float = 0.5) -> float:
+        return _combine_U(self.H(), self.C(), alpha, beta)
+
+    def cardinality(self, column: str) -> float:
+        sk = self.columns[column]
+        return float(len(sk.keys)) if sk.hashed is None else self._hll_estimate(sk)
+
+    # --- сериализация ---
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "exact_threshold": self.exact_threshold,
+            "hashed_width": self.hashed_width,
+            "hll_p": self.hll_p,
+            "columns": {
+                name: {
+                    "n": sk.n,
+                    "missing": sk.missing,
+                    "keys": base64.b64encode(sk.keys.tobytes()).decode("ascii"),
+                    "counts": base64.b64encode(sk.counts.tobytes()).decode("ascii"),
+                    "hashed": base64.b64encode(sk.hashed.tobytes()).decode("ascii") if sk.hashed is not None else None,
+                    "hll": base64.b64encode(sk.hll.tobytes()).decode("ascii"),
+                }
+                for name, sk in self.columns.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "UIndexAccumulator":
+        acc = cls(
+            exact_threshold=data["exact_threshold"],
+            hashed_width=data["hashed_width"],
+            hll_p=data["hll_p"],
+        )
+        for name, c in data["columns"].items():
+            sk = acc._column(name)
+            sk.n = int(c["n"])
+            sk.missing = int(c["missing"])
+            sk.keys = np.frombuffer(base64.b64decode(c["keys"]), dtype=np.uint64).copy()
+            sk.counts = np.frombuffer(base64.b64decode(c["counts"]), dtype=np.int64).copy()
+            if c["hashed"] is not None:
+                sk.hashed = np.frombuffer(base64.b64decode(c["hashed"]), dtype=np.int64).copy()
+            sk.hll = np.frombuffer(base64.b64decode(c["hll"]), dtype=np.uint8).copy()
+        return acc
+
+
+def compute_U_chunked(chunks: Iterable[pd.DataFrame], alpha: float = 0.5, beta: float = 0.5) -> float:
+    """
+    U по всему файлу, а не только по df.head(200): чанки складываются в
+    UIndexAccumulator, поэтому память ограничена независимо от размера файла.
+    chunks — например pd.read_csv(path, chunksize=...).
+    """
+    acc = UIndexAccumulator()
+    for chunk in chunks:
+        acc.update(chunk)
+    return acc.U(alpha, beta)
@@ -3,6 +3,8 @@ from __future__ import annotations
 from typing import Any, Dict, List
 import pandas as pd
 
+from app.services.runtime_metrics import span
+
 
 def align_features(features: Dict[str, Any], expected_columns: List[str]) -> pd.DataFrame:
     """
@@ -10,14 +12,26 @@ def align_features(features: Dict[str, Any], expected_columns: List[str]) -> pd.
     2) убирает лишние
     3) упорядочивает колонки как expected_columns
     """
-    # убираем лишние поля
-    filtered = {k: v for k, v in features.items() if k in expected_columns}
+    with span("align_features"):
+        # убираем лишние поля
+        filtered = {k: v for k, v in features.items() if k in expected_columns}
+
+        # добавляем отсутствующие
+        for col in expected_columns:
+            if col not in filtered:
+                filtered[col] = None
 
-    # добавляем отсутствующие
-    for col in expected_columns:
-        if col not in filtered:
-            filtered[col] = None
+        # формируем DataFrame ровно в нужном порядке
+        df = pd.DataFrame([filtered], columns=expected_columns)
+    return df
 
-    # формируем DataFrame ровно в нужном порядке
-    df = pd.DataFrame([filtered], columns=expected_columns)
-    return df
\ No newline at end of file
+def align_features_batch(rows: pd.DataFrame | List[Dict[str, Any]], expected_columns: List[str]) -> pd.DataFrame:
+    """
+    Пакетная версия align_features: одна таблица вместо DataFrame на каждую строку.
+    Лишние колонки отбрасываются, отсутствующие добавляются как пустые,
+    порядок — как в expected_columns.
+    """
+    with span("align_features"):
+        if isinstance(rows, pd.DataFrame):
+            return rows.reindex(columns=expected_columns)
+        return pd.DataFrame.from_records(rows, columns=expected_columns)
@@ -0,0 +1,68 @@
+# backend/benchmarks/compare.py
+from __future__ import annotations
+
+import os
+import sys
+import json
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.harness import result_key  # noqa: E402
+
+# Сравнение двух прогонов run.py по основной метрике каждого замера (время: меньше — лучше).
+# Код выхода 1, если что-то стало медленнее больше чем на --threshold.
+
+
+def _load(path: str):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return data["meta"], {result_key(r): r for r in data["results"]}
+
+
+def _label(meta) -> str:
+    commit = (meta.get("git_commit") or "unknown")[:10]
+    return f"{commit}{'+dirty' if meta.get('git_dirty') else ''}"
+
+
+def main():
+    p = argparse.ArgumentParser(description="Compare two benchmark result files")
+    p.add_argument("baseline")
+    p.add_argument("candidate")
+    p.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown, fraction (0.10 = 10%%)")
+    args = p.parse_args()
+
+    base_meta, base = _load(args.baseline)
+    new_meta, new = _load(args.candidate)
+    print(f"baseline:  {_label(base_meta)}  {args.baseline}")
+    print(f"candidate: {_label(new_meta)}  {args.candidate}")
+    if base_meta.get("params") != new_meta.get("params"):
+        print("warning: runs used different parameters")
+    if base_meta.get("cpu_count") != new_meta.get("cpu_count") or base_meta.get("platform") != new_meta.get("platform"):
+        print("warning: runs come from different machines")
+
+    regressions = 0
+    for key in sorted(set(base) | set(new)):
+        a, b = base.get(key), new.get(key)
+        if a is None or b is None:
+            print(f"{'new' if a is None else 'gone':>9}  {key}")
+            continue
+        metric = b["primary"]
+        old_v, new_v = a.get(metric), b.get(metric)
+        if not isinstance(old_v, (int, float)) or not isinstance(new_v, (int, float)) or old_v <= 0:
+            print(f"{'n/a':>9}  {key}")
+            continue
+        ratio = new_v / old_v
+        mark = ""
+        if ratio > 1 + args.threshold:
+            mark = "  REGRESSION"
+            regressions += 1
+        elif ratio < 1 - args.threshold:
+            mark = "  faster"
+        print(f"{ratio:8.2f}x  {key}: {metric} {old_v:.3f} -> {new_v:.3f}{mark}")
+
+    print(f"{regressions} regression(s) above {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# backend/benchmarks/generators.py
+from __future__ import annotations
+
+import os
+from typing import Callable, Dict, Iterator
+
+import numpy as np
+import pandas as pd
+
+# Синтетические CSV в схемах bank / credit / news (те же колонки, что у моделей в artifacts
+# и у detect_dataset_type). Размер — rows x cols: недостающие до cols колонки добавляются
+# шумом (числа и короткие категории). Файл пишется чанками, поэтому и 10M строк не держатся в памяти.
+# Один seed — один и тот же файл.
+
+CHUNK_ROWS = 100_000
+
+BANK_JOBS = ["admin.", "technician", "services", "management", "retired", "blue-collar",
+             "unemployed", "entrepreneur", "housemaid", "self-employed", "student", "unknown"]
+MONTHS = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+
+NEWS_ENTITIES = ["European Union", "Google", "Apple Inc", "Reuters", "Bank of England", "Federal Reserve",
+                 "Tesla", "Microsoft", "World Health Organization", "United Nations", "Amazon",
+                 "Goldman Sachs", "BBC News", "Kazakhstan", "NATO", "Samsung Electronics"]
+NEWS_VERBS = ["signed", "met", "discussed", "announced", "opened", "invested", "published",
+              "introduced", "developed", "reported", "strengthened", "released"]
+NEWS_FILLERS = ["on Monday", "in London", "in a statement", "according to sources", "last week",
+                "amid rising tensions", "as markets fell", "in New York City"]
+
+
+def _bank(rng: np.random.Generator, n: int) -> pd.DataFrame:
+    poutcome = rng.choice(["unknown", "success", "failure", "other"], n, p=[0.7, 0.1, 0.15, 0.05])
+    housing = rng.choice(["yes", "no"], n, p=[0.55, 0.45])
+    duration = rng.exponential(250, n).round()
+    p = 1 / (1 + np.exp(-(duration - 400) / 120 - (poutcome == "success") * 2.5 + (housing == "yes") * 0.7))
+    df = pd.DataFrame({
+        "age": rng.integers(18, 90, n),
+        "job": rng.choice(BANK_JOBS, n),
+        "marital": rng.choice(["married", "single", "divorced"], n),
+        "education": rng.choice(["primary", "secondary", "tertiary", "unknown"], n),
+        "default": rng.choice(["no", "yes"], n, p=[0.98, 0.02]),
+        "balance": rng.normal(1500, 3000, n).round(),
+        "housing": housing,
+        "loan": rng.choice(["yes", "no"], n, p=[0.15, 0.85]),
+        "contact": rng.choice(["cellular", "unknown", "telephone"], n),
+        "day": rng.integers(1, 32, n),
+        "month": rng.choice(MONTHS, n),
+        "duration": duration,
+        "campaign": rng.integers(1, 10, n),
+        "pdays": np.where(poutcome == "unknown", -1, rng.integers(1, 400, n)),
+        "previous": rng.poisson(0.5, n),
+        "poutcome": poutcome,
+        "deposit": np.where(rng.random(n) < p, "yes", "no"),
+    })
+    df.loc[rng.random(n) < 0.01, "job"] = np.nan
+    return df
+
+
+def _credit(rng: np.random.Generator, n: int) -> pd.DataFrame:
+    income = rng.lognormal(10.8, 0.6, n).round()
+    amount = rng.integers(500, 35_000, n)
+    grade = rng.choice(list("ABCDEFG"), n, p=[0.3, 0.3, 0.2, 0.1, 0.05, 0.03, 0.02])
+    rate = (6 + (np.frombuffer(grade.astype("S1").tobytes(), dtype=np.uint8) - 65) * 2.5
+            + rng.normal(0, 1, n)).round(2)
+    p = 1 / (1 + np.exp(-(amount / income * 8 - 2) - (rate - 11) / 4))
+    df = pd.DataFrame({
+        "person_age": rng.integers(20, 70, n),
+        "person_income": income,
+        "person_home_ownership": rng.choice(["RENT", "OWN", "MORTGAGE", "OTHER"], n, p=[0.5, 0.1, 0.38, 0.02]),
+        "person_emp_length": rng.integers(0, 30, n).astype(float),
+        "loan_intent": rng.choice(["EDUCATION", "MEDICAL", "VENTURE", "PERSONAL", "DEBTCONSOLIDATION",
+                                   "HOMEIMPROVEMENT"], n),
+        "loan_grade": grade,
+        "loan_amnt": amount,
+        "loan_int_rate": rate,
+        "loan_status": (rng.random(n) < p).astype(int),
+        "loan_percent_income": (amount / income).round(2),
+        "cb_person_default_on_file": rng.choice(["N", "Y"], n, p=[0.82, 0.18]),
+        "cb_person_cred_hist_length": rng.integers(2, 30, n),
+    })
+    df.loc[rng.random(n) < 0.02, "loan_int_rate"] = np.nan
+    df.loc[rng.random(n) < 0.02, "person_emp_length"] = np.nan
+    return df
+
+
+def _news(rng: np.random.Generator, n: int) -> pd.DataFrame:
+    # предложения "<Entity> <verb> <Entity> <filler>." — на них срабатывает извлечение триплетов
+    k = 6
+    e1 = rng.choice(NEWS_ENTITIES, (n, k))
+    v = rng.choice(NEWS_VERBS, (n, k))
+    e2 = rng.choice(NEWS_ENTITIES, (n, k))
+    f = rng.choice(NEWS_FILLERS, (n, k))
+    sentences = np.char.add(np.char.add(np.char.add(np.char.add(e1, " "), np.char.add(v, " ")),
+                                        np.char.add(e2, " ")), np.char.add(f, "."))
+    content = [" ".join(row) for row in sentences.tolist()]
+    return pd.DataFrame({
+        "title": [f"{a} {b} {c}" for a, b, c in zip(e1[:, 0], v[:, 0], e2[:, 0])],
+        "content": content,
+        "category": rng.choice(["business", "politics", "tech"], n),
+    })
+
+
+GENERATORS: Dict[str, Callable[[np.random.Generator, int], pd.DataFrame]] = {
+    "bank": _bank,
+    "credit": _credit,
+    "news": _news,
+}
+
+
+def _pad_columns(rng: np.random.Generator, df: pd.DataFrame, cols: int) -> pd.DataFrame:
+    n = len(df)
+    extra = {}
+    for j in range(len(df.columns), cols):
+        kind = j % 3
+        if kind == 0:
+            extra[f"x{j}"] = rng.normal(0, 1, n).round(4)
+        elif kind == 1:
+            extra[f"x{j}"] = rng.integers(0, 1000, n)
+        else:
+            extra[f"x{j}"] = rng.choice(["a", "b", "c", "d", "e"], n)
+    return pd.concat([df, pd.DataFrame(extra, index=df.index)], axis=1) if extra else df
+
+
+def iter_frames(kind: str, rows: int, cols: int = 0, seed: int = 0, chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Чанки синтетического датасета kind: всего rows строк, не меньше cols колонок
+    (меньше, чем в базовой схеме, не бывает — она нужна моделям и классификатору).
+    """
+    if kind not in GENERATORS:
+        raise ValueError(f"unknown dataset kind: {kind} (expected one of {sorted(GENERATORS)})")
+    rng = np.random.default_rng(seed)
+    done = 0
+    while done < rows:
+        n = min(chunk_rows, rows - done)
+        yield _pad_columns(rng, GENERATORS[kind](rng, n), cols)
+        done += n
+
+
+def frame(kind: str, rows: int, cols: int = 0, seed: int = 0) -> pd.DataFrame:
+    return pd.concat(list(iter_frames(kind, rows, cols, seed)), ignore_index=True)
+
+
+def write_csv(path: str, kind: str, rows: int, cols: int = 0, seed: int = 0) -> Dict[str, int]:
+    """
+    CSV на диск чанками. Возвращает {"rows", "cols", "bytes"}.
+    """
+    ncols = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for i, chunk in enumerate(iter_frames(kind, rows, cols, seed)):
+            chunk.to_csv(f, header=i == 0, index=False)
+            ncols = chunk.shape[1]
+    return {"rows": rows, "cols": ncols, "bytes": os.path.getsize(path)}
+
+
+def cached_csv(directory: str, kind: str, rows: int, cols: int = 0, seed: int = 0) -> tuple[str, Dict[str, int]]:
+    """
+    Файл генерируется один раз на (kind, rows, cols, seed) и переиспользуется между запусками.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{kind}_{rows}x{cols}_s{seed}.csv")
+    if os.path.exists(path):
+        return path, {"rows": rows, "cols": len(pd.read_csv(path, nrows=0).columns), "bytes": os.path.getsize(path)}
+    tmp = f"{path}.tmp"
+    info = write_csv(tmp, kind, rows, cols, seed)
+    os.replace(tmp, path)
+    return path, info
@@ -0,0 +1,184 @@
+# backend/benchmarks/harness.py
+from __future__ import annotations
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Схема для SQLite-заглушки БД: те же таблицы и индексы, что в Postgres (таблицы + migrations/).
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS datasets (
+    id TEXT PRIMARY KEY, original_filename TEXT NOT NULL, bucket TEXT NOT NULL, storage_path TEXT NOT NULL,
+    columnar_path TEXT, content_sha256 TEXT, size_bytes INTEGER NOT NULL, mime_type TEXT, status TEXT, result TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_datasets_content_sha256 ON datasets (content_sha256);
+CREATE TABLE IF NOT EXISTS rules (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, dataset TEXT, source TEXT, rule_if TEXT, rule_then TEXT,
+    probability REAL, coverage REAL, support REAL, confidence REAL, lift REAL, freq INTEGER,
+    content_hash TEXT, dataset_id TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_rules_content_hash ON rules (content_hash);
+CREATE INDEX IF NOT EXISTS idx_rules_dataset_source_created_id ON rules (dataset, source, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_rules_created_id ON rules (created_at DESC, id DESC);
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, dataset_id CHAR(32) NOT NULL, job_id TEXT NOT NULL,
+    row_index BIGINT NOT NULL, model TEXT NOT NULL, version TEXT NOT NULL, prediction TEXT, probability REAL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_dataset_job_row ON predictions (dataset_id, job_id, row_index);
+CREATE TABLE IF NOT EXISTS metrics (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, dataset TEXT, model TEXT, accuracy REAL, precision REAL, recall REAL,
+    f1 REAL, roc_auc REAL, time_sec REAL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_metrics_dataset_created_id ON metrics (dataset, created_at DESC, id DESC);
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY, status TEXT NOT NULL, result TEXT, error TEXT, progress TEXT,
+    created_at REAL NOT NULL, started_at REAL, finished_at REAL, dataset_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_finished_at ON jobs (finished_at);
+CREATE TABLE IF NOT EXISTS rules_version (id INTEGER PRIMARY KEY, version BIGINT NOT NULL);
+INSERT OR IGNORE INTO rules_version (id, version) VALUES (1, 0);
+"""
+
+
+def configure(workdir: str, database_url: Optional[str] = None) -> Dict[str, str]:
+    """
+    Окружение бенчмарка. Вызывается ДО импорта app.*: конфиг читается при импорте.
+    Без database_url — новая SQLite-база в workdir; хранилище — в памяти процесса.
+    Остальные настройки (RULE_MINING, COLUMNAR_CACHE, ...) берутся из окружения как есть,
+    чтобы сравнивать и конфигурации, а не только коммиты.
+    """
+    os.makedirs(workdir, exist_ok=True)
+    if database_url is None:
+        path = os.path.join(workdir, "bench.sqlite")
+        if os.path.exists(path):
+            os.unlink(path)
+        with sqlite3.connect(path) as conn:
+            conn.executescript(SQLITE_SCHEMA)
+        database_url = f"sqlite:///{path}"
+
+    env = {
+        "DATABASE_URL": database_url,
+        "STORAGE_BACKEND": "memory",
+        "ARTIFACTS_DIR": os.path.join(BACKEND_DIR, "artifacts"),
+        "RULES_DIR": os.path.join(BACKEND_DIR, "rules_json"),
+        "RUNTIME_METRICS_DIR": os.path.join(workdir, "runtime-metrics"),
+        # фоновые потоки не должны мешать замерам
+        "MODELS_LOAD_MODE": "eager",
+        "MODELS_RELOAD_SEC": "0",
+        "PREDICT_CACHE_BACKEND": "memory",
+        # каждая загрузка — полный прогон (дедупликация меряется отдельно)
+        "UPLOAD_DEDUP": "false",
+    }
+    os.environ.update(env)
+    return env
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    s = sorted(samples_ms)
+    n = len(s)
+
+    def q(p: float) -> float:
+        return s[min(n - 1, int(round(p * (n - 1))))]
+
+    return {
+        "n": n,
+        "mean_ms": statistics.fmean(s),
+        "p50_ms": q(0.50),
+        "p95_ms": q(0.95),
+        "p99_ms": q(0.99),
+        "min_ms": s[0],
+        "max_ms": s[-1],
+    }
+
+
+def measure(fn: Callable[[], Any], repeat: int, warmup: int = 1) -> Dict[str, float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return summarize(samples)
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        out = subprocess.run(["git", *args], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() if out.returncode == 0 else None
+
+
+def metadata(params: Dict[str, Any]) -> Dict[str, Any]:
+    import numpy
+    import pandas
+    import sklearn
+
+    try:
+        import pyarrow
+        pyarrow_version = pyarrow.__version__
+    except ImportError:
+        pyarrow_version = None
+
+    status = _git("status", "--porcelain", "--untracked-files=no")
+    return {
+        "git_commit": _git("rev-parse", "HEAD"),
+        "git_dirty": bool(status) if status is not None else None,
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "libraries": {
+            "numpy": numpy.__version__,
+            "pandas": pandas.__version__,
+            "scikit-learn": sklearn.__version__,
+            "pyarrow": pyarrow_version,
+        },
+        "params": params,
+    }
+
+
+class Results:
+    """
+    Плоский список замеров. Ключ замера — (suite, name, params): по нему compare.py
+    сопоставляет два прогона.
+    """
+
+    def __init__(self, meta: Dict[str, Any]):
+        self.meta = meta
+        self.items: List[Dict[str, Any]] = []
+
+    def add(self, suite: str, name: str, params: Dict[str, Any], primary: str, **values: Any) -> Dict[str, Any]:
+        item = {"suite": suite, "name": name, "params": params, "primary": primary, **values}
+        self.items.append(item)
+        shown = values.get(primary)
+        shown = f"{shown:.3f}" if isinstance(shown, float) else shown
+        print(f"  {result_key(item)}: {primary}={shown}", flush=True)
+        return item
+
+    def dump(self, path: str):
+        payload = {"meta": self.meta, "results": self.items}
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2, default=str)
+        os.replace(tmp, path)
+
+
+def result_key(item: Dict[str, Any]) -> str:
+    return f"{item['suite']}/{item['name']} {json.dumps(item['params'], sort_keys=True)}"
+
+
+def default_workdir() -> str:
+    return os.path.join(tempfile.gettempdir(), "akx-benchmarks")
@@ -0,0 +1,88 @@
+# backend/benchmarks/run.py
+from __future__ import annotations
+
+import os
+import sys
+import time
+import argparse
+
+from dotenv import load_dotenv
+
+load_dotenv()  # подхватит backend/.env если запускаете из backend
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks import harness  # noqa: E402
+from benchmarks.generators import GENERATORS  # noqa: E402
+
+
+def _ints(s: str):
+    return [int(x.replace("_", "")) for x in s.split(",") if x.strip()]
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmarks: /predict, upload pipeline, U-index, /rules -> JSON")
+    p.add_argument("--suite", default="predict,upload,u_index,rules",
+                   help="comma-separated: predict,upload,u_index,rules")
+    p.add_argument("--rows", default="1000,100000", help="dataset / batch sizes, e.g. 1000,100000,10000000")
+    p.add_argument("--cols", default="0",
+                   help="column counts (padded with noise columns; 0 = base schema only), e.g. 0,100,500")
+    p.add_argument("--kinds", default="bank,credit,news", help="datasets for the upload suite")
+    p.add_argument("--repeat", type=int, default=5, help="timed runs per measurement")
+    p.add_argument("--predict-requests", type=int, default=500, help="single /predict requests per model")
+    p.add_argument("--extra-rules", type=int, default=0, help="synthetic rules added on top of rules_json/")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--database-url", default=None,
+                   help="scratch database with the schema and migrations applied (default: fresh SQLite)")
+    p.add_argument("--workdir", default=harness.default_workdir(), help="generated CSVs and the SQLite file")
+    p.add_argument("--out", default="benchmark-results.json")
+    args = p.parse_args()
+
+    # окружение — до первого импорта app.*
+    harness.configure(args.workdir, args.database_url)
+
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from benchmarks.suites import SUITES, Context
+
+    suites = [s.strip() for s in args.suite.split(",") if s.strip()]
+    unknown = [s for s in suites if s not in SUITES]
+    if unknown:
+        raise SystemExit(f"unknown suite(s): {unknown}; expected {list(SUITES)}")
+    kinds = [k.strip() for k in args.kinds.split(",") if k.strip()]
+    unknown = [k for k in kinds if k not in GENERATORS]
+    if unknown:
+        raise SystemExit(f"unknown dataset kind(s): {unknown}; expected {list(GENERATORS)}")
+
+    params = {k: v for k, v in vars(args).items() if k not in ("out", "workdir", "database_url")}
+    params["database"] = "postgresql" if args.database_url else "sqlite"
+    results = harness.Results(harness.metadata(params))
+
+    # with: startup (модели, кэш правил) и shutdown (очередь задач, пулы) как у сервера
+    with TestClient(app) as client:
+        ctx = Context(
+            client=client,
+            results=results,
+            data_dir=os.path.join(args.workdir, "data"),
+            rows=_ints(args.rows),
+            cols=_ints(args.cols) or [0],
+            repeat=args.repeat,
+            seed=args.seed,
+            predict_requests=args.predict_requests,
+            extra_rules=args.extra_rules,
+            kinds=kinds,
+        )
+        for name in suites:
+            print(f"[{name}]", flush=True)
+            t0 = time.perf_counter()
+            SUITES[name](ctx)
+            results.meta.setdefault("suite_seconds", {})[name] = time.perf_counter() - t0
+            # частичный результат сохраняется после каждого набора
+            results.dump(args.out)
+
+    results.dump(args.out)
+    print(f"{len(results.items)} measurements -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
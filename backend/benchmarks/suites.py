@@ -0,0 +1,307 @@
+# backend/benchmarks/suites.py
+from __future__ import annotations
+
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List
+
+import pandas as pd
+
+from benchmarks import generators
+from benchmarks.harness import Results, measure, summarize
+
+# Наборы замеров. app.* импортируется внутри функций: окружение задаёт harness.configure
+# до первого импорта конфига. Все HTTP-замеры идут через TestClient (ASGI в процессе, без сети),
+# поэтому в них есть валидация, сериализация и мидлвари, но нет uvicorn и сокетов.
+
+
+@dataclass
+class Context:
+    client: Any
+    results: Results
+    data_dir: str
+    rows: List[int]
+    cols: List[int]
+    repeat: int
+    seed: int = 0
+    predict_requests: int = 500
+    extra_rules: int = 0
+    kinds: List[str] = field(default_factory=lambda: ["bank", "credit", "news"])
+
+
+def _records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    # JSON-совместимые строки: NaN -> null, numpy-скаляры -> python
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def _stage_totals() -> Dict[str, List[float]]:
+    from app.services.runtime_metrics import runtime_metrics
+
+    totals = {}
+    for h in runtime_metrics.local_snapshot()["hists"]:
+        if h["metric"] == "app_stage_duration_seconds":
+            totals[h["labels"]["stage"]] = [sum(h["counts"]), h["sum"]]
+    return totals
+
+
+def _stage_diff(before: Dict[str, List[float]], after: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    out = {}
+    for stage, (count, total) in after.items():
+        c0, s0 = before.get(stage, (0, 0.0))
+        if count > c0:
+            out[stage] = {"count": count - c0, "total_ms": total - s0}
+    return out
+
+
+# --- predict ---
+
+def bench_predict(ctx: Context):
+    from app.config import PREDICT_BATCH_MAX_ROWS
+    from app.services.inference import predict_frame
+    from app.services.model_registry import registry
+    from app.services.prediction_cache import prediction_cache
+    from app.services.validation import align_features_batch
+
+    for b in registry.status()["bundles"]:
+        d, m, v = b["dataset"], b["model"], b["version"]
+        bundle = registry.get(d, m, v, split=False)
+        if bundle is None:
+            continue
+        base = {"dataset": d, "model": m, "version": v}
+        rows = _records(generators.frame(d, ctx.predict_requests, seed=ctx.seed)[bundle.feature_columns])
+
+        # один /predict на строку: сначала все строки разные (промах кэша), затем те же (попадание)
+        prediction_cache.clear()
+        for cache in ("miss", "hit"):
+            samples = []
+            for features in rows:
+                t0 = time.perf_counter()
+                r = ctx.client.post("/predict", json={"dataset": d, "model": m, "version": v, "features": features})
+                samples.append((time.perf_counter() - t0) * 1000.0)
+                r.raise_for_status()
+            stats = summarize(samples)
+            ctx.results.add("predict", "single_http", {**base, "cache": cache}, "p50_ms",
+                            **stats, compiled=b["compiled"], requests_per_sec=1000.0 * len(samples) / sum(samples))
+
+        for n in ctx.rows:
+            if n > PREDICT_BATCH_MAX_ROWS:
+                continue
+            df = generators.frame(d, n, seed=ctx.seed)[bundle.feature_columns]
+            body = df.to_csv(index=False).encode("utf-8")
+
+            def _http():
+                r = ctx.client.post("/predict/batch", params=base, content=body, headers={"content-type": "text/csv"})
+                r.raise_for_status()
+                return r.content
+
+            stats = measure(_http, ctx.repeat)
+            ctx.results.add("predict", "batch_http", {**base, "rows": n}, "p50_ms",
+                            **stats, rows_per_sec=n / (stats["p50_ms"] / 1000.0), body_bytes=len(body))
+
+            # без HTTP и разбора CSV: выравнивание + transform + predict_proba
+            stats = measure(lambda: predict_frame(bundle, align_features_batch(df, bundle.feature_columns)), ctx.repeat)
+            ctx.results.add("predict", "batch_frame", {**base, "rows": n}, "p50_ms",
+                            **stats, rows_per_sec=n / (stats["p50_ms"] / 1000.0))
+
+
+# --- upload ---
+
+def _upload(client, path: str, timeout_sec: float = 3600.0) -> Dict[str, Any]:
+    with open(path, "rb") as f:
+        r = client.post("/datasets/upload", files={"file": (os.path.basename(path), f, "text/csv")})
+    r.raise_for_status()
+    body = r.json()
+    if body.get("duplicate"):
+        return body
+    deadline = time.monotonic() + timeout_sec
+    while time.monotonic() < deadline:
+        status = client.get(body["status_url"]).json()
+        if status["status"] in ("done", "failed"):
+            if status["status"] == "failed":
+                raise RuntimeError(f"upload failed: {status['error']}")
+            return status["result"]
+        time.sleep(0.01)
+    raise TimeoutError(f"upload of {path} did not finish in {timeout_sec}s")
+
+
+def bench_upload(ctx: Context):
+    import app.api.datasets as datasets_api
+
+    for kind in ctx.kinds:
+        for n in ctx.rows:
+            for cols in ctx.cols:
+                path, info = generators.cached_csv(ctx.data_dir, kind, n, cols, ctx.seed)
+                params = {"kind": kind, "rows": n, "cols": info["cols"]}
+                samples = []
+                stages: Dict[str, Dict[str, float]] = {}
+                result: Dict[str, Any] = {}
+                for _ in range(ctx.repeat):
+                    before = _stage_totals()
+                    t0 = time.perf_counter()
+                    result = _upload(ctx.client, path)
+                    samples.append((time.perf_counter() - t0) * 1000.0)
+                    stages = _stage_diff(before, _stage_totals())
+                stats = summarize(samples)
+                sec = stats["p50_ms"] / 1000.0
+                ctx.results.add(
+                    "upload", "pipeline_http", params, "p50_ms", **stats,
+                    rows_per_sec=n / sec, mb_per_sec=info["bytes"] / 1e6 / sec, file_bytes=info["bytes"],
+                    dataset_type=result.get("dataset_type"), method=result.get("method"),
+                    # разбивка последнего прогона по этапам (span)
+                    stages=stages,
+                )
+
+            # повторная загрузка того же файла: sha256 + поиск в datasets вместо полного прогона
+            path, info = generators.cached_csv(ctx.data_dir, kind, n, ctx.cols[0], ctx.seed)
+            saved = datasets_api.UPLOAD_DEDUP
+            datasets_api.UPLOAD_DEDUP = True
+            try:
+                _upload(ctx.client, path)
+
+                def _dup():
+                    if not _upload(ctx.client, path).get("duplicate"):
+                        raise RuntimeError("expected a duplicate upload")
+
+                stats = measure(_dup, ctx.repeat, warmup=0)
+            finally:
+                datasets_api.UPLOAD_DEDUP = saved
+            ctx.results.add("upload", "duplicate_http", {"kind": kind, "rows": n, "cols": info["cols"]}, "p50_ms",
+                            **stats, file_bytes=info["bytes"])
+
+
+# --- U-index ---
+
+# compute_U по целому DataFrame — только для таких размеров (дальше он не помещается в память)
+IN_MEMORY_MAX_ROWS = 1_000_000
+
+def bench_u_index(ctx: Context):
+    from app.services import columnar
+    from app.services.u_index import compute_U, compute_U_chunked
+
+    for n in ctx.rows:
+        for cols in ctx.cols:
+            path, info = generators.cached_csv(ctx.data_dir, "bank", n, cols, ctx.seed)
+            params = {"rows": n, "cols": info["cols"]}
+
+            def _chunked(p: str) -> Callable[[], float]:
+                return lambda: compute_U_chunked((f for f, _ in columnar.iter_frames(p, 100_000)), alpha=0.5, beta=0.5)
+
+            stats = measure(_chunked(path), ctx.repeat, warmup=0)
+            ctx.results.add("u_index", "chunked_csv", params, "p50_ms", **stats,
+                            rows_per_sec=n / (stats["p50_ms"] / 1000.0))
+
+            try:
+                parquet = f"{path}.parquet"
+                conversion = columnar.convert_csv_to_parquet(path, parquet)
+            except RuntimeError as e:
+                # нет pyarrow
+                ctx.results.add("u_index", "chunked_parquet", params, "p50_ms", skipped=str(e))
+            else:
+                try:
+                    stats = measure(_chunked(parquet), ctx.repeat, warmup=0)
+                finally:
+                    os.unlink(parquet)
+                ctx.results.add("u_index", "chunked_parquet", params, "p50_ms", **stats,
+                                rows_per_sec=n / (stats["p50_ms"] / 1000.0))
+                ctx.results.add("u_index", "csv_to_parquet", params, "seconds",
+                                seconds=conversion["seconds"], parquet_bytes=conversion["size_bytes"],
+                                csv_bytes=info["bytes"])
+
+            # весь DataFrame в памяти: так считается U по выборке при загрузке
+            if n > IN_MEMORY_MAX_ROWS:
+                continue
+            df = pd.read_csv(path)
+            stats = measure(lambda: compute_U(df, alpha=0.5, beta=0.5), ctx.repeat)
+            ctx.results.add("u_index", "in_memory", params, "p50_ms", **stats,
+                            rows_per_sec=n / (stats["p50_ms"] / 1000.0))
+
+
+# --- rules ---
+
+def _seed_rules(extra: int) -> Dict[str, Any]:
+    from app.database import engine
+    from app.services.rule_cache import rule_cache
+    from app.services.rules_bulk import bulk_insert_rules, normalize_nlp_rules
+    from app.services.rules_loader import FILES, ensure_rules_exist
+
+    for dataset, source in FILES:
+        ensure_rules_exist(dataset, source)
+    seeded = {"extra": None}
+    if extra:
+        # синтетические NLP-правила: объём таблицы для /rules без фильтров и с фильтром news/NLP
+        items = (
+            {"if_then": f"IF {generators.NEWS_ENTITIES[i % 16]} {generators.NEWS_VERBS[i % 12]} "
+                        f"THEN related #{i}", "freq": i % 97 + 1}
+            for i in range(extra)
+        )
+        seeded["extra"] = bulk_insert_rules(engine, normalize_nlp_rules(items))
+    rule_cache.load()
+    return seeded
+
+
+def bench_rules(ctx: Context):
+    import app.api.rules as rules_api
+    from app.services.rules_loader import FILES
+
+    seeded = _seed_rules(ctx.extra_rules)
+    if seeded["extra"]:
+        ctx.results.add("rules", "bulk_insert", {"rules": ctx.extra_rules}, "seconds",
+                        seconds=seeded["extra"]["seconds"], rows_per_sec=seeded["extra"]["rows_per_sec"])
+
+    filters = [(None, None)] + sorted(FILES)
+    saved = rules_api.RULES_CACHE_ENABLED
+    try:
+        for cache in (True, False):
+            rules_api.RULES_CACHE_ENABLED = cache
+            label = "memory" if cache else "db"
+            for dataset, source in filters:
+                req = {"dataset": dataset, "source": source, "limit": 50}
+
+                def _page():
+                    r = ctx.client.post("/rules", json=req)
+                    r.raise_for_status()
+                    return r
+
+                stats = measure(_page, max(ctx.repeat, 50))
+                ctx.results.add("rules", "page", {"dataset": dataset, "source": source, "limit": 50, "cache": label},
+                                "p50_ms", **stats)
+
+            # обход всей таблицы по курсору
+            def _walk() -> int:
+                pages, cursor = 0, None
+                while True:
+                    r = ctx.client.post("/rules", json={"limit": 500, "cursor": cursor})
+                    r.raise_for_status()
+                    pages += 1
+                    cursor = r.json()["next_cursor"]
+                    if not cursor:
+                        return pages
+
+            pages = _walk()
+            stats = measure(_walk, ctx.repeat, warmup=0)
+            ctx.results.add("rules", "keyset_walk", {"limit": 500, "cache": label}, "p50_ms", **stats, pages=pages)
+
+            for dataset in ("bank", "credit"):
+                for n in (1, 100, 1000):
+                    rows = _records(generators.frame(dataset, n, seed=ctx.seed))
+                    payload = {"dataset": dataset, "rows": rows}
+
+                    def _match():
+                        r = ctx.client.post("/rules/match", json=payload)
+                        r.raise_for_status()
+                        return r
+
+                    stats = measure(_match, ctx.repeat)
+                    ctx.results.add("rules", "match", {"dataset": dataset, "rows": n, "cache": label}, "p50_ms",
+                                    **stats, rows_per_sec=n / (stats["p50_ms"] / 1000.0))
+    finally:
+        rules_api.RULES_CACHE_ENABLED = saved
+
+
+SUITES: Dict[str, Callable[[Context], None]] = {
+    "predict": bench_predict,
+    "upload": bench_upload,
+    "u_index": bench_u_index,
+    "rules": bench_rules,
+}
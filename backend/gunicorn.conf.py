@@ -0,0 +1,60 @@
+# backend/gunicorn.conf.py
+# Продакшен-запуск (из backend/): gunicorn app.main:app -c gunicorn.conf.py
+#
+# - preload_app: приложение импортируется, а модели грузятся один раз в мастере до fork;
+#   воркеры получают их copy-on-write (массивы из joblib с mmap — ещё и общие страницы файла),
+#   поэтому память моделей не умножается на число воркеров. startup воркера видит, что файлы
+#   артефактов не менялись, и переиспользует загруженные бандлы;
+# - воркеров по умолчанию столько, сколько ядер доступно контейнеру (квота cgroup), WEB_CONCURRENCY — явно;
+#   пулы процессов (NLP, майнинг, скоринг) в авторежиме получают по available_cpus() // workers;
+# - воркер перезапускается после max_requests (+ случайный jitter, чтобы не все разом);
+# - остановка/перезапуск воркера: половина graceful_timeout на открытые запросы,
+#   затем shutdown приложения досчитывает микробатчи и фоновые задачи (app/gunicorn_worker.py).
+import gc
+import os
+
+from app.services.cpu_quota import available_cpus
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "0")) or available_cpus()
+# приложение (preload) делит ядра между воркерами при выборе размера пулов процессов (cpu_quota.worker_cpus)
+os.environ["WEB_CONCURRENCY"] = str(workers)
+worker_class = "app.gunicorn_worker.Worker"
+preload_app = True
+
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "1000"))
+# без ответа мастеру дольше timeout — воркер завис, перезапускаем
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "120"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+# X-Forwarded-* от прокси платформы (Render, nginx)
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "*")
+
+
+def when_ready(server):
+    # мастер, приложение уже импортировано (preload_app), воркеров ещё нет
+    from app.config import MODELS_LOAD_MODE
+    from app.services.model_registry import load_all_models, registry
+
+    if MODELS_LOAD_MODE == "eager":
+        load_all_models()
+    elif MODELS_LOAD_MODE == "background":
+        # в воркерах загрузка всё равно фоновая; ошибки не роняют мастер
+        for key, err in registry.reload(preload=True).items():
+            server.log.warning("Model bundle %s not preloaded: %s", "/".join(key), err)
+    status = registry.status()
+    server.log.info(
+        "Preloaded %d model bundle(s), %.1f KB, %d worker(s)",
+        sum(b["loaded"] for b in status["bundles"]), status["total_size_bytes"] / 1024, server.num_workers,
+    )
+    # всё, что создано до fork, — в постоянное поколение: сборщик мусора в воркерах
+    # не обходит эти объекты и не пишет в их заголовки (иначе страницы копируются)
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from app.database import dispose_after_fork
+
+    dispose_after_fork()
@@ -0,0 +1,12 @@
+-- Keyset-пагинация /rules и /metrics: ORDER BY created_at DESC, id DESC
+-- с фильтрами по dataset / source обслуживается индексом без сортировки.
+
+CREATE INDEX IF NOT EXISTS idx_rules_dataset_source_created_id
+    ON rules (dataset, source, created_at DESC, id DESC);
+
+-- запросы без фильтра (дашборд)
+CREATE INDEX IF NOT EXISTS idx_rules_created_id
+    ON rules (created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_metrics_dataset_created_id
+    ON metrics (dataset, created_at DESC, id DESC);
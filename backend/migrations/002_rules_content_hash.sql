@@ -0,0 +1,16 @@
+-- Идемпотентный импорт правил: хэш содержимого + уникальный индекс для ON CONFLICT.
+-- Хэш совпадает с app/services/rules_bulk.content_hash.
+
+ALTER TABLE rules ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+UPDATE rules
+   SET content_hash = md5(dataset || '|' || source || '|' || rule_if || '|' || rule_then)
+ WHERE content_hash IS NULL;
+
+-- старые дубликаты (повторные импорты без --reset): оставляем самую раннюю строку
+DELETE FROM rules r
+ USING rules d
+ WHERE r.content_hash = d.content_hash
+   AND r.id > d.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_rules_content_hash ON rules (content_hash);
@@ -0,0 +1,17 @@
+-- Результаты пакетного скоринга загруженных датасетов (POST /datasets/{id}/score?to_table=true).
+-- Одна строка на строку исходного файла; job_id отличает повторные прогоны.
+
+CREATE TABLE IF NOT EXISTS predictions (
+    id BIGSERIAL PRIMARY KEY,
+    dataset_id UUID NOT NULL,
+    job_id TEXT NOT NULL,
+    row_index BIGINT NOT NULL,
+    model TEXT NOT NULL,
+    version TEXT NOT NULL,
+    prediction TEXT,
+    probability DOUBLE PRECISION,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_predictions_dataset_job_row
+    ON predictions (dataset_id, job_id, row_index);
@@ -0,0 +1,4 @@
+-- Типизированная колоночная копия загрузки (Parquet) рядом с оригиналом в хранилище.
+-- NULL — копии нет (не CSV, нет pyarrow, COLUMNAR_CACHE=false): читается storage_path.
+
+ALTER TABLE datasets ADD COLUMN IF NOT EXISTS columnar_path TEXT;
@@ -0,0 +1,8 @@
+-- Дедупликация загрузок: sha256 содержимого считается при приёме файла,
+-- повторная загрузка того же файла отдаёт уже сохранённый датасет.
+-- Индекс не уникальный: одновременные одинаковые загрузки просто сохраняются обе.
+
+ALTER TABLE datasets ADD COLUMN IF NOT EXISTS content_sha256 TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_datasets_content_sha256
+    ON datasets (content_sha256);
@@ -0,0 +1,17 @@
+-- Статусы фоновых задач (загрузка, скоринг). Задача выполняется в принявшем её воркере,
+-- а GET .../status может прийти в любой: статус и результат читаются отсюда.
+-- Время — unix timestamp (как в Job), result/progress — JSON-текст.
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    progress TEXT,
+    created_at DOUBLE PRECISION NOT NULL,
+    started_at DOUBLE PRECISION,
+    finished_at DOUBLE PRECISION
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_finished_at
+    ON jobs (finished_at);
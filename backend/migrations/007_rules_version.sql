@@ -0,0 +1,12 @@
+-- Счётчик изменений таблицы rules. Его увеличивает каждый импорт/upsert правил
+-- (в той же транзакции), поэтому кэш правил в воркерах видит и UPDATE метрик,
+-- которые не меняют COUNT(*)/MAX(id)/MAX(created_at).
+
+CREATE TABLE IF NOT EXISTS rules_version (
+    id INTEGER PRIMARY KEY,
+    version BIGINT NOT NULL
+);
+
+INSERT INTO rules_version (id, version)
+SELECT 1, 0
+WHERE NOT EXISTS (SELECT 1 FROM rules_version WHERE id = 1);
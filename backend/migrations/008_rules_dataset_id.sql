@@ -0,0 +1,5 @@
+-- Правила, найденные майнингом по загруженному файлу, помечаются его dataset_id
+-- (у правил из rules_json/*.json — NULL). По этой пометке старые найденные правила
+-- вытесняются сверх MINING_MAX_STORED_RULES на (dataset, source); импортированные не трогаются.
+
+ALTER TABLE rules ADD COLUMN IF NOT EXISTS dataset_id UUID;
@@ -0,0 +1,7 @@
+-- Итог обработки загрузки на строке datasets: processing | done | failed и результат пайплайна (JSON).
+-- Дедупликация отдаёт только завершённые загрузки (status = 'done') вместе с их результатом;
+-- упавшую загрузку того же файла можно повторить.
+
+ALTER TABLE datasets ADD COLUMN IF NOT EXISTS status TEXT;
+
+ALTER TABLE datasets ADD COLUMN IF NOT EXISTS result TEXT;
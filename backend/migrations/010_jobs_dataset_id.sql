@@ -0,0 +1,4 @@
+-- Загрузка, к которой относится задача: статус скоринга /datasets/{id}/score/{job_id}
+-- отдаётся только для своего датасета, в том числе пока задача в очереди или выполняется.
+
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS dataset_id TEXT;
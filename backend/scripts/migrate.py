@@ -0,0 +1,67 @@
+# backend/scripts/migrate.py
+from __future__ import annotations
+
+import os
+import argparse
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+load_dotenv()  # подхватит backend/.env если запускаете из backend
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+# ключ pg_advisory_lock: одновременно миграции применяет один процесс
+MIGRATIONS_LOCK_KEY = 7_402_113
+MIGRATIONS_DIR_DEFAULT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+
+
+def _split_statements(sql: str):
+    # простые миграции: без функций/DO-блоков, разделитель — ";"
+    lines = [ln for ln in sql.splitlines() if not ln.strip().startswith("--")]
+    for stmt in "\n".join(lines).split(";"):
+        if stmt.strip():
+            yield stmt.strip()
+
+
+def main():
+    if not DATABASE_URL:
+        raise RuntimeError("DATABASE_URL is not set. Put it in backend/.env or environment variables.")
+
+    parser = argparse.ArgumentParser(description="Apply backend/migrations/*.sql in order")
+    parser.add_argument("--dir", default=MIGRATIONS_DIR_DEFAULT, help="Directory with NNN_name.sql files")
+    args = parser.parse_args()
+
+    engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+
+    # запускается при каждом деплое/старте контейнера: несколько реплик одновременно
+    # ждут друг друга на advisory lock (Postgres), список применённых читается уже под ним
+    with engine.connect() as lock_conn:
+        if lock_conn.dialect.name == "postgresql":
+            lock_conn.execute(text("SELECT pg_advisory_lock(:k)"), {"k": MIGRATIONS_LOCK_KEY})
+            lock_conn.commit()
+
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE IF NOT EXISTS schema_migrations (name VARCHAR PRIMARY KEY)"))
+            applied = {r[0] for r in conn.execute(text("SELECT name FROM schema_migrations"))}
+
+        files = sorted(f for f in os.listdir(args.dir) if f.endswith(".sql"))
+        for name in files:
+            if name in applied:
+                continue
+            with open(os.path.join(args.dir, name), "r", encoding="utf-8") as f:
+                sql = f.read()
+            with engine.begin() as conn:
+                for stmt in _split_statements(sql):
+                    conn.execute(text(stmt))
+                conn.execute(text("INSERT INTO schema_migrations (name) VALUES (:n)"), {"n": name})
+            print(f"Applied {name}")
+
+        if lock_conn.dialect.name == "postgresql":
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": MIGRATIONS_LOCK_KEY})
+            lock_conn.commit()
+
+    print("Migrations up to date.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# backend/scripts/mine_news_rules.py
+from __future__ import annotations
+
+import os
+import sys
+import argparse
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+
+load_dotenv()  # подхватит backend/.env если запускаете из backend
+
+# движок извлечения живёт в app/services/nlp_corpus.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.services.nlp_corpus import extract_corpus, top_triples  # noqa: E402
+from app.services.rules_bulk import bulk_insert_rules, normalize_nlp_rules  # noqa: E402
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mine NLP triples from a news CSV into rules.")
+    parser.add_argument("csv", help="path to news CSV (needs a text column)")
+    parser.add_argument("--text-column", default="content")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-rows", type=int, default=2000)
+    parser.add_argument("--min-freq", type=int, default=1)
+    parser.add_argument("--top-n", type=int, default=1000, help="0 = all triples")
+    parser.add_argument("--dry-run", action="store_true", help="only print stats, do not write rules")
+    args = parser.parse_args()
+
+    counts, stats = extract_corpus(args.csv, args.text_column, args.chunk_rows, args.workers)
+    print(
+        f"Docs: {stats['docs']}, triples: {stats['triples']} ({stats['unique_triples']} unique), "
+        f"{stats['seconds']:.2f}s, {stats['docs_per_sec']:.0f} docs/s on {stats['workers']} workers"
+    )
+
+    items = top_triples(counts, args.min_freq, args.top_n)
+    for it in items[:10]:
+        print(f"  {it['metrics']['freq']:>6}  {it['if']}")
+
+    if args.dry_run:
+        return
+    if not DATABASE_URL:
+        raise RuntimeError("DATABASE_URL is not set. Put it into backend/.env or env vars.")
+
+    engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+    written = bulk_insert_rules(engine, normalize_nlp_rules(items, "news"), update_metrics=True)
+    print(f"Rules written: {written['read']}, new: {written['inserted']}")
+
+
+if __name__ == "__main__":
+    main()
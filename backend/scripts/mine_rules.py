@@ -0,0 +1,69 @@
+# backend/scripts/mine_rules.py
+from __future__ import annotations
+
+import os
+import sys
+import argparse
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+
+load_dotenv()  # подхватит backend/.env если запускаете из backend
+
+# майнинг живёт в app/services/rule_mining.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.services.model_registry import registry  # noqa: E402
+from app.services.rule_mining import MiningParams, mine_file  # noqa: E402
+from app.services.rules_bulk import NORMALIZERS, bulk_insert_rules  # noqa: E402
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+
+def main():
+    defaults = MiningParams()
+    parser = argparse.ArgumentParser(description="Mine Apriori / DecisionTree rules from a tabular CSV into rules.")
+    parser.add_argument("csv", help="path to CSV")
+    parser.add_argument("--dataset", required=True, help="dataset name in rules (bank/credit/...)")
+    parser.add_argument("--method", choices=["Apriori", "DecisionTree"], required=True)
+    parser.add_argument("--chunk-rows", type=int, default=defaults.chunk_rows)
+    parser.add_argument("--sample-rows", type=int, default=defaults.sample_rows)
+    parser.add_argument("--min-support", type=float, default=defaults.min_support)
+    parser.add_argument("--min-confidence", type=float, default=defaults.min_confidence)
+    parser.add_argument("--max-len", type=int, default=defaults.max_len)
+    parser.add_argument("--max-depth", type=int, default=defaults.dt_max_depth)
+    parser.add_argument("--top-n", type=int, default=defaults.top_n)
+    parser.add_argument("--dry-run", action="store_true", help="only print stats, do not write rules")
+    args = parser.parse_args()
+
+    params = MiningParams(
+        chunk_rows=args.chunk_rows,
+        sample_rows=args.sample_rows,
+        min_support=args.min_support,
+        min_confidence=args.min_confidence,
+        max_len=args.max_len,
+        dt_max_depth=args.max_depth,
+        top_n=args.top_n,
+    )
+    # DecisionTree по признакам модели датасета (если она есть) — как в пайплайне загрузки
+    bundle = registry.get(args.dataset, split=False) if args.method == "DecisionTree" else None
+    result = mine_file(
+        args.csv, args.dataset, args.method, params,
+        preprocess=bundle.preprocess if bundle is not None else None,
+        feature_columns=bundle.feature_columns if bundle is not None else None,
+    )
+    print(result["stats"])
+    for it in result["items"][:10]:
+        print(f"  IF {it['if']} THEN {it['then']}  {it['metrics']}")
+
+    if args.dry_run:
+        return
+    if not DATABASE_URL:
+        raise RuntimeError("DATABASE_URL is not set. Put it into backend/.env or env vars.")
+
+    engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+    written = bulk_insert_rules(engine, NORMALIZERS[args.method](result["items"], args.dataset), update_metrics=True)
+    print(f"Rules written: {written['read']}, new: {written['inserted']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+# backend/tests/conftest.py
+# Окружение как у бенчмарков (benchmarks/harness.py): новая SQLite-база со схемой приложения,
+# хранилище в памяти. Конфиг читается при импорте app.*, поэтому — до импорта тестов.
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks import harness  # noqa: E402
+
+os.environ.setdefault("MINING_WORKERS", "0")
+harness.configure(tempfile.mkdtemp(prefix="backend-tests-"))
@@ -0,0 +1,51 @@
+# backend/tests/test_compiled_tree.py
+import math
+
+import numpy as np
+import pytest
+
+from app.services.compiled_tree import _format_label
+from app.services.model_registry import registry
+from app.services.validation import align_features
+from benchmarks.generators import frame
+
+TARGETS = {"bank": "deposit", "credit": "loan_status"}
+
+
+def _rows(dataset: str, n: int, seed: int):
+    # сгенерированные строки + то, что приходит в /predict на практике:
+    # NaN и None, неизвестные категории, отсутствующие ключи, лишние поля
+    rng = np.random.default_rng(seed)
+    rows = frame(dataset, rows=n, seed=seed).drop(columns=[TARGETS[dataset]]).to_dict(orient="records")
+    for row in rows:
+        for col in list(row):
+            r = rng.random()
+            if r < 0.05:
+                row[col] = float("nan")
+            elif r < 0.10:
+                row[col] = None
+            elif r < 0.15:
+                del row[col]
+            elif r < 0.20 and isinstance(row[col], str):
+                row[col] = "__unseen__"
+        row["extra_field"] = "ignored"
+    return rows
+
+
+@pytest.mark.parametrize("dataset", ["bank", "credit"])
+def test_compiled_tree_matches_sklearn(dataset):
+    bundle = registry.get(dataset, split=False)
+    assert bundle is not None
+    # самопроверка при загрузке не прошла бы — compiled был бы None, и все запросы шли бы в sklearn
+    assert bundle.compiled is not None
+
+    for row in _rows(dataset, 400, seed=7):
+        fast = bundle.compiled.predict_one(row)
+        assert fast is not None, row
+
+        X = bundle.preprocess.transform(align_features(row, bundle.feature_columns))
+        pred = _format_label(bundle.model.predict(X)[0])
+        proba = bundle.model.predict_proba(X)[0]
+        assert fast[0] == pred, row
+        # бит-в-бит, без допуска
+        assert fast[1] == float(proba[1]) or (math.isnan(fast[1]) and math.isnan(proba[1])), row
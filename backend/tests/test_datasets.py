@@ -0,0 +1,44 @@
+# backend/tests/test_datasets.py
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.api.datasets as datasets_api
+from app.main import app
+from benchmarks.generators import frame
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as c:
+        yield c
+
+
+def _wait(client, dataset_id):
+    for _ in range(300):
+        status = client.get(f"/datasets/{dataset_id}/status").json()
+        if status["status"] in ("done", "failed"):
+            return status
+        time.sleep(0.1)
+    raise AssertionError(f"upload {dataset_id} did not finish")
+
+
+def test_identical_upload_returns_stored_result(client, monkeypatch):
+    # окружение тестов выключает дедупликацию (benchmarks/harness.py), здесь она и проверяется
+    monkeypatch.setattr(datasets_api, "UPLOAD_DEDUP", True)
+    data = frame("bank", rows=300, seed=21).to_csv(index=False).encode()
+
+    first = client.post("/datasets/upload", files={"file": ("bank.csv", data, "text/csv")})
+    assert first.status_code == 202
+    assert "duplicate" not in first.json()
+    done = _wait(client, first.json()["dataset_id"])
+    assert done["status"] == "done"
+
+    second = client.post("/datasets/upload", files={"file": ("bank-copy.csv", data, "text/csv")})
+    assert second.status_code == 200
+    body = second.json()
+    assert body["duplicate"] is True
+    assert body["dataset_id"] == first.json()["dataset_id"]
+    assert body["status"] == "done"
+    assert body["result"] == done["result"]
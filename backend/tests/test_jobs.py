@@ -0,0 +1,35 @@
+# backend/tests/test_jobs.py
+import asyncio
+import threading
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import engine
+from app.main import app
+from app.services.jobs import JobStore, jobs
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as c:
+        yield c
+
+
+def test_score_status_only_for_own_dataset(client):
+    own, other = str(uuid.uuid4()), str(uuid.uuid4())
+    job_id = f"score-{uuid.uuid4()}"
+    release = threading.Event()
+    jobs.submit(job_id, lambda: release.wait(10) and {"dataset_id": own}, dataset_id=own)
+    try:
+        # задача ещё выполняется: результата нет, но владелец уже известен
+        assert client.get(f"/datasets/{other}/score/{job_id}").status_code == 404
+        res = client.get(f"/datasets/{own}/score/{job_id}")
+        assert res.status_code == 200
+        assert res.json()["status"] in ("queued", "running")
+
+        # другой воркер читает задачу из таблицы jobs — владелец сохранён и там
+        assert asyncio.run(JobStore(engine).find(job_id)).dataset_id == own
+    finally:
+        release.set()
@@ -0,0 +1,109 @@
+# backend/tests/test_rule_mining.py
+from collections import Counter
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import engine
+from app.main import app
+from app.services.rule_cache import rule_cache
+from app.services.rule_mining import MiningParams, mine_rules
+from benchmarks.generators import frame
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as c:
+        yield c
+
+
+def test_mined_tree_rules_roundtrip_through_match(client, tmp_path):
+    # правило, найденное деревом по файлу, в /rules/match срабатывает ровно на строках своего листа
+    df = frame("bank", rows=3000, seed=1)
+    df["job"] = df["job"].fillna("unknown")
+    path = tmp_path / "bank.csv"
+    df.to_csv(path, index=False)
+
+    mining = mine_rules(engine, str(path), "bank", "DecisionTree", MiningParams(top_n=1000))
+    assert mining["features"] == "preprocess"
+    assert mining["train_rows"] == len(df)
+    assert mining["rules_written"] > 1
+    rule_cache.load()
+
+    rows = df.drop(columns=["deposit"]).to_dict(orient="records")
+    res = client.post("/rules/match", json={"dataset": "bank", "source": "DecisionTree", "rows": rows})
+    assert res.status_code == 200
+    body = res.json()
+    assert body["unresolved_rules"] == 0
+
+    fired = Counter(rid for item in body["items"] for rid in item["rule_ids"])
+    by_if = {r["rule_if"]: int(rid) for rid, r in body["rules"].items()}
+    for item in mining["top"]:
+        rid = by_if[item["if"]]
+        assert fired[rid] == item["metrics"]["samples"]
+    # листья дерева не пересекаются: строка попадает не больше чем в одно правило
+    assert max(len(item["rule_ids"]) for item in body["items"]) == 1
+
+
+def test_mined_rules_are_tagged_and_pruned(tmp_path, monkeypatch):
+    import app.services.rule_mining as rule_mining
+    from sqlalchemy import text
+
+    df = frame("credit", rows=2000, seed=2)
+    path = tmp_path / "credit.csv"
+    df.to_csv(path, index=False)
+    monkeypatch.setattr(rule_mining, "MINING_MAX_STORED_RULES", 3)
+
+    for dataset_id in ("00000000-0000-0000-0000-000000000001", "00000000-0000-0000-0000-000000000002"):
+        mining = mine_rules(engine, str(path), "credit", "Apriori", MiningParams(top_n=10), dataset_id=dataset_id)
+        assert mining["rules_written"] > 3
+
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT dataset_id FROM rules WHERE dataset = 'credit' AND source = 'Apriori'"
+        )).scalars().all()
+    # правила помечены первой нашедшей их загрузкой и обрезаны до MINING_MAX_STORED_RULES
+    assert len(rows) == 3
+    assert all(r is not None for r in rows)
+
+
+def test_mining_keeps_metrics_of_imported_rules(tmp_path):
+    from sqlalchemy import text
+
+    from app.services.rule_mining import mine_file
+    from app.services.rules_bulk import NORMALIZERS, bulk_insert_rules
+
+    df = frame("bank", rows=2000, seed=3)
+    path = tmp_path / "bank.csv"
+    df.to_csv(path, index=False)
+
+    # то же правило уже импортировано из rules_json (dataset_id IS NULL) со своими метриками
+    found = mine_file(str(path), "bank", "Apriori", MiningParams(top_n=10))["items"]
+    imported = next(NORMALIZERS["Apriori"](found, "bank"))
+    imported.update(support=0.123, confidence=0.456, lift=7.89)
+    bulk_insert_rules(engine, [imported])
+
+    mining = mine_rules(
+        engine, str(path), "bank", "Apriori", MiningParams(top_n=10),
+        dataset_id="00000000-0000-0000-0000-000000000003",
+    )
+    assert mining["rules_written"] > mining["rules_new"]
+
+    with engine.connect() as conn:
+        row = conn.execute(
+            text("SELECT support, confidence, lift, dataset_id FROM rules WHERE content_hash = :h"),
+            {"h": imported["content_hash"]},
+        ).one()
+    assert tuple(row) == (0.123, 0.456, 7.89, None)
+
+
+def test_unknown_dataset_is_not_mined(tmp_path):
+    from app.services.auto_pipeline import run_after_upload
+
+    path = tmp_path / "other.csv"
+    path.write_text("a,b,c\n" + "".join(f"{i},{i % 3},x{i % 2}\n" for i in range(200)))
+
+    result = run_after_upload(str(path))
+    assert result["dataset_type"] == "unknown"
+    assert result["method"] in ("Apriori", "DecisionTree")
+    assert result["rule_mining"] is None
@@ -0,0 +1,118 @@
+# backend/tests/test_triple_matcher.py
+import random
+import re
+
+import pytest
+
+from app.services.news_nlp import VERB_LIST, extract_triples_regex, extract_triples_safe
+from app.services.triple_matcher import TripleMatcher
+from benchmarks.generators import frame
+
+CORPUS = [
+    "",
+    "no triples here",
+    "Google signed Apple Inc on Monday.",
+    "European Union met Bank of England in London and Tesla announced Microsoft last week.",
+    "Reuters reported Federal Reserve released NATO opened Amazon.",
+    "Goldman Sachs invested Samsung Electronics; BBC News published Kazakhstan.",
+    "A signed B",
+    "AB signed CD",
+    "Ab signed Cd",
+    "AB  signed   CD  met EF",
+    "AB signed\tCD\nmet EF",
+    "AB signed cd met EF",
+    "AB signedX CD",
+    "AB resigned CD",
+    "AB signed signed CD",
+    "AB met met met CD",
+    "X-Ray & Co signed Y&Z Ltd-2 released Q9",
+    "Über Corp signed Équipe SA",
+    "Москва signed Berlin",
+    "Berlin signed Москва Group",
+    "Café Ltd met Tokyo",
+    "Tokyo met Café Ltd",
+    "AB signed CD",
+    "AB signed CD met EF",
+    "日本 Inc announced Korea Co",
+    "Apple 🍏 Inc signed Google",
+    "aB signed CD",
+    "A1 signed B2",
+    "AAAA BBBB CCCC DDDD EEEE FFFF GGGG HHHH",
+    "Ab, Cd signed Ef. Gh met Ij",
+    "Ab (Cd) signed Ef",
+]
+
+VERB_PIECES = ["signed", "met", "discussed", "announced", "released", "reported", "resigned", "meets", "meeting", "re"]
+WORD_PIECES = [
+    "Google", "Apple Inc", "X", "AB", "Ab", "ab", "Über", "Москва", "Café", "日本", "🍏", "O'Neil",
+    "A-B", "x&y", "&", "-", "1", "Q9", "I", "ß", "ǅ", "Ⅻ",
+]
+SEPARATORS = [" "] * 8 + ["  ", "\t", "\n", "\u00a0", "\u2003", ", ", ". ", "", "-", "&"]
+
+
+def _generated(n: int, seed: int):
+    rng = random.Random(seed)
+    for _ in range(n):
+        parts = []
+        for _ in range(rng.randint(1, 14)):
+            if rng.random() < 0.3:
+                # заготовка "<Entity> <verb> <Entity>" со случайными разделителями
+                parts.extend([
+                    rng.choice(WORD_PIECES), rng.choice(SEPARATORS), rng.choice(VERB_PIECES),
+                    rng.choice(SEPARATORS), rng.choice(WORD_PIECES),
+                ])
+            else:
+                parts.append(rng.choice(VERB_PIECES if rng.random() < 0.35 else WORD_PIECES))
+            parts.append(rng.choice(SEPARATORS))
+        yield "".join(parts)
+
+
+def _regex(verbs):
+    # та же форма, что news_nlp.PATTERN, для произвольного словаря
+    alt = "(" + "|".join(re.escape(v) for v in verbs) + ")"
+    pattern = re.compile(rf"\b([A-Z][A-Za-z0-9\s&\-]+?)\s+{alt}\s+([A-Z][A-Za-z0-9\s&\-]+?)\b")
+
+    def extract(text):
+        return [
+            {"entity1": m.group(1).strip(), "verb": m.group(2).strip(), "entity2": m.group(3).strip()}
+            for m in pattern.finditer(text)
+        ]
+
+    return extract
+
+
+def test_matcher_matches_regex_on_corpus():
+    news = frame("news", rows=200, seed=5)["content"].tolist()
+    for text in CORPUS + news:
+        assert extract_triples_safe(text) == extract_triples_regex(text), text
+
+
+def test_matcher_matches_regex_on_generated_strings():
+    found = 0
+    for text in _generated(5000, seed=11):
+        expected = extract_triples_regex(text)
+        assert extract_triples_safe(text) == expected, repr(text)
+        found += len(expected)
+    # строки действительно содержат триплеты, а не только пустые совпадения
+    assert found > 500
+
+
+@pytest.mark.parametrize("verbs", [
+    # глаголы — префиксы друг друга и с общими префиксами: порядок альтернатив важен для PATTERN
+    ("met", "meets", "meeting"),
+    ("meeting", "meets", "met"),
+    ("re", "released", "reported", "resigned"),
+    ("signed", "A-B", "x&y"),
+    VERB_LIST,
+])
+def test_matcher_matches_regex_with_overlapping_verbs(verbs):
+    matcher = TripleMatcher(verbs)
+    reference = _regex(verbs)
+    texts = CORPUS + list(_generated(2000, seed=13)) + [
+        "AB meeting CD meets EF met GH",
+        "AB meetings CD",
+        "AB re CD released EF",
+        "AB A-B CD x&y EF",
+    ]
+    for text in texts:
+        assert matcher.extract(text) == reference(text), (verbs, repr(text))
@@ -5,13 +5,26 @@ export async function fetchHealth() {
   return res.data;
 }
 
-export async function uploadDataset(file) {
+export async function fetchUploadStatus(datasetId) {
+  const res = await api.get(`/datasets/${datasetId}/status`);
+  return res.data;
+}
+
+// Загрузка обрабатывается в фоне: ждём завершения задачи через /status
+export async function uploadDataset(file, { pollMs = 1000 } = {}) {
   const form = new FormData();
   form.append("file", file);
   const res = await api.post("/datasets/upload", form, {
     headers: { "Content-Type": "multipart/form-data" },
   });
-  return res.data;
+
+  const { dataset_id } = res.data;
+  for (;;) {
+    const job = await fetchUploadStatus(dataset_id);
+    if (job.status === "failed") throw new Error(job.error || "Upload processing failed");
+    if (job.status === "done" || job.status === "stored") return job.result;
+    await new Promise((r) => setTimeout(r, pollMs));
+  }
 }
 
 export async function fetchRules({ dataset, source, limit }) {